@@ -0,0 +1,156 @@
+"""
+カメラQRコード検出ベンチマーク
+実カメラの代わりに一定のフレームレートで合成フレームを返すカメラを使い、
+CameraQRReader の検出ループのfps・デコード時間・破棄/スキップしたフレーム数と
+CPU使用率を表示（--moving を指定しない場合は背景が静止したシーン）
+
+使用例:
+  python benchmarks/bench_camera.py
+  python benchmarks/bench_camera.py --workers 1 2 4 --seconds 5
+  python benchmarks/bench_camera.py --qr-ratio 0 --fps 30
+  python benchmarks/bench_camera.py --qr-ratio 0 --moving
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from typing import Any, Optional, Tuple
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.camera_qr_reader import CameraQRReader  # noqa: E402
+
+PAYLOAD = "otpauth-migration://offline?data=" + "A" * 120
+
+
+def make_frames(
+    width: int, height: int, seed: int = 0
+) -> Tuple[np.ndarray, np.ndarray]:
+    """QRコードを含むフレームと含まないフレームを作成"""
+    rng = np.random.default_rng(seed)
+    # 大きな模様（シーン）に細かいノイズ（センサーノイズ相当）を重ねた背景
+    scene = rng.integers(40, 220, (height // 40, width // 40, 3), dtype=np.uint8)
+    scene = cv2.resize(scene, (width, height), interpolation=cv2.INTER_LINEAR)
+    noise = rng.integers(-6, 7, (height, width, 3))
+    background = np.clip(scene + noise, 0, 255).astype(np.uint8)
+
+    qr = cv2.QRCodeEncoder.create().encode(PAYLOAD)
+    qr = cv2.resize(qr, (240, 240), interpolation=cv2.INTER_NEAREST)
+    qr = cv2.copyMakeBorder(qr, 16, 16, 16, 16, cv2.BORDER_CONSTANT, value=255)
+    with_qr = background.copy()
+    top = (height - qr.shape[0]) // 2
+    left = (width - qr.shape[1]) // 2
+    with_qr[top : top + qr.shape[0], left : left + qr.shape[1]] = qr[:, :, None]
+    return with_qr, background
+
+
+class SyntheticCamera:
+    """cv2.VideoCapture と同じインターフェースで合成フレームを返すカメラ"""
+
+    def __init__(
+        self, fps: float, qr_ratio: float, width: int, height: int, moving: bool
+    ):
+        self.interval = 1.0 / fps
+        self.qr_ratio = qr_ratio
+        # 動きのあるシーンは2種類の背景を交互に返す
+        self.scenes = [
+            make_frames(width, height, seed) for seed in range(2 if moving else 1)
+        ]
+        self.count = 0
+        self._next = time.perf_counter()
+        self._opened = True
+
+    def isOpened(self) -> bool:  # noqa: N802 - cv2.VideoCapture と同じ名前
+        return self._opened
+
+    def release(self) -> None:
+        self._opened = False
+
+    def read(self, image: Optional[np.ndarray] = None) -> Tuple[bool, Any]:
+        # 実カメラと同様に次のフレームが届くまでブロックする
+        delay = self._next - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        self._next = max(self._next + self.interval, time.perf_counter())
+
+        self.count += 1
+        has_qr = self.qr_ratio > 0 and (self.count * self.qr_ratio) % 1 < self.qr_ratio
+        with_qr, without_qr = self.scenes[self.count % len(self.scenes)]
+        source = with_qr if has_qr else without_qr
+        if image is None or image.shape != source.shape:
+            return True, source.copy()
+        np.copyto(image, source)
+        return True, image
+
+
+def run(workers: int, args: argparse.Namespace) -> None:
+    """指定ワーカー数で検出ループを実行して結果を表示"""
+    reader = CameraQRReader(decode_workers=workers)
+    reader.camera = SyntheticCamera(
+        args.fps, args.qr_ratio, args.width, args.height, args.moving
+    )
+    reader.is_running = True
+    first_detection = []
+    started = time.perf_counter()
+    reader.on_qr_detected = lambda data: first_detection.append(
+        time.perf_counter() - started
+    )
+
+    cpu_start = time.process_time()
+    thread = threading.Thread(target=reader._qr_detection_loop)
+    thread.start()
+    time.sleep(args.seconds)
+    reader.is_running = False
+    thread.join()
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_start
+
+    metrics = reader.detection_metrics.snapshot()
+    first = f"{first_detection[0] * 1000:.0f}ms" if first_detection else "-"
+    print(
+        f"{workers:>7} {metrics['average_fps']:>6.1f} {metrics['processed']:>9} "
+        f"{metrics['dropped']:>7} {metrics.get('skipped', 0):>7} "
+        f"{metrics['decode_ms_avg']:>9.1f} "
+        f"{metrics['decode_ms_max']:>9.1f} {cpu / elapsed * 100:>6.0f}% {first:>8}"
+    )
+
+
+def main() -> None:
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description="カメラQRコード検出ベンチマーク")
+    parser.add_argument(
+        "--workers", type=int, nargs="+", default=[1, 2], help="デコードワーカー数"
+    )
+    parser.add_argument("--seconds", type=float, default=3.0, help="計測時間（秒）")
+    parser.add_argument(
+        "--fps", type=float, default=30.0, help="カメラのフレームレート"
+    )
+    parser.add_argument(
+        "--qr-ratio", type=float, default=0.1, help="QRコードを含むフレームの割合"
+    )
+    parser.add_argument(
+        "--moving", action="store_true", help="背景が毎フレーム変化するシーン"
+    )
+    parser.add_argument("--width", type=int, default=640, help="フレームの幅")
+    parser.add_argument("--height", type=int, default=480, help="フレームの高さ")
+    args = parser.parse_args()
+
+    print(
+        f"camera={args.width}x{args.height}@{args.fps:.0f}fps "
+        f"qr_ratio={args.qr_ratio} moving={args.moving} cores={os.cpu_count()}"
+    )
+    print(
+        f"{'workers':>7} {'fps':>6} {'processed':>9} {'dropped':>7} {'skipped':>7} "
+        f"{'decode_ms':>9} {'max_ms':>9} {'cpu':>7} {'first':>8}"
+    )
+    for workers in args.workers:
+        run(workers, args)
+
+
+if __name__ == "__main__":
+    main()
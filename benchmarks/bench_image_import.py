@@ -0,0 +1,94 @@
+"""
+画像ファイル一括読み取りベンチマーク
+QRコードを含むスクリーンショット相当の画像ファイルを作成し、
+1枚ずつ read_qr_from_image で読み取る場合と read_qr_from_images
+（ワーカープロセス数ごと）で読み取る場合の処理速度（枚/秒）を表示
+
+使用例:
+  python benchmarks/bench_image_import.py
+  python benchmarks/bench_image_import.py --images 500 --workers 1 2 4
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from typing import List
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.camera_qr_reader import CameraQRReader  # noqa: E402
+
+PAYLOAD = "otpauth-migration://offline?data=" + "A" * 120
+
+
+def make_images(directory: str, count: int, width: int, height: int) -> List[str]:
+    """QRコードを含む画像ファイルを作成（内容はそれぞれ異なる）"""
+    rng = np.random.default_rng(0)
+    paths = []
+    for i in range(count):
+        image = np.full((height, width, 3), 245, dtype=np.uint8)
+        # 画面上部のテキスト領域に相当する模様
+        image[: height // 6] = rng.integers(0, 255, (height // 6, width, 3))
+        qr = cv2.QRCodeEncoder.create().encode(f"{PAYLOAD}{i:04d}")
+        side = width * 2 // 3
+        qr = cv2.resize(qr, (side, side), interpolation=cv2.INTER_NEAREST)
+        top = (height - side) // 2
+        left = (width - side) // 2
+        image[top : top + side, left : left + side] = qr[:, :, None]
+        path = os.path.join(directory, f"qr{i:04d}.png")
+        cv2.imwrite(path, image)
+        paths.append(path)
+    return paths
+
+
+def report(label: str, paths: List[str], elapsed: float, decoded: int) -> None:
+    """結果を表示"""
+    print(
+        f"{label:>12} {elapsed:>8.2f}s {len(paths) / elapsed:>8.1f} "
+        f"{decoded:>4}/{len(paths)}"
+    )
+
+
+def main() -> None:
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description="画像ファイル一括読み取りベンチマーク")
+    parser.add_argument("--images", type=int, default=100, help="画像ファイル数")
+    parser.add_argument(
+        "--workers", type=int, nargs="+", default=[1, 2], help="ワーカープロセス数"
+    )
+    parser.add_argument("--width", type=int, default=1170, help="画像の幅")
+    parser.add_argument("--height", type=int, default=2532, help="画像の高さ")
+    args = parser.parse_args()
+
+    reader = CameraQRReader()
+    with tempfile.TemporaryDirectory() as directory:
+        paths = make_images(directory, args.images, args.width, args.height)
+        print(
+            f"images={args.images} size={args.width}x{args.height} "
+            f"cores={os.cpu_count()}"
+        )
+        print(f"{'mode':>12} {'elapsed':>9} {'img/s':>8} {'decoded':>9}")
+
+        started = time.perf_counter()
+        # read_qr_from_image は1件ごとに結果を表示するため出力を捨てる
+        with contextlib.redirect_stdout(io.StringIO()):
+            decoded = sum(1 for path in paths if reader.read_qr_from_image(path))
+        report("sequential", paths, time.perf_counter() - started, decoded)
+
+        for workers in args.workers:
+            started = time.perf_counter()
+            results = reader.read_qr_from_images(paths, workers)
+            elapsed = time.perf_counter() - started
+            decoded = sum(1 for payloads, _ in results if payloads)
+            report(f"workers={workers}", paths, elapsed, decoded)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+並列復号化ベンチマーク
+旧形式（レコードごとにPBKDF2）の合成ボールトを作成し、
+SecurityManagerでボールトを開き全件を復号化する（v2形式への移行を含む）時間を
+ワーカー数ごとに計測（ボールトは初回の復号化時に開かれるため、それまでを計測する）
+
+使用例:
+  python benchmarks/bench_parallel_decrypt.py
+  python benchmarks/bench_parallel_decrypt.py --accounts 1000 --iterations 10000
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.crypto_utils import CryptoUtils  # noqa: E402
+from src.security_manager import SecurityManager  # noqa: E402
+
+PASSWORD = "benchmark_password"
+
+
+def _make_legacy_record(args: tuple) -> Dict[str, Any]:
+    """旧形式のアカウントレコードを1件作成"""
+    index, iterations = args
+    crypto = CryptoUtils(PASSWORD, key_cache_size=0)
+    crypto.PBKDF2_ITERATIONS = iterations
+    return {
+        "id": f"bench-{index:06d}",
+        "device_name": f"Device{index}",
+        "account_name": f"user{index}@example.com",
+        "issuer": f"Service{index % 50}",
+        "encrypted_secret": crypto.encrypt("JBSWY3DPEHPK3PXP"),
+        "created_at": "2025-01-26T10:00:00",
+        "updated_at": "2025-01-26T10:00:00",
+    }
+
+
+def build_legacy_vault(path: str, accounts: int, iterations: int) -> None:
+    """旧形式の合成ボールトを作成（作成自体も全コアで並列化）"""
+    with ProcessPoolExecutor() as executor:
+        records = list(
+            executor.map(
+                _make_legacy_record,
+                [(i, iterations) for i in range(accounts)],
+                chunksize=64,
+            )
+        )
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"accounts": records}, f)
+
+
+def worker_counts(max_workers: int) -> List[int]:
+    """計測するワーカー数（1, 2, 4, ... と最大値）"""
+    counts = []
+    workers = 1
+    while workers < max_workers:
+        counts.append(workers)
+        workers *= 2
+    counts.append(max_workers)
+    return counts
+
+
+def main() -> None:
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description="並列復号化ベンチマーク")
+    parser.add_argument("--accounts", type=int, default=10000, help="アカウント数")
+    parser.add_argument(
+        "--iterations",
+        type=int,
+        default=CryptoUtils.PBKDF2_ITERATIONS,
+        help="旧形式レコードのPBKDF2反復回数",
+    )
+    parser.add_argument(
+        "--max-workers", type=int, default=os.cpu_count() or 1, help="最大ワーカー数"
+    )
+    parser.add_argument("--chunk-size", type=int, default=16, help="チャンクサイズ")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source = os.path.join(temp_dir, "legacy.json")
+        print(
+            f"合成ボールトを作成中: {args.accounts}件, "
+            f"PBKDF2 {args.iterations}回/レコード"
+        )
+        build_legacy_vault(source, args.accounts, args.iterations)
+
+        print(f"{'workers':>8} {'seconds':>10} {'records/s':>12} {'speedup':>8}")
+        baseline = None
+        for workers in worker_counts(args.max_workers):
+            data_file = os.path.join(temp_dir, f"vault_{workers}.json")
+            shutil.copy(source, data_file)
+
+            CryptoUtils.PBKDF2_ITERATIONS = args.iterations
+            start = time.perf_counter()
+            manager = SecurityManager(
+                data_file=data_file,
+                password=PASSWORD,
+                decrypt_workers=workers,
+                decrypt_chunk_size=args.chunk_size,
+            )
+            decrypted = len(manager.get_all_accounts())
+            elapsed = time.perf_counter() - start
+            assert decrypted == args.accounts
+
+            baseline = baseline or elapsed
+            print(
+                f"{workers:>8} {elapsed:>10.2f} {args.accounts / elapsed:>12.1f} "
+                f"{baseline / elapsed:>7.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
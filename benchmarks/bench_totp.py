@@ -0,0 +1,106 @@
+"""
+TOTP生成ベンチマーク
+従来の経路（呼び出しごとに pyotp.TOTP(secret).now()）と、
+事前計算済みHMAC状態を再利用する TOTPEngine の生成速度（codes/s）を比較
+あわせて大量アカウントでの generate_multiple_otps と一括生成
+（TOTPEngine.generate_batch）の1回あたりの処理時間を比較
+
+使用例:
+  python benchmarks/bench_totp.py
+  python benchmarks/bench_totp.py --accounts 1000 --rounds 50
+  python benchmarks/bench_totp.py --batch-accounts 500000
+"""
+
+import argparse
+import base64
+import os
+import sys
+import time
+from typing import Callable, List
+
+import pyotp
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.otp_generator import OTPGenerator  # noqa: E402
+from src.totp_engine import TOTPEngine  # noqa: E402
+
+
+def make_secrets(accounts: int) -> List[str]:
+    """ベンチマーク用のBase32シークレットを作成"""
+    return [
+        base64.b32encode(os.urandom(20)).decode("ascii").rstrip("=")
+        for _ in range(accounts)
+    ]
+
+
+def measure(
+    generate: Callable[[str, int], str], secrets: List[str], rounds: int
+) -> float:
+    """
+    全シークレットを rounds 回生成したときの codes/s を返す
+    ラウンドごとに周期を進め、毎回HMACを計算させる
+    """
+    base_time = int(time.time())
+    start = time.perf_counter()
+    for round_index in range(rounds):
+        for_time = base_time + round_index * 30
+        for secret in secrets:
+            generate(secret, for_time)
+    elapsed = time.perf_counter() - start
+    return len(secrets) * rounds / elapsed
+
+
+def main() -> None:
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description="TOTP生成ベンチマーク")
+    parser.add_argument("--accounts", type=int, default=100, help="アカウント数")
+    parser.add_argument("--rounds", type=int, default=200, help="生成ラウンド数")
+    parser.add_argument(
+        "--batch-accounts", type=int, default=200000, help="一括生成のアカウント数"
+    )
+    args = parser.parse_args()
+
+    secrets = make_secrets(args.accounts)
+    engine = TOTPEngine()
+    now = time.time()
+
+    # 同一時刻で結果が一致することを先に確認
+    for secret in secrets:
+        assert engine.generate(secret, now) == pyotp.TOTP(secret).at(int(now))
+
+    baseline = measure(lambda s, t: pyotp.TOTP(s).at(t), secrets, args.rounds)
+    optimized = measure(engine.generate, secrets, args.rounds)
+
+    print(f"accounts={args.accounts} rounds={args.rounds}")
+    print(f"{'path':>16} {'codes/s':>12} {'speedup':>8}")
+    print(f"{'pyotp.TOTP':>16} {baseline:>12.0f} {1:>7.2f}x")
+    print(f"{'TOTPEngine':>16} {optimized:>12.0f} {optimized / baseline:>7.2f}x")
+
+    batch_secrets = make_secrets(args.batch_accounts)
+    accounts = [{"secret": secret} for secret in batch_secrets]
+    generator = OTPGenerator()
+    # 一括生成との比較のため、キャッシュなしの1回目の生成時間を計測
+    generator.engine = TOTPEngine(cache_size=0)
+
+    start = time.perf_counter()
+    otps = generator.generate_multiple_otps(accounts)
+    per_dict = time.perf_counter() - start
+
+    batch_engine = TOTPEngine()
+    keys = batch_engine.decode_secrets(batch_secrets)
+    start = time.perf_counter()
+    codes = batch_engine.format_codes(batch_engine.generate_batch(keys))
+    batch = time.perf_counter() - start
+
+    # 計測の間に周期をまたいでいなければ結果は一致する
+    if batch_engine.timecode() == batch_engine.timecode(time.time() - batch - per_dict):
+        assert codes == [otp["otp"] for otp in otps]
+    print(f"\nbatch accounts={args.batch_accounts}")
+    print(f"{'path':>24} {'seconds':>10} {'speedup':>8}")
+    print(f"{'generate_multiple_otps':>24} {per_dict:>10.3f} {1:>7.2f}x")
+    print(f"{'generate_batch':>24} {batch:>10.3f} {per_dict / batch:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
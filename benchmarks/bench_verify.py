@@ -0,0 +1,120 @@
+"""
+OTP検証ベンチマーク
+pyotp.TOTP(secret).verify と OTPGenerator.verify / verify_many の
+検証速度（verifications/s）を比較
+--replay を指定するとリプレイ防止ストアを有効にした検証も計測し、ストアのメトリクスを表示
+
+使用例:
+  python benchmarks/bench_verify.py
+  python benchmarks/bench_verify.py --accounts 1000 --requests 100000 --window 2
+  python benchmarks/bench_verify.py --replay --max-entries 10000
+"""
+
+import argparse
+import base64
+import os
+import random
+import sys
+import time
+from typing import Any, Dict, List, Tuple
+
+import pyotp
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.otp_generator import OTPGenerator  # noqa: E402
+from src.replay_store import ReplayStore  # noqa: E402
+
+
+def make_requests(
+    accounts: int, requests: int, window: int, now: float
+) -> List[Tuple[Dict[str, Any], str]]:
+    """
+    検証リクエストを作成（正しいコード・前後の周期のコード・誤りを混在）
+    """
+    records = [
+        {
+            "id": f"bench-{i:06d}",
+            "account_name": f"user{i}@example.com",
+            "secret": base64.b32encode(os.urandom(20)).decode("ascii"),
+        }
+        for i in range(accounts)
+    ]
+    rng = random.Random(0)
+    pairs = []
+    for _ in range(requests):
+        account = rng.choice(records)
+        offset = rng.randint(-window - 1, window + 1)
+        pairs.append((account, pyotp.TOTP(account["secret"]).at(now + offset * 30)))
+    return pairs
+
+
+def main() -> None:
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description="OTP検証ベンチマーク")
+    parser.add_argument("--accounts", type=int, default=1000, help="アカウント数")
+    parser.add_argument("--requests", type=int, default=50000, help="検証回数")
+    parser.add_argument("--window", type=int, default=1, help="許容する前後の周期数")
+    parser.add_argument(
+        "--replay", action="store_true", help="リプレイ防止ストアありでも計測"
+    )
+    parser.add_argument(
+        "--max-entries",
+        type=int,
+        default=ReplayStore.DEFAULT_MAX_ENTRIES,
+        help="リプレイ防止ストアの上限件数",
+    )
+    args = parser.parse_args()
+
+    now = time.time()
+    pairs = make_requests(args.accounts, args.requests, args.window, now)
+    generator = OTPGenerator()
+
+    start = time.perf_counter()
+    expected = [
+        pyotp.TOTP(account["secret"]).verify(code, now, args.window)
+        for account, code in pairs
+    ]
+    baseline = time.perf_counter() - start
+
+    start = time.perf_counter()
+    single = [
+        generator.verify(account, code, args.window, now) for account, code in pairs
+    ]
+    single_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = generator.verify_many(pairs, args.window, now)
+    batch_time = time.perf_counter() - start
+
+    assert single == expected and batch == expected
+
+    print(
+        f"accounts={args.accounts} requests={args.requests} window=±{args.window} "
+        f"accepted={sum(expected)}"
+    )
+    print(f"{'path':>20} {'verify/s':>12} {'speedup':>8}")
+    timings = [
+        ("pyotp.TOTP.verify", baseline),
+        ("OTPGenerator.verify", single_time),
+        ("verify_many", batch_time),
+    ]
+
+    store = None
+    if args.replay:
+        store = ReplayStore(max_entries=args.max_entries)
+        replay_generator = OTPGenerator(replay_store=store)
+        start = time.perf_counter()
+        replay_generator.verify_many(pairs, args.window, now)
+        timings.append(("verify_many+replay", time.perf_counter() - start))
+
+    for name, elapsed in timings:
+        print(
+            f"{name:>20} {args.requests / elapsed:>12.0f} {baseline / elapsed:>7.2f}x"
+        )
+    if store is not None:
+        print(f"replay store: {store.metrics()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1148 @@
+"""
+アカウントデータ保存モジュール
+SecurityManagerが使用するストレージの共通インターフェースと、
+JSONファイル（既定）・SQLiteの各バックエンドを提供
+
+JSONファイルバックエンドはスナップショット（accounts.json）と追記専用ジャーナルで
+永続化する。変更操作はジャーナルファイル（<data_file>.journal）へ1行1レコードで追記し、
+読み込み時にスナップショットへ再適用する。ジャーナルのレコードは
+「アカウント全体の上書き（put）」「削除（delete）」「全削除（clear）」のみで冪等なため、
+コンパクション途中でクラッシュしても再適用の結果は変わらない。
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+from contextlib import suppress
+from bisect import bisect_left, insort
+from datetime import datetime
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# SQLiteバックエンドを使用するデータファイルの拡張子
+SQLITE_EXTENSIONS = (".db", ".sqlite", ".sqlite3")
+
+
+def get_group_commit_window() -> float:
+    """
+    グループコミットの待機時間を取得（環境変数OTP_GROUP_COMMIT_MS、既定は0）
+
+    Returns:
+        待機時間（秒）。0の場合は書き込みごとにfsyncする
+    """
+    return max(0.0, float(os.environ.get("OTP_GROUP_COMMIT_MS", "0") or 0) / 1000)
+
+
+def _fsync_directory(path: str) -> None:
+    """
+    ディレクトリエントリの変更（作成・リネーム・削除）を永続化
+
+    Args:
+        path: ディレクトリのパス
+    """
+    if os.name != "posix":
+        return
+    fd = os.open(path or ".", os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_file_atomic(path: str, content: bytes) -> None:
+    """
+    一時ファイルへの書き込み・fsync・リネームでファイルを置き換え
+
+    書き込み途中で中断（クラッシュ・SIGTERMによるsys.exitなど）されても
+    元のファイルは変更されない。一時ファイルは所有者のみ読み書き可能で作成される。
+
+    Args:
+        path: 書き込み先のパス
+        content: 書き込む内容
+    """
+    directory = os.path.dirname(path)
+    fd, temp_path = tempfile.mkstemp(
+        dir=directory or ".", prefix=os.path.basename(path) + ".", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        with suppress(FileNotFoundError):
+            os.remove(temp_path)
+        raise
+    _fsync_directory(directory)
+
+
+class JournalStorage:
+    """スナップショット＋追記専用ジャーナルによるファイル永続化（JsonFileStorageが使用）"""
+
+    # ジャーナルファイルの拡張子
+    JOURNAL_SUFFIX = ".journal"
+    # コンパクションを行うジャーナルレコード数の下限
+    COMPACT_MIN_ENTRIES = 256
+    # ジャーナルサイズがスナップショットサイズのこの倍率を超えたらコンパクション
+    COMPACT_RATIO = 1.0
+    # スナップショットに関係なくコンパクションを行うジャーナルサイズ（バイト）
+    COMPACT_MAX_BYTES = 8 * 1024 * 1024
+
+    def __init__(
+        self,
+        data_file: str,
+        background_compaction: bool = True,
+        group_commit_window: float = 0.0,
+    ):
+        """
+        初期化
+
+        Args:
+            data_file: スナップショットファイルのパス
+            background_compaction: コンパクションをバックグラウンドスレッドで行うか
+            group_commit_window: 追記のfsyncをまとめる待機時間（秒）。
+                0の場合は追記ごとにfsyncする。正の場合は追記をOSに書き込んで直ちに戻り、
+                待機時間内の追記を1回のfsyncでまとめて永続化する
+                （プロセスの異常終了では失われないが、電源断では最大この時間分を失う）
+        """
+        self.data_file = data_file
+        self.journal_file = data_file + self.JOURNAL_SUFFIX
+        self.background_compaction = background_compaction
+        self.group_commit_window = group_commit_window
+        self._lock = threading.Lock()
+        self._compaction_thread: Optional[threading.Thread] = None
+        self._sync_timer: Optional[threading.Timer] = None
+        # fsync済みでない追記があるか
+        self._unsynced = False
+        # ジャーナルのfsync回数
+        self.fsync_count = 0
+        # スナップショットを書き換えるたびに増加（古いコンパクション結果の破棄に使用）
+        self._generation = 0
+        self._journal_entries = 0
+        self._journal_size = 0
+        self._snapshot_size = 0
+
+    @property
+    def journal_entries(self) -> int:
+        """ジャーナル内のレコード数"""
+        return self._journal_entries
+
+    def load(self) -> Dict[str, Any]:
+        """
+        スナップショットを読み込み、ジャーナルを再適用
+
+        Returns:
+            アカウントデータ（スナップショットが存在しない場合は空の辞書）
+        """
+        self.wait_for_compaction()
+        data: Dict[str, Any] = {}
+        if os.path.exists(self.data_file):
+            with open(self.data_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._snapshot_size = os.path.getsize(self.data_file)
+        else:
+            self._snapshot_size = 0
+
+        entries = self._read_journal()
+        if entries:
+            accounts = {account["id"]: account for account in data.get("accounts", [])}
+            for entry in entries:
+                self._apply(accounts, entry)
+            data["accounts"] = list(accounts.values())
+        return data
+
+    def _apply(
+        self, accounts: Dict[str, Dict[str, Any]], entry: Dict[str, Any]
+    ) -> None:
+        """
+        ジャーナルレコードを適用
+
+        Args:
+            accounts: アカウントID → レコードの辞書（更新される）
+            entry: ジャーナルレコード
+        """
+        if entry["op"] == "put":
+            accounts[entry["account"]["id"]] = entry["account"]
+        elif entry["op"] == "delete":
+            accounts.pop(entry["id"], None)
+        elif entry["op"] == "clear":
+            accounts.clear()
+        elif entry["op"] == "batch":
+            # 一括変更は1行に記録されるため、全体が適用されるか全く適用されないか
+            for batch_entry in entry["entries"]:
+                self._apply(accounts, batch_entry)
+
+    def _read_journal(self) -> List[Dict[str, Any]]:
+        """
+        ジャーナルを読み込み（書き込み途中で中断された末尾のレコードは切り捨て）
+
+        Returns:
+            ジャーナルレコードのリスト
+        """
+        self._journal_entries = 0
+        self._journal_size = 0
+        if not os.path.exists(self.journal_file):
+            return []
+
+        with open(self.journal_file, "rb") as f:
+            content = f.read()
+
+        entries = []
+        offset = 0
+        while offset < len(content):
+            end = content.find(b"\n", offset)
+            if end == -1:
+                break
+            try:
+                entries.append(json.loads(content[offset:end]))
+            except ValueError:
+                break
+            offset = end + 1
+
+        if offset < len(content):
+            # 不完全なレコード以降を削除（後続の追記と連結されないように）
+            print(f"ジャーナルの不完全なレコードを破棄しました: {self.journal_file}")
+            os.truncate(self.journal_file, offset)
+
+        self._journal_entries = len(entries)
+        self._journal_size = offset
+        return entries
+
+    def append(self, entries: List[Dict[str, Any]]) -> None:
+        """
+        ジャーナルにレコードを追記（group_commit_windowが0の場合はfsync後に戻る）
+
+        Args:
+            entries: ジャーナルレコードのリスト（{"op": "put", "account": {...}}、
+                {"op": "delete", "id": ...}、{"op": "clear"}、
+                または一括変更の{"op": "batch", "entries": [...]}）
+        """
+        payload = "".join(
+            json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries
+        ).encode("utf-8")
+        with self._lock:
+            created = self._journal_size == 0
+            # スナップショットと同様に所有者のみ読み書き可能で作成する
+            fd = os.open(
+                self.journal_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600
+            )
+            with os.fdopen(fd, "ab") as f:
+                f.write(payload)
+                f.flush()
+                if self.group_commit_window <= 0:
+                    os.fsync(f.fileno())
+                    self.fsync_count += 1
+            if created:
+                _fsync_directory(os.path.dirname(self.journal_file))
+            self._journal_size += len(payload)
+            self._journal_entries += len(entries)
+
+            if self.group_commit_window > 0:
+                self._unsynced = True
+                if self._sync_timer is None:
+                    # 最初の追記から待機時間後に、それまでの追記をまとめてfsync
+                    self._sync_timer = threading.Timer(
+                        self.group_commit_window, self.sync
+                    )
+                    self._sync_timer.start()
+
+    def sync(self) -> None:
+        """fsync済みでない追記を永続化"""
+        with self._lock:
+            if self._sync_timer is not None:
+                self._sync_timer.cancel()
+                self._sync_timer = None
+            if not self._unsynced:
+                return
+            if os.path.exists(self.journal_file):
+                fd = os.open(self.journal_file, os.O_RDONLY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+                self.fsync_count += 1
+            self._unsynced = False
+
+    def needs_compaction(self) -> bool:
+        """
+        コンパクションが必要か判定
+
+        Returns:
+            ジャーナルが閾値を超えている場合True
+        """
+        if self._journal_entries < self.COMPACT_MIN_ENTRIES:
+            return False
+        return (
+            self._journal_size >= self._snapshot_size * self.COMPACT_RATIO
+            or self._journal_size >= self.COMPACT_MAX_BYTES
+        )
+
+    def compact(self, data: Dict[str, Any]) -> None:
+        """
+        現在のデータをスナップショットに書き出し、反映済みのジャーナルを削除
+
+        background_compactionがTrueの場合はバックグラウンドスレッドで行う
+        （実行中のコンパクションがある場合は何もしない）。
+
+        Args:
+            data: 現在のアカウントデータ（呼び出し時点の内容を書き出す）
+        """
+        if self._compaction_thread is not None and self._compaction_thread.is_alive():
+            return
+
+        with self._lock:
+            generation = self._generation
+            journal_offset = self._journal_size
+
+        if not self.background_compaction:
+            self._compact(data, generation, journal_offset)
+            return
+
+        self._compaction_thread = threading.Thread(
+            target=self._compact,
+            args=(data, generation, journal_offset),
+            name="journal-compaction",
+        )
+        self._compaction_thread.start()
+
+    def _compact(
+        self, data: Dict[str, Any], generation: int, journal_offset: int
+    ) -> None:
+        """
+        コンパクションの実処理
+
+        Args:
+            data: 書き出すアカウントデータ
+            generation: データ取得時点のスナップショット世代
+            journal_offset: データに反映済みのジャーナルの位置（バイト）
+        """
+        try:
+            # 直列化はロック外で行い、その間の追記を妨げない
+            content = self._serialize(data)
+            with self._lock:
+                if self._generation != generation:
+                    # 取得後にスナップショットが書き換えられた場合は破棄
+                    return
+                self._replace_snapshot(content)
+                self._truncate_journal(journal_offset)
+        except Exception as e:
+            print(f"ジャーナルのコンパクションエラー: {str(e)}")
+
+    def write_snapshot(self, data: Dict[str, Any]) -> None:
+        """
+        スナップショットを書き出し、ジャーナルを破棄（同期処理）
+
+        Args:
+            data: 現在のアカウントデータ（全件）
+        """
+        content = self._serialize(data)
+        with self._lock:
+            self._replace_snapshot(content)
+            self._truncate_journal(self._journal_size)
+
+    def restore_snapshot(self, backup_file: str) -> None:
+        """
+        バックアップをスナップショットとしてアトミックに書き戻し、ジャーナルを破棄
+
+        Args:
+            backup_file: バックアップファイルのパス
+        """
+        self.wait_for_compaction()
+        with open(backup_file, "rb") as f:
+            content = f.read()
+        with self._lock:
+            self._replace_snapshot(content)
+            self._truncate_journal(self._journal_size)
+
+    def copy_snapshot(self, backup_file: str) -> None:
+        """
+        スナップショットを別のファイルにアトミックにコピー
+
+        Args:
+            backup_file: コピー先のパス
+        """
+        with self._lock:
+            with open(self.data_file, "rb") as f:
+                content = f.read()
+        write_file_atomic(backup_file, content)
+
+    def close(self) -> None:
+        """保留中のfsyncとコンパクションを完了"""
+        self.sync()
+        self.wait_for_compaction()
+
+    def wait_for_compaction(self) -> None:
+        """実行中のコンパクションの完了を待機"""
+        if self._compaction_thread is not None:
+            self._compaction_thread.join()
+            self._compaction_thread = None
+
+    def _serialize(self, data: Dict[str, Any]) -> bytes:
+        """
+        スナップショットの内容を作成
+
+        Args:
+            data: アカウントデータ
+
+        Returns:
+            JSON形式のバイト列
+        """
+        return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+
+    def _replace_snapshot(self, content: bytes) -> None:
+        """
+        スナップショットをアトミックに置き換え（ロック取得済みで呼び出す）
+
+        Args:
+            content: スナップショットの内容
+        """
+        write_file_atomic(self.data_file, content)
+        self._snapshot_size = len(content)
+        self._generation += 1
+
+    def _truncate_journal(self, journal_offset: int) -> None:
+        """
+        ジャーナルの先頭から指定位置までを削除（ロック取得済みで呼び出す）
+
+        Args:
+            journal_offset: スナップショットに反映済みの位置（バイト）
+        """
+        # 残りのジャーナルはアトミックに書き直すため、保留中のfsyncは不要になる
+        self._unsynced = False
+        if journal_offset >= self._journal_size:
+            if os.path.exists(self.journal_file):
+                os.remove(self.journal_file)
+                _fsync_directory(os.path.dirname(self.journal_file))
+            self._journal_entries = 0
+            self._journal_size = 0
+            return
+
+        # コンパクション中に追記されたレコードを残す
+        with open(self.journal_file, "rb") as f:
+            f.seek(journal_offset)
+            tail = f.read(self._journal_size - journal_offset)
+        write_file_atomic(self.journal_file, tail)
+        self._journal_entries = tail.count(b"\n")
+        self._journal_size = len(tail)
+
+
+class AccountStorage:
+    """
+    アカウントデータストレージの基底クラス
+
+    アカウントはIDをキーとする暗号化済みレコード（辞書）として扱い、
+    登録順を保持する。メタデータ（形式バージョン・ボールトヘッダー）は
+    レコードとは別に保存する。
+    """
+
+    def exists(self) -> bool:
+        """
+        保存先が既に存在するか確認
+
+        Returns:
+            存在する場合True
+        """
+        raise NotImplementedError
+
+    def load(self) -> Dict[str, Any]:
+        """
+        保存済みのデータを読み込み
+
+        Returns:
+            メタデータ（"version"・"vault"。未保存の場合は空の辞書）
+        """
+        raise NotImplementedError
+
+    def save(self, metadata: Dict[str, Any]) -> None:
+        """
+        メタデータを保存し、全データを永続化
+
+        Args:
+            metadata: メタデータ（"version"・"vault"）
+        """
+        raise NotImplementedError
+
+    def get(self, account_id: str) -> Optional[Dict[str, Any]]:
+        """
+        アカウントレコードを取得
+
+        Args:
+            account_id: アカウントID
+
+        Returns:
+            アカウントレコード（存在しない場合はNone）
+        """
+        raise NotImplementedError
+
+    def put(self, account: Dict[str, Any]) -> None:
+        """
+        アカウントレコードを追加または上書き（上書き時は登録順を変えない）
+
+        Args:
+            account: アカウントレコード
+        """
+        self.put_many([account])
+
+    def put_many(self, accounts: List[Dict[str, Any]]) -> None:
+        """
+        複数のアカウントレコードを追加または上書き
+
+        Args:
+            accounts: アカウントレコードのリスト
+        """
+        raise NotImplementedError
+
+    def delete(self, account_id: str) -> bool:
+        """
+        アカウントレコードを削除
+
+        Args:
+            account_id: アカウントID
+
+        Returns:
+            削除した場合True
+        """
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        """全てのアカウントレコードを削除"""
+        raise NotImplementedError
+
+    def count(self) -> int:
+        """
+        アカウント数を取得
+
+        Returns:
+            アカウント数
+        """
+        raise NotImplementedError
+
+    def iter_accounts(self) -> Iterator[Dict[str, Any]]:
+        """
+        全アカウントレコードを登録順に取得
+
+        Returns:
+            アカウントレコードのイテレータ
+        """
+        raise NotImplementedError
+
+    def list_page(
+        self, offset: int = 0, limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        アカウントレコードを登録順にページ単位で取得
+
+        Args:
+            offset: 先頭から読み飛ばす件数
+            limit: 取得件数の上限（Noneの場合は全件）
+
+        Returns:
+            アカウントレコードのリスト
+        """
+        stop = None if limit is None else offset + limit
+        return list(islice(self.iter_accounts(), offset, stop))
+
+    def search(
+        self, keyword: str, offset: int = 0, limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        デバイス名・アカウント名・発行者名の部分一致（大文字小文字を区別しない）で検索
+
+        Args:
+            keyword: 検索キーワード
+            offset: 先頭から読み飛ばす件数
+            limit: 取得件数の上限（Noneの場合は全件）
+
+        Returns:
+            マッチしたアカウントレコードのリスト（登録順）
+        """
+        keyword_lower = keyword.lower()
+        matches = (
+            account
+            for account in self.iter_accounts()
+            if any(
+                keyword_lower in account.get(field, "").lower()
+                for field in ("device_name", "account_name", "issuer")
+            )
+        )
+        stop = None if limit is None else offset + limit
+        return list(islice(matches, offset, stop))
+
+    def find_ids(self, prefix: str, limit: Optional[int] = None) -> List[str]:
+        """
+        前方一致するアカウントIDを検索
+
+        Args:
+            prefix: アカウントIDの先頭部分
+            limit: 返す件数の上限（Noneの場合は全件）
+
+        Returns:
+            前方一致したアカウントIDのリスト（昇順）
+        """
+        raise NotImplementedError
+
+    def find_legacy_accounts(
+        self, record_prefix: str, limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        暗号文がrecord_prefixで始まらない（旧形式の）レコードを取得
+
+        Args:
+            record_prefix: 現行形式の暗号文の接頭辞
+            limit: 取得件数の上限（Noneの場合は全件）
+
+        Returns:
+            旧形式のアカウントレコードのリスト（登録順）
+        """
+        legacy = (
+            account
+            for account in self.iter_accounts()
+            if "encrypted_secret" in account
+            and not account["encrypted_secret"].startswith(record_prefix)
+        )
+        return list(islice(legacy, limit))
+
+    def begin(self) -> None:
+        """トランザクションを開始（commit()まで変更を保存先に書き込まない）"""
+        raise NotImplementedError
+
+    def commit(self) -> None:
+        """トランザクション中の変更を1回の書き込みで保存"""
+        raise NotImplementedError
+
+    def rollback(self) -> None:
+        """トランザクション中の変更を破棄"""
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        """保留中の内容を保存先に反映（バックアップ前などに使用）"""
+
+    def backup(self, backup_file: str) -> None:
+        """
+        データをバックアップ
+
+        Args:
+            backup_file: バックアップファイルのパス
+        """
+        raise NotImplementedError
+
+    def restore(self, backup_file: str) -> None:
+        """
+        バックアップからデータを復元（復元後はload()で読み込み直す）
+
+        Args:
+            backup_file: バックアップファイルのパス
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """ストレージを閉じる"""
+
+
+class JsonFileStorage(AccountStorage):
+    """
+    JSONファイルストレージ（既定）
+
+    全レコードをIDをキーとする挿入順の辞書としてメモリに保持し、
+    変更はJournalStorageのジャーナルへ追記する。
+    """
+
+    def __init__(
+        self,
+        data_file: str,
+        background_compaction: bool = True,
+        group_commit_window: float = 0.0,
+    ):
+        """
+        初期化
+
+        Args:
+            data_file: データファイル（スナップショット）のパス
+            background_compaction: コンパクションをバックグラウンドスレッドで行うか
+            group_commit_window: ジャーナル追記のfsyncをまとめる待機時間（秒）
+        """
+        self.data_file = data_file
+        self.journal = JournalStorage(
+            data_file, background_compaction, group_commit_window
+        )
+        self._metadata: Dict[str, Any] = {}
+        # アカウントID → レコードの索引（挿入順を保持し、保存時の並び順にもなる）
+        self._accounts: Dict[str, Dict[str, Any]] = {}
+        # 前方一致検索用のソート済みID（初回の前方一致検索時に構築）
+        self._sorted_ids: Optional[List[str]] = None
+        # トランザクション中のジャーナルレコードと、開始時点のデータ（ロールバック用）
+        self._transaction: Optional[List[Dict[str, Any]]] = None
+        self._committed: Optional[
+            Tuple[Dict[str, Dict[str, Any]], Optional[List[str]]]
+        ] = None
+
+    def exists(self) -> bool:
+        return os.path.exists(self.data_file)
+
+    def load(self) -> Dict[str, Any]:
+        self._accounts = {}
+        self._sorted_ids = None
+        data = self.journal.load()
+        self._accounts = {
+            account["id"]: account for account in data.get("accounts", [])
+        }
+        self._metadata = {
+            key: value for key, value in data.items() if key in ("version", "vault")
+        }
+        return dict(self._metadata)
+
+    def save(self, metadata: Dict[str, Any]) -> None:
+        self._metadata = dict(metadata)
+        self.journal.write_snapshot(self._snapshot_data())
+
+    def _snapshot_data(self) -> Dict[str, Any]:
+        """
+        スナップショットとして保存するデータを作成
+
+        Returns:
+            データファイルの内容
+        """
+        # トランザクション中はコミット済みのデータのみを書き出す
+        accounts = self._committed[0] if self._committed is not None else self._accounts
+        return {
+            **self._metadata,
+            "accounts": list(accounts.values()),
+            "last_updated": datetime.now().isoformat(),
+        }
+
+    def _write(self, entries: List[Dict[str, Any]]) -> None:
+        """
+        ジャーナルレコードを書き込み（トランザクション中はコミットまで保留）
+
+        Args:
+            entries: ジャーナルレコードのリスト
+        """
+        if self._transaction is not None:
+            self._transaction.extend(entries)
+        else:
+            self.journal.append(entries)
+
+    def _compact_if_needed(self) -> None:
+        """ジャーナルが閾値を超えた場合はコンパクションを開始（メモリ上の変更後に呼ぶ）"""
+        if self._transaction is None and self.journal.needs_compaction():
+            self.journal.compact(self._snapshot_data())
+
+    def get(self, account_id: str) -> Optional[Dict[str, Any]]:
+        return self._accounts.get(account_id)
+
+    def put_many(self, accounts: List[Dict[str, Any]]) -> None:
+        if not accounts:
+            return
+        # 追記に成功してからメモリ上のデータを更新
+        self._write([{"op": "put", "account": account} for account in accounts])
+        for account in accounts:
+            if account["id"] not in self._accounts and self._sorted_ids is not None:
+                insort(self._sorted_ids, account["id"])
+            self._accounts[account["id"]] = account
+        self._compact_if_needed()
+
+    def delete(self, account_id: str) -> bool:
+        if account_id not in self._accounts:
+            return False
+        self._write([{"op": "delete", "id": account_id}])
+        del self._accounts[account_id]
+        if self._sorted_ids is not None:
+            del self._sorted_ids[bisect_left(self._sorted_ids, account_id)]
+        self._compact_if_needed()
+        return True
+
+    def clear(self) -> None:
+        if self._transaction is not None:
+            self._transaction.append({"op": "clear"})
+            self._accounts = {}
+            self._sorted_ids = None
+            return
+        self._accounts = {}
+        self._sorted_ids = None
+        self.save(self._metadata)
+
+    def begin(self) -> None:
+        if self._transaction is not None:
+            raise Exception("トランザクションは既に開始されています")
+        self._committed = (
+            dict(self._accounts),
+            None if self._sorted_ids is None else list(self._sorted_ids),
+        )
+        self._transaction = []
+
+    def commit(self) -> None:
+        entries = self._transaction or []
+        if entries:
+            try:
+                # 1行にまとめて追記（書き込み途中で中断された行は読み込み時に破棄される）
+                self.journal.append([{"op": "batch", "entries": entries}])
+            except Exception:
+                self.rollback()
+                raise
+        self._transaction = None
+        self._committed = None
+        self._compact_if_needed()
+
+    def rollback(self) -> None:
+        if self._committed is not None:
+            self._accounts, self._sorted_ids = self._committed
+        self._transaction = None
+        self._committed = None
+
+    def count(self) -> int:
+        return len(self._accounts)
+
+    def iter_accounts(self) -> Iterator[Dict[str, Any]]:
+        return iter(list(self._accounts.values()))
+
+    def find_ids(self, prefix: str, limit: Optional[int] = None) -> List[str]:
+        # ソート済みIDの二分探索
+        if self._sorted_ids is None:
+            self._sorted_ids = sorted(self._accounts)
+
+        matches: List[str] = []
+        for i in range(bisect_left(self._sorted_ids, prefix), len(self._sorted_ids)):
+            account_id = self._sorted_ids[i]
+            if not account_id.startswith(prefix) or (
+                limit is not None and len(matches) >= limit
+            ):
+                break
+            matches.append(account_id)
+        return matches
+
+    def flush(self) -> None:
+        self.journal.wait_for_compaction()
+        self.save(self._metadata)
+
+    def backup(self, backup_file: str) -> None:
+        # ジャーナルの内容をスナップショットに統合してからコピー
+        self.flush()
+        self.journal.copy_snapshot(backup_file)
+
+    def restore(self, backup_file: str) -> None:
+        self.journal.restore_snapshot(backup_file)
+
+    def close(self) -> None:
+        self.journal.close()
+
+
+class SQLiteStorage(AccountStorage):
+    """
+    SQLiteストレージ
+
+    ID・発行者名・アカウント名・デバイス名を列として持ち、レコード全体はJSONとして
+    data列に保存する。発行者名・アカウント名・デバイス名は書き込み時にstr.lower()で
+    変換した列（JsonFileStorageと同じ大文字小文字の扱い）も持ち、検索はその列の
+    FTS5 trigram索引で行う。WALモードで動作し、
+    SQL文は固定文字列のプレースホルダ形式のためsqlite3の文キャッシュで
+    プリペアドステートメントとして再利用される。
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS metadata (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS accounts (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            id TEXT NOT NULL UNIQUE,
+            device_name TEXT NOT NULL DEFAULT '',
+            account_name TEXT NOT NULL DEFAULT '',
+            issuer TEXT NOT NULL DEFAULT '',
+            device_name_fold TEXT NOT NULL DEFAULT '',
+            account_name_fold TEXT NOT NULL DEFAULT '',
+            issuer_fold TEXT NOT NULL DEFAULT '',
+            encrypted_secret TEXT,
+            data TEXT NOT NULL
+        );
+        CREATE VIRTUAL TABLE IF NOT EXISTS accounts_search USING fts5(
+            device_name_fold, account_name_fold, issuer_fold,
+            content='accounts', content_rowid='seq',
+            tokenize='trigram case_sensitive 1'
+        );
+        CREATE TRIGGER IF NOT EXISTS accounts_search_insert
+        AFTER INSERT ON accounts BEGIN
+            INSERT INTO accounts_search
+                (rowid, device_name_fold, account_name_fold, issuer_fold)
+            VALUES
+                (new.seq, new.device_name_fold, new.account_name_fold, new.issuer_fold);
+        END;
+        CREATE TRIGGER IF NOT EXISTS accounts_search_delete
+        AFTER DELETE ON accounts BEGIN
+            INSERT INTO accounts_search
+                (accounts_search, rowid, device_name_fold, account_name_fold,
+                 issuer_fold)
+            VALUES
+                ('delete', old.seq, old.device_name_fold, old.account_name_fold,
+                 old.issuer_fold);
+        END;
+        CREATE TRIGGER IF NOT EXISTS accounts_search_update
+        AFTER UPDATE OF device_name_fold, account_name_fold, issuer_fold
+        ON accounts BEGIN
+            INSERT INTO accounts_search
+                (accounts_search, rowid, device_name_fold, account_name_fold,
+                 issuer_fold)
+            VALUES
+                ('delete', old.seq, old.device_name_fold, old.account_name_fold,
+                 old.issuer_fold);
+            INSERT INTO accounts_search
+                (rowid, device_name_fold, account_name_fold, issuer_fold)
+            VALUES
+                (new.seq, new.device_name_fold, new.account_name_fold, new.issuer_fold);
+        END;
+    """
+
+    UPSERT_SQL = """
+        INSERT INTO accounts
+            (id, device_name, account_name, issuer,
+             device_name_fold, account_name_fold, issuer_fold, encrypted_secret, data)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(id) DO UPDATE SET
+            device_name = excluded.device_name,
+            account_name = excluded.account_name,
+            issuer = excluded.issuer,
+            device_name_fold = excluded.device_name_fold,
+            account_name_fold = excluded.account_name_fold,
+            issuer_fold = excluded.issuer_fold,
+            encrypted_secret = excluded.encrypted_secret,
+            data = excluded.data
+    """
+
+    # trigram索引で検索できるキーワードの最小文字数
+    SEARCH_MIN_TRIGRAM = 3
+
+    SEARCH_SQL = """
+        SELECT data FROM accounts
+        WHERE seq IN (
+            SELECT rowid FROM accounts_search WHERE accounts_search MATCH ?1
+        )
+        ORDER BY seq LIMIT ?2 OFFSET ?3
+    """
+
+    # trigram索引を使えない短いキーワード用（変換済みの列を走査）
+    SHORT_SEARCH_SQL = """
+        SELECT data FROM accounts
+        WHERE instr(device_name_fold, ?1) > 0
+            OR instr(account_name_fold, ?1) > 0
+            OR instr(issuer_fold, ?1) > 0
+        ORDER BY seq LIMIT ?2 OFFSET ?3
+    """
+
+    def __init__(self, db_file: str, synchronous: str = "FULL"):
+        """
+        初期化
+
+        Args:
+            db_file: データベースファイルのパス
+            synchronous: PRAGMA synchronousの値（"FULL"はコミットごとにfsync、
+                "NORMAL"はWALのチェックポイント時にまとめてfsync）
+        """
+        self.db_file = db_file
+        self.synchronous = synchronous
+        self._conn: Optional[sqlite3.Connection] = None
+        self._in_transaction = False
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """データベース接続（初回アクセス時に接続）"""
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_file)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f"PRAGMA synchronous={self.synchronous}")
+            conn.executescript(self.SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def exists(self) -> bool:
+        return os.path.exists(self.db_file)
+
+    def load(self) -> Dict[str, Any]:
+        return {
+            key: json.loads(value)
+            for key, value in self.conn.execute("SELECT key, value FROM metadata")
+        }
+
+    def save(self, metadata: Dict[str, Any]) -> None:
+        self._write(
+            "INSERT OR REPLACE INTO metadata (key, value) VALUES (?, ?)",
+            [(key, json.dumps(value)) for key, value in metadata.items()],
+            many=True,
+        )
+
+    def _write(
+        self, sql: str, parameters: Sequence[Any] = (), many: bool = False
+    ) -> sqlite3.Cursor:
+        """
+        更新系のSQLを実行（トランザクション外では直ちにコミット）
+
+        Args:
+            sql: SQL文
+            parameters: パラメータ（manyがTrueの場合はパラメータのリスト）
+            many: executemanyで実行するか
+
+        Returns:
+            カーソル
+        """
+        try:
+            if many:
+                cursor = self.conn.executemany(sql, parameters)
+            else:
+                cursor = self.conn.execute(sql, parameters)
+        except Exception:
+            if not self._in_transaction:
+                self.conn.rollback()
+            raise
+        if not self._in_transaction:
+            self.conn.commit()
+        return cursor
+
+    def _row(self, account: Dict[str, Any]) -> tuple:
+        """
+        アカウントレコードをaccountsテーブルの行に変換
+
+        Args:
+            account: アカウントレコード
+
+        Returns:
+            UPSERT_SQLのパラメータ
+        """
+        device_name = account.get("device_name", "")
+        account_name = account.get("account_name", "")
+        issuer = account.get("issuer", "")
+        return (
+            account["id"],
+            device_name,
+            account_name,
+            issuer,
+            device_name.lower(),
+            account_name.lower(),
+            issuer.lower(),
+            account.get("encrypted_secret"),
+            json.dumps(account, ensure_ascii=False),
+        )
+
+    def get(self, account_id: str) -> Optional[Dict[str, Any]]:
+        row = self.conn.execute(
+            "SELECT data FROM accounts WHERE id = ?", (account_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_many(self, accounts: List[Dict[str, Any]]) -> None:
+        self._write(
+            self.UPSERT_SQL, [self._row(account) for account in accounts], many=True
+        )
+
+    def delete(self, account_id: str) -> bool:
+        cursor = self._write("DELETE FROM accounts WHERE id = ?", (account_id,))
+        return cursor.rowcount > 0
+
+    def clear(self) -> None:
+        self._write("DELETE FROM accounts")
+
+    def begin(self) -> None:
+        if self._in_transaction:
+            raise Exception("トランザクションは既に開始されています")
+        self.conn.execute("BEGIN IMMEDIATE")
+        self._in_transaction = True
+
+    def commit(self) -> None:
+        try:
+            self.conn.commit()
+        except Exception:
+            self.rollback()
+            raise
+        self._in_transaction = False
+
+    def rollback(self) -> None:
+        self.conn.rollback()
+        self._in_transaction = False
+
+    def count(self) -> int:
+        return int(self.conn.execute("SELECT COUNT(*) FROM accounts").fetchone()[0])
+
+    def iter_accounts(self) -> Iterator[Dict[str, Any]]:
+        for (data,) in self.conn.execute("SELECT data FROM accounts ORDER BY seq"):
+            yield json.loads(data)
+
+    def list_page(
+        self, offset: int = 0, limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        rows = self.conn.execute(
+            "SELECT data FROM accounts ORDER BY seq LIMIT ? OFFSET ?",
+            (-1 if limit is None else limit, offset),
+        )
+        return [json.loads(data) for (data,) in rows]
+
+    def search(
+        self, keyword: str, offset: int = 0, limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        keyword_lower = keyword.lower()
+        if len(keyword_lower) >= self.SEARCH_MIN_TRIGRAM:
+            # キーワード全体を1つのフレーズとして部分一致させる
+            sql = self.SEARCH_SQL
+            query = '"' + keyword_lower.replace('"', '""') + '"'
+        else:
+            sql = self.SHORT_SEARCH_SQL
+            query = keyword_lower
+        # JSONを復号するのはマッチした行のみ
+        rows = self.conn.execute(sql, (query, -1 if limit is None else limit, offset))
+        return [json.loads(data) for (data,) in rows]
+
+    def find_ids(self, prefix: str, limit: Optional[int] = None) -> List[str]:
+        # id列のUNIQUE索引による範囲検索
+        rows = self.conn.execute(
+            "SELECT id FROM accounts WHERE id >= ? AND id < ? ORDER BY id LIMIT ?",
+            (prefix, prefix + chr(0x10FFFF), -1 if limit is None else limit),
+        )
+        return [account_id for (account_id,) in rows]
+
+    def find_legacy_accounts(
+        self, record_prefix: str, limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        rows = self.conn.execute(
+            "SELECT data FROM accounts"
+            " WHERE substr(encrypted_secret, 1, ?) != ? ORDER BY seq LIMIT ?",
+            (len(record_prefix), record_prefix, -1 if limit is None else limit),
+        )
+        return [json.loads(data) for (data,) in rows]
+
+    def backup(self, backup_file: str) -> None:
+        target = sqlite3.connect(backup_file)
+        try:
+            self.conn.backup(target)
+        finally:
+            target.close()
+
+    def restore(self, backup_file: str) -> None:
+        source = sqlite3.connect(backup_file)
+        try:
+            source.backup(self.conn)
+        finally:
+            source.close()
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def create_storage(data_file: str) -> AccountStorage:
+    """
+    データファイルの拡張子に応じたストレージを作成
+
+    Args:
+        data_file: データファイルのパス（.db/.sqlite/.sqlite3の場合はSQLite）
+
+    Returns:
+        ストレージインスタンス
+    """
+    group_commit_window = get_group_commit_window()
+    if data_file.lower().endswith(SQLITE_EXTENSIONS):
+        # グループコミット有効時はWALのコミットごとのfsyncを省略
+        return SQLiteStorage(
+            data_file, synchronous="NORMAL" if group_commit_window > 0 else "FULL"
+        )
+    return JsonFileStorage(data_file, group_commit_window=group_commit_window)
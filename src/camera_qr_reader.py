@@ -4,22 +4,210 @@ PCカメラを使用してQRコードを読み取る機能を提供
 """
 
 import cv2
+import glob
 import numpy as np
 import time
 import threading
-from typing import Any, Callable, Optional, cast
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple, cast
 import os
 
+from .qr_detector import MotionGate, StagedQRDetector
+
+# 読み取り用に事前確保するフレームバッファの数（デコードワーカー数に加える分）
+# キャプチャ中・デコード待ちの最新フレームの2枚
+FRAME_RING_EXTRA = 2
+# デコードワーカー数の既定値の上限
+MAX_DECODE_WORKERS = 4
+# fpsの指数移動平均の平滑化係数
+FPS_SMOOTHING = 0.1
+# 画像の一括読み取りの対象とする拡張子
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".webp", ".tif", ".tiff")
+# 画像の一括読み取りを並列化する最小枚数
+PARALLEL_IMAGE_THRESHOLD = 4
+
+# 画像読み取りワーカープロセス内で使用する検出器
+_worker_detector: Optional[StagedQRDetector] = None
+
+
+def _init_image_worker() -> None:
+    """画像読み取りワーカープロセスを初期化"""
+    global _worker_detector
+    # 並列化はプロセス数で行うため、OpenCV内部のスレッドは使わない
+    cv2.setNumThreads(1)
+    _worker_detector = StagedQRDetector()
+
+
+def _decode_image_file(
+    detector: StagedQRDetector, image_path: str
+) -> Tuple[List[str], Optional[str]]:
+    """
+    画像ファイル内の全てのQRコードを読み取り（例外を戻り値に変換）
+
+    Args:
+        detector: 使用する検出器
+        image_path: 画像ファイルのパス
+
+    Returns:
+        (QRコードのデータのリスト, エラーメッセージ)
+    """
+    try:
+        image = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            return [], "画像の読み込みに失敗しました"
+
+        payloads, _ = detector.detect_and_decode_multi(image)
+        if not payloads:
+            # 縮小画像で見つからない小さなQRコードは元の解像度で検出し直す
+            found, decoded, _, _ = detector.detector.detectAndDecodeMulti(image)
+            if found:
+                payloads = list(dict.fromkeys(data for data in decoded if data))
+        return payloads, None
+    except Exception as e:
+        return [], str(e)
+
+
+def _decode_image_in_worker(image_path: str) -> Tuple[List[str], Optional[str]]:
+    """
+    ワーカープロセス内で画像ファイルのQRコードを読み取り
+
+    Args:
+        image_path: 画像ファイルのパス
+
+    Returns:
+        (QRコードのデータのリスト, エラーメッセージ)
+    """
+    assert _worker_detector is not None
+    return _decode_image_file(_worker_detector, image_path)
+
+
+def expand_image_paths(pattern: str) -> List[str]:
+    """
+    ディレクトリまたはglobパターンから画像ファイルのパスを列挙
+
+    Args:
+        pattern: ディレクトリのパス、またはglobパターン（"**" で再帰）
+
+    Returns:
+        画像ファイルのパスのリスト（昇順）
+    """
+    if os.path.isdir(pattern):
+        paths = [os.path.join(pattern, name) for name in os.listdir(pattern)]
+    else:
+        paths = glob.glob(pattern, recursive=True)
+    return sorted(
+        path
+        for path in paths
+        if os.path.isfile(path) and path.lower().endswith(IMAGE_EXTENSIONS)
+    )
+
+
+class DetectionMetrics:
+    """カメラのフレームレートとQRコードのデコード時間を集計するクラス"""
+
+    def __init__(self) -> None:
+        """初期化"""
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """集計を初期化"""
+        with self._lock:
+            self.frames = 0
+            self.processed = 0
+            self.dropped = 0
+            self.skipped = 0
+            self.decoded = 0
+            self.decode_total = 0.0
+            self.decode_last = 0.0
+            self.decode_max = 0.0
+            self._frame_interval = 0.0
+            self._last_frame: Optional[float] = None
+            self._started = time.perf_counter()
+
+    def record_capture(self, frame_time: float) -> None:
+        """
+        フレームの読み取りを記録
+
+        Args:
+            frame_time: フレームを読み取った時刻（time.perf_counter の値）
+        """
+        with self._lock:
+            if self._last_frame is not None:
+                interval = frame_time - self._last_frame
+                if self._frame_interval:
+                    self._frame_interval += FPS_SMOOTHING * (
+                        interval - self._frame_interval
+                    )
+                else:
+                    self._frame_interval = interval
+            self._last_frame = frame_time
+            self.frames += 1
+
+    def record_drop(self) -> None:
+        """デコードされずに新しいフレームで置き換えられたフレームを記録"""
+        with self._lock:
+            self.dropped += 1
+
+    def record_skip(self) -> None:
+        """前回処理したフレームから変化がなくデコードしなかったフレームを記録"""
+        with self._lock:
+            self.skipped += 1
+
+    def record_decode(self, decode_seconds: float, decoded: bool) -> None:
+        """
+        1フレーム分のデコードを記録
+
+        Args:
+            decode_seconds: QRコードの検出・デコードにかかった時間（秒）
+            decoded: QRコードをデコードできたか
+        """
+        with self._lock:
+            self.processed += 1
+            if decoded:
+                self.decoded += 1
+            self.decode_total += decode_seconds
+            self.decode_last = decode_seconds
+            self.decode_max = max(self.decode_max, decode_seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        集計結果を取得
+
+        Returns:
+            読み取ったフレーム数・デコードしたフレーム数・破棄したフレーム数・
+            変化がなくスキップしたフレーム数・デコード成功数・fps（直近の平滑値と全体平均）と
+            1フレームあたりのデコード時間（ミリ秒: 直近・平均・最大）を含む辞書
+        """
+        with self._lock:
+            elapsed = max(time.perf_counter() - self._started, 1e-9)
+            processed = self.processed
+            return {
+                "frames": self.frames,
+                "processed": processed,
+                "dropped": self.dropped,
+                "skipped": self.skipped,
+                "decoded": self.decoded,
+                "fps": 1.0 / self._frame_interval if self._frame_interval else 0.0,
+                "average_fps": self.frames / elapsed,
+                "decode_ms_last": self.decode_last * 1000,
+                "decode_ms_avg": (
+                    self.decode_total * 1000 / processed if processed else 0.0
+                ),
+                "decode_ms_max": self.decode_max * 1000,
+            }
+
 
 class CameraQRReader:
     """カメラQRコード読み取りクラス"""
 
-    def __init__(self, camera_index: int = 0):
+    def __init__(self, camera_index: int = 0, decode_workers: Optional[int] = None):
         """
         初期化
 
         Args:
             camera_index: カメラのインデックス（通常は0）
+            decode_workers: デコードワーカーのスレッド数（省略時はCPUコア数、最大4）
         """
         self.camera_index = camera_index
         self.camera: Optional[Any] = None
@@ -27,6 +215,23 @@ class CameraQRReader:
         self.read_thread: Optional[threading.Thread] = None
         self.on_qr_detected: Optional[Callable[[str], None]] = None
         self.on_error: Optional[Callable[[str], None]] = None
+        if decode_workers is None:
+            decode_workers = min(os.cpu_count() or 1, MAX_DECODE_WORKERS)
+        self.decode_workers = max(1, decode_workers)
+        # 読み取り用のフレームバッファ（最初のフレームの形状に合わせて確保）
+        self._frame_ring: List[np.ndarray] = []
+        self._free_buffers: List[np.ndarray] = []
+        # デコード待ちの最新フレーム（常に1枚だけ保持）
+        self._latest_frame: Optional[np.ndarray] = None
+        self._frame_ready = threading.Condition()
+        self._pipeline_stopped = False
+        # 成功したデコードごとに進め、それ以前に開始したデコードの結果を破棄する
+        self._decode_generation = 0
+        # QRコードのデータごとの最終検出時刻（同じコードの連続通知を抑制する）
+        self._last_detection: Dict[str, float] = {}
+        self.detection_metrics = DetectionMetrics()
+        # 前回処理したフレームから変化のないフレームをデコードしない
+        self.motion_gate = MotionGate()
 
     def check_camera_available(self) -> bool:
         """
@@ -146,10 +351,154 @@ class CameraQRReader:
         self.read_thread.daemon = True
         self.read_thread.start()
 
+    def get_detection_metrics(self) -> Dict[str, Any]:
+        """
+        QRコード検出ループのfpsとデコード時間を取得
+
+        Returns:
+            集計結果の辞書（DetectionMetrics.snapshot を参照）
+        """
+        return self.detection_metrics.snapshot()
+
+    def _acquire_buffer(self) -> Optional[np.ndarray]:
+        """
+        次のフレームを読み取るバッファを取得
+        空きがない場合はデコード待ちの古いフレームを破棄して再利用する
+
+        Returns:
+            バッファ（最初のフレームを読み取る前はNone）
+        """
+        with self._frame_ready:
+            if self._free_buffers:
+                return self._free_buffers.pop()
+            if self._latest_frame is not None:
+                buffer = self._latest_frame
+                self._latest_frame = None
+                self.detection_metrics.record_drop()
+                return buffer
+            return None
+
+    def _release_buffer(self, buffer: np.ndarray) -> None:
+        """バッファを空きに戻す（ロック取得済みで呼び出す）"""
+        # 解像度の変更で作り直す前のバッファは戻さない
+        if any(buffer is ring_buffer for ring_buffer in self._frame_ring):
+            self._free_buffers.append(buffer)
+
+    def _publish_frame(self, frame: np.ndarray, buffer: Optional[np.ndarray]) -> None:
+        """
+        読み取ったフレームを最新フレームとしてデコードワーカーに渡す
+
+        Args:
+            frame: 読み取ったフレーム
+            buffer: 読み取りに使用したバッファ
+        """
+        with self._frame_ready:
+            if frame is not buffer:
+                # 最初のフレームまたは解像度の変更: 以降はこの形状のバッファに上書きで読み取る
+                self._frame_ring = [frame] + [
+                    np.empty_like(frame)
+                    for _ in range(self.decode_workers + FRAME_RING_EXTRA - 1)
+                ]
+                self._free_buffers = self._frame_ring[1:]
+            if self._latest_frame is not None:
+                # デコードが追いつかない分は古いフレームから捨てる
+                self._release_buffer(self._latest_frame)
+                self.detection_metrics.record_drop()
+            self._latest_frame = frame
+            self._frame_ready.notify()
+
+    def _decode_worker(self, qr_detector: Any) -> None:
+        """
+        デコードワーカー: 最新フレームを取り出してQRコードを検出
+        （1フレーム内の複数のQRコードをそれぞれ通知する）
+
+        Args:
+            qr_detector: このワーカー専用のStagedQRDetector
+        """
+        detection_cooldown = 2.0  # 同じQRコードは2秒間のクールダウン
+
+        while True:
+            with self._frame_ready:
+                while self._latest_frame is None and not self._pipeline_stopped:
+                    self._frame_ready.wait()
+                if self._pipeline_stopped:
+                    return
+                frame = self._latest_frame
+                if frame is None:
+                    continue
+                self._latest_frame = None
+                generation = self._decode_generation
+
+            try:
+                started = time.perf_counter()
+                payloads, _ = qr_detector.detect_and_decode_multi(frame)
+                self.detection_metrics.record_decode(
+                    time.perf_counter() - started, bool(payloads)
+                )
+            except Exception as e:
+                if self.on_error:
+                    self.on_error(f"QRコード検出エラー: {str(e)}")
+                self.is_running = False
+                payloads = []
+
+            detected = []
+            with self._frame_ready:
+                self._release_buffer(frame)
+                if payloads and generation == self._decode_generation:
+                    current_time = time.time()
+                    for qr_data in payloads:
+                        last_time = self._last_detection.get(qr_data, 0.0)
+                        if current_time - last_time > detection_cooldown:
+                            self._last_detection[qr_data] = current_time
+                            detected.append(qr_data)
+                if detected:
+                    # 最初に成功したデコードを採用し、処理中・デコード待ちのフレームは破棄
+                    self._decode_generation += 1
+                    if self._latest_frame is not None:
+                        self._release_buffer(self._latest_frame)
+                        self._latest_frame = None
+                        self.detection_metrics.record_drop()
+
+            for qr_data in detected:
+                print(f"QRコード検出: {qr_data}")
+                if self.on_qr_detected:
+                    self.on_qr_detected(qr_data)
+
+    def _stop_decode_workers(self, workers: List[threading.Thread]) -> None:
+        """デコードワーカーを停止（処理中のデコードの完了を待つ）"""
+        with self._frame_ready:
+            self._pipeline_stopped = True
+            if self._latest_frame is not None:
+                self._latest_frame = None
+                self.detection_metrics.record_drop()
+            self._frame_ready.notify_all()
+        for worker in workers:
+            if worker is not threading.current_thread():
+                worker.join(timeout=3)
+
     def _qr_detection_loop(self) -> None:
-        """QRコード検出ループ"""
-        last_detection_time: float = 0.0
-        detection_cooldown = 2.0  # 2秒間のクールダウン
+        """
+        QRコード検出ループ
+        このスレッドはフレームの読み取りと変化の判定だけを行い（最新フレームのみ保持）、
+        QRコードのデコードはワーカースレッドで並列に行う
+        """
+        self._frame_ring = []
+        self._free_buffers = []
+        self._latest_frame = None
+        self._pipeline_stopped = False
+        self._last_detection = {}
+        self.detection_metrics.reset()
+        self.motion_gate.reset()
+
+        # 検出器はワーカーごとにセッションで1回だけ作成する（スレッド間で共有しない）
+        workers = [
+            threading.Thread(
+                target=self._decode_worker, args=(StagedQRDetector(),), daemon=True
+            )
+            for _ in range(self.decode_workers)
+        ]
+        for worker in workers:
+            worker.start()
 
         try:
             while self.is_running:
@@ -157,34 +506,43 @@ class CameraQRReader:
                     if not self.camera or not self.camera.isOpened():
                         break
 
-                    ret, frame = self.camera.read()
+                    # カメラのフレームレートで待機するread()がループの速度を決める
+                    buffer = self._acquire_buffer()
+                    if buffer is None:
+                        ret, frame = self.camera.read()
+                    else:
+                        ret, frame = self.camera.read(buffer)
                     if not ret:
                         if self.on_error:
                             self.on_error("フレームの読み取りに失敗しました")
                         break
 
-                    # QRコードを検出（OpenCVを使用）
-                    qr_detector = cv2.QRCodeDetector()
-                    qr_data, bbox, _ = qr_detector.detectAndDecode(frame)
-
-                    if qr_data:
-                        current_time = time.time()
-                        if current_time - last_detection_time > detection_cooldown:
-                            print(f"QRコード検出: {qr_data}")
-
-                            if self.on_qr_detected:
-                                self.on_qr_detected(qr_data)
-
-                            last_detection_time = current_time
-
-                    # フレームレート制御
-                    time.sleep(1 / 30)  # 30fps
+                    self.detection_metrics.record_capture(time.perf_counter())
+                    moving = self.motion_gate.should_process(frame)
+                    if not moving and frame is buffer:
+                        # 静止しているフレームはワーカーに渡さずバッファを戻す
+                        with self._frame_ready:
+                            self._release_buffer(buffer)
+                        self.detection_metrics.record_skip()
+                        continue
+                    self._publish_frame(frame, buffer)
 
                 except Exception as e:
                     if self.on_error:
                         self.on_error(f"QRコード検出エラー: {str(e)}")
                     break
         finally:
+            self._stop_decode_workers(workers)
+            metrics = self.detection_metrics.snapshot()
+            if metrics["frames"]:
+                print(
+                    f"検出ループ: {metrics['frames']}フレーム "
+                    f"{metrics['average_fps']:.1f}fps "
+                    f"(デコード {metrics['processed']} / 破棄 {metrics['dropped']} / "
+                    f"スキップ {metrics['skipped']}) "
+                    f"デコード平均 {metrics['decode_ms_avg']:.1f}ms "
+                    f"最大 {metrics['decode_ms_max']:.1f}ms"
+                )
             # ループ終了時にカメラリソースのみ解放（stop_cameraは呼ばない）
             try:
                 if self.camera:
@@ -230,6 +588,41 @@ class CameraQRReader:
             print(f"画像QRコード読み取りエラー: {str(e)}")
             return None
 
+    def read_qr_from_images(
+        self, image_paths: List[str], workers: Optional[int] = None
+    ) -> List[Tuple[List[str], Optional[str]]]:
+        """
+        複数の画像ファイルからQRコードを読み取り（結果は入力と同じ順序）
+
+        画像のデコードはCPUバウンドのため、workersが2以上かつ一定枚数以上の場合は
+        ProcessPoolExecutorで並列に処理する
+
+        Args:
+            image_paths: 画像ファイルのパスのリスト
+            workers: ワーカープロセス数（省略時はCPUコア数）
+
+        Returns:
+            (QRコードのデータのリスト, エラーメッセージ) のリスト
+        """
+        if workers is None:
+            workers = os.cpu_count() or 1
+        workers = min(workers, len(image_paths))
+
+        if workers > 1 and len(image_paths) >= PARALLEL_IMAGE_THRESHOLD:
+            with ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_image_worker
+            ) as executor:
+                return list(
+                    executor.map(
+                        _decode_image_in_worker,
+                        image_paths,
+                        chunksize=max(1, len(image_paths) // (workers * 4)),
+                    )
+                )
+
+        detector = StagedQRDetector()
+        return [_decode_image_file(detector, path) for path in image_paths]
+
     def capture_frame(self) -> Optional[np.ndarray]:
         """
         現在のフレームをキャプチャ
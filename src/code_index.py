@@ -0,0 +1,185 @@
+"""
+OTP逆引きインデックスモジュール
+全アカウントの現在と前後の周期のOTPを (アルゴリズム, 桁数, 周期) ごとに
+一括計算してハッシュマップに保持し、
+OTPからアカウントをO(1)で逆引きする。周期の境界を過ぎた場合は
+新しく範囲に入るカウンタの分だけ計算する（範囲外になった分は破棄）
+"""
+
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from .totp_engine import OTPParameters, TOTPEngine, account_otp_parameters
+
+
+class CodeIndex:
+    """OTPからアカウントを逆引きするインデックスクラス"""
+
+    # 逆引き結果に含めるアカウント情報（secretは含めない）
+    ACCOUNT_FIELDS = ("id", "device_name", "account_name", "issuer", "created_at")
+
+    def __init__(self, window: int = 1) -> None:
+        """
+        初期化
+
+        Args:
+            window: 現在の周期に加えて前後に保持する周期数
+        """
+        self.window = max(0, window)
+        self.accounts: List[Dict[str, Any]] = []
+        # (アルゴリズム, 桁数, 周期) ごとのグループ
+        # （エンジン・デコード済みの鍵・カウンタごとのOTP→アカウント）
+        self._groups: Dict[OTPParameters, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.computed_counters = 0
+
+    @classmethod
+    def from_security_manager(
+        cls, security_manager: Any, window: int = 1
+    ) -> "CodeIndex":
+        """
+        SecurityManagerの全アカウントからインデックスを作成
+
+        Args:
+            security_manager: SecurityManagerインスタンス
+            window: 前後に保持する周期数
+
+        Returns:
+            作成したインデックス
+        """
+        index = cls(window)
+        index.build(security_manager.get_all_accounts())
+        return index
+
+    def build(
+        self, accounts: List[Dict[str, Any]], for_time: Optional[float] = None
+    ) -> None:
+        """
+        インデックスを作成（シークレットのデコードはここで一度だけ行う）
+
+        Args:
+            accounts: アカウント情報のリスト（secretを含む）
+            for_time: 基準時刻（UNIX時刻、省略時は現在時刻）
+        """
+        index_accounts: List[Dict[str, Any]] = []
+        groups: Dict[OTPParameters, Dict[str, Any]] = {}
+
+        for account in accounts:
+            try:
+                params = account_otp_parameters(account)
+                key = TOTPEngine.decode_secret(account["secret"])
+            except Exception as e:
+                print(f"エラー: {account.get('account_name', 'Unknown')} - {str(e)}")
+                continue
+
+            group = groups.get(params)
+            if group is None:
+                group = {
+                    "engine": TOTPEngine.for_parameters(*params),
+                    "keys": [],
+                    "members": [],
+                    "counter": None,
+                    "codes": {},
+                }
+                groups[params] = group
+
+            group["keys"].append(key)
+            group["members"].append(len(index_accounts))
+            index_accounts.append(
+                {field: account.get(field, "") for field in self.ACCOUNT_FIELDS}
+            )
+
+        with self._lock:
+            self.accounts = index_accounts
+            self._groups = groups
+            self._refresh(time.time() if for_time is None else for_time)
+
+    def refresh(self, for_time: Optional[float] = None) -> None:
+        """
+        周期の境界を過ぎていればインデックスを更新
+
+        Args:
+            for_time: 基準時刻（UNIX時刻、省略時は現在時刻）
+        """
+        with self._lock:
+            self._refresh(time.time() if for_time is None else for_time)
+
+    def _refresh(self, for_time: float) -> None:
+        """インデックスを更新（ロック取得済みで呼び出す）"""
+        for group in self._groups.values():
+            counter = group["engine"].timecode(for_time)
+            if counter == group["counter"]:
+                continue
+
+            wanted = range(max(0, counter - self.window), counter + self.window + 1)
+            codes = group["codes"]
+            for stale in [c for c in codes if c not in wanted]:
+                del codes[stale]
+            for target in wanted:
+                if target not in codes:
+                    codes[target] = self._compute_codes(group, target)
+            group["counter"] = counter
+
+    def _compute_codes(self, group: Dict[str, Any], counter: int) -> Dict[int, Any]:
+        """
+        グループの全アカウントについて指定カウンタのOTPを計算
+
+        Args:
+            group: 周期ごとのグループ
+            counter: HMACカウンタ値
+
+        Returns:
+            OTPの整数値からアカウント番号（複数の場合はリスト）への辞書
+        """
+        self.computed_counters += 1
+        values = group["engine"].generate_batch_at(group["keys"], counter).tolist()
+        mapping: Dict[int, Any] = {}
+        for member, value in zip(group["members"], values):
+            current = mapping.get(value)
+            if current is None:
+                mapping[value] = member
+            elif isinstance(current, list):
+                current.append(member)
+            else:
+                mapping[value] = [current, member]
+        return mapping
+
+    def lookup(
+        self, code: str, for_time: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        OTPを生成したアカウントを逆引き
+
+        Args:
+            code: OTP
+            for_time: 基準時刻（UNIX時刻、省略時は現在時刻）
+
+        Returns:
+            一致したアカウント情報のリスト（offset: 現在の周期との差、現在の周期を優先）
+        """
+        code = str(code).strip()
+        # str.isdigit() は "²" や "١" などASCII以外の数字も受け付けるため除外
+        if not (code.isascii() and code.isdigit()):
+            return []
+        value = int(code)
+
+        with self._lock:
+            self._refresh(time.time() if for_time is None else for_time)
+
+            results = []
+            for group in self._groups.values():
+                if len(code) != group["engine"].digits:
+                    continue
+                for counter, mapping in group["codes"].items():
+                    found = mapping.get(value)
+                    if found is None:
+                        continue
+                    members = found if isinstance(found, list) else [found]
+                    for member in members:
+                        result = dict(self.accounts[member])
+                        result["offset"] = counter - group["counter"]
+                        results.append(result)
+
+        results.sort(key=lambda result: abs(result["offset"]))
+        return results
@@ -1,16 +1,30 @@
 """
 暗号化ユーティリティモジュール
 セキュリティコードの暗号化・復号化機能を提供
+
+ボールト形式v2（エンベロープ暗号化）:
+  マスターパスワード --PBKDF2(ボールトソルト)--> KEK
+  KEK --AES-GCM--> ラップされたマスターキー（ボールトヘッダーに保存）
+  マスターキー --AES-GCM(レコードごとのnonce)--> 各セキュリティコード
+ボールトを開く際のPBKDF2はアカウント数に関係なく1回のみ。
 """
 
 import os
+import time
 import base64
 import getpass
-from typing import Optional
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+from cryptography.exceptions import InvalidTag
 from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 
+if TYPE_CHECKING:
+    from .unlock_agent import AgentClient
+
 
 class CryptoUtils:
     """暗号化・復号化のユーティリティクラス"""
@@ -19,19 +33,63 @@ class CryptoUtils:
     SALT_LENGTH = 16
     # PBKDF2の反復回数
     PBKDF2_ITERATIONS = 100000
-
-    def __init__(self, password: Optional[str] = None):
+    # 導出キーキャッシュの最大エントリ数
+    KEY_CACHE_MAX_SIZE = 4096
+    # 導出キーキャッシュの有効期限（秒）
+    KEY_CACHE_TTL = 300.0
+    # ボールト形式のバージョン
+    VAULT_VERSION = 2
+    # v2形式レコードの接頭辞（旧形式のurlsafe Base64には ":" が現れない）
+    RECORD_PREFIX = "v2:"
+    # AES-GCMのnonce長（12バイト = 96ビット）
+    NONCE_LENGTH = 12
+    # マスターキーのラップ時に使用する関連データ
+    VAULT_AAD = b"otp-vault-v2"
+
+    def __init__(
+        self,
+        password: Optional[str] = None,
+        key_cache_size: Optional[int] = None,
+        key_cache_ttl: Optional[float] = None,
+        agent: Optional["AgentClient"] = None,
+    ):
         """
         初期化
 
         Args:
             password: 暗号化用パスワード（Noneの場合は環境変数またはユーザー入力から取得）
+            key_cache_size: 導出キーキャッシュの最大エントリ数（0でキャッシュ無効）
+            key_cache_ttl: 導出キーキャッシュの有効期限（秒）
+            agent: アンロックエージェントのクライアント（ボールトを開いている場合は
+                暗号化・復号化をエージェントに依頼し、パスワードを要求しない）
         """
-        self.password = password or self._get_password()
-        if not self.password:
-            raise ValueError(
-                "暗号化パスワードが提供されていません。環境変数OTP_MASTER_PASSWORDを設定するか、パスワードを指定してください。"
-            )
+        self.agent = agent
+        self._agent_vault_id: Optional[str] = None
+        if agent is not None and not password:
+            # パスワードはエージェントが使えない場合にのみ取得する
+            self.password = ""
+        else:
+            self.password = password or self._get_password()
+            if not self.password:
+                raise ValueError(
+                    "暗号化パスワードが提供されていません。環境変数OTP_MASTER_PASSWORDを設定するか、パスワードを指定してください。"
+                )
+
+        # ソルト -> (導出キー, 格納時刻) のLRUキャッシュ
+        self.key_cache_size = (
+            self.KEY_CACHE_MAX_SIZE if key_cache_size is None else key_cache_size
+        )
+        self.key_cache_ttl = (
+            self.KEY_CACHE_TTL if key_cache_ttl is None else key_cache_ttl
+        )
+        self._key_cache: "OrderedDict[bytes, Tuple[bytes, float]]" = OrderedDict()
+        self._key_cache_lock = threading.Lock()
+        self.key_cache_hits = 0
+        self.key_cache_misses = 0
+
+        # ボールトのマスターキー（unlock_vault後に設定）
+        self.vault_header: Optional[Dict[str, Any]] = None
+        self._vault_cipher: Optional[AESGCM] = None
 
     def _get_password(self) -> str:
         """
@@ -79,6 +137,21 @@ class CryptoUtils:
 
         return ""
 
+    def _require_password(self) -> str:
+        """
+        パスワードを取得（エージェント使用時は初めて必要になった時点で取得）
+
+        Returns:
+            パスワード文字列
+        """
+        if not self.password:
+            self.password = self._get_password()
+            if not self.password:
+                raise ValueError(
+                    "暗号化パスワードが提供されていません。環境変数OTP_MASTER_PASSWORDを設定するか、パスワードを指定してください。"
+                )
+        return self.password
+
     def _derive_key(self, password: str, salt: bytes) -> bytes:
         """
         パスワードとソルトから暗号化キーを導出
@@ -90,17 +163,231 @@ class CryptoUtils:
         Returns:
             導出された暗号化キー
         """
-        password_bytes = password.encode()
+        key = base64.urlsafe_b64encode(
+            self._derive_raw_key(password, salt, self.PBKDF2_ITERATIONS)
+        )
+        return key
 
+    def _derive_raw_key(self, password: str, salt: bytes, iterations: int) -> bytes:
+        """
+        PBKDF2-SHA256で32バイトの鍵を導出
+
+        Args:
+            password: マスターパスワード
+            salt: ソルト
+            iterations: 反復回数
+
+        Returns:
+            導出された32バイトの鍵
+        """
         kdf = PBKDF2HMAC(
             algorithm=hashes.SHA256(),
             length=32,
             salt=salt,
-            iterations=self.PBKDF2_ITERATIONS,
+            iterations=iterations,
         )
-        key = base64.urlsafe_b64encode(kdf.derive(password_bytes))
+        return kdf.derive(password.encode())
+
+    def unlock_vault(
+        self, vault_header: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        ボールトのマスターキーを取り出す（ヘッダーがない場合は新規作成）
+
+        Args:
+            vault_header: データファイルに保存されたボールトヘッダー
+
+        Returns:
+            ボールトヘッダー（新規作成時は生成したもの）
+
+        Raises:
+            Exception: パスワードが正しくない、またはヘッダーが破損している場合
+        """
+        if vault_header is None:
+            return self._create_vault()
+
+        # エージェントがボールトを開いている場合はキー導出を行わない
+        if self.agent is not None:
+            vault_id = self.get_vault_id(vault_header)
+            try:
+                if self.agent.has_vault(vault_id):
+                    self._agent_vault_id = vault_id
+                    self.vault_header = vault_header
+                    return vault_header
+            except Exception as e:
+                print(f"警告: エージェントを利用できません: {str(e)}")
+
+        try:
+            salt = base64.urlsafe_b64decode(vault_header["salt"])
+            nonce = base64.urlsafe_b64decode(vault_header["nonce"])
+            wrapped_key = base64.urlsafe_b64decode(vault_header["wrapped_key"])
+            iterations = int(vault_header["iterations"])
+        except Exception as e:
+            raise Exception(f"ボールトヘッダーが不正です: {str(e)}")
+
+        kek = self._derive_raw_key(self._require_password(), salt, iterations)
+        try:
+            master_key = AESGCM(kek).decrypt(nonce, wrapped_key, self.VAULT_AAD)
+        except InvalidTag:
+            raise Exception(
+                "ボールトを開けませんでした。マスターパスワードが正しいか確認してください。"
+            )
+
+        self._vault_cipher = AESGCM(master_key)
+        self.vault_header = vault_header
+        return vault_header
+
+    def _create_vault(self) -> Dict[str, Any]:
+        """
+        新しいマスターキーを生成し、パスワード由来のKEKでラップ
+
+        Returns:
+            新しいボールトヘッダー
+        """
+        salt = os.urandom(self.SALT_LENGTH)
+        nonce = os.urandom(self.NONCE_LENGTH)
+        master_key = AESGCM.generate_key(bit_length=256)
+
+        kek = self._derive_raw_key(
+            self._require_password(), salt, self.PBKDF2_ITERATIONS
+        )
+        wrapped_key = AESGCM(kek).encrypt(nonce, master_key, self.VAULT_AAD)
+
+        vault_header = {
+            "version": self.VAULT_VERSION,
+            "kdf": "pbkdf2-sha256",
+            "iterations": self.PBKDF2_ITERATIONS,
+            "cipher": "aes-256-gcm",
+            "salt": base64.urlsafe_b64encode(salt).decode(),
+            "nonce": base64.urlsafe_b64encode(nonce).decode(),
+            "wrapped_key": base64.urlsafe_b64encode(wrapped_key).decode(),
+        }
+        self._vault_cipher = AESGCM(master_key)
+        self.vault_header = vault_header
+        return vault_header
+
+    def lock_vault(self) -> None:
+        """ボールトのマスターキーをメモリから破棄"""
+        self._vault_cipher = None
+        self._agent_vault_id = None
+
+    @property
+    def is_vault_unlocked(self) -> bool:
+        """ボールトのマスターキーが利用可能な場合True"""
+        return self._vault_cipher is not None or self._agent_vault_id is not None
+
+    @property
+    def uses_agent(self) -> bool:
+        """暗号化・復号化をエージェントに依頼している場合True"""
+        return self._agent_vault_id is not None
+
+    @staticmethod
+    def get_vault_id(vault_header: Dict[str, Any]) -> str:
+        """
+        ボールトヘッダーからボールトIDを取得
+
+        Args:
+            vault_header: ボールトヘッダー
+
+        Returns:
+            ボールトID（ボールトソルト）
+        """
+        return str(vault_header["salt"])
+
+    @classmethod
+    def is_legacy_ciphertext(cls, encrypted_data: str) -> bool:
+        """
+        旧形式（base64(salt + fernet)）の暗号文かどうかを判定
+
+        Args:
+            encrypted_data: 暗号化されたデータ
+
+        Returns:
+            旧形式の場合True
+        """
+        return not encrypted_data.startswith(cls.RECORD_PREFIX)
+
+    def _get_vault_cipher(self) -> AESGCM:
+        """
+        ボールトのマスターキーを取得
+
+        Returns:
+            マスターキーのAES-GCMインスタンス
+        """
+        if self._vault_cipher is None:
+            raise Exception("ボールトがロックされています")
+        return self._vault_cipher
+
+    def _get_key(self, salt: bytes) -> bytes:
+        """
+        ソルトに対応する暗号化キーを取得（キャッシュを優先）
+
+        Args:
+            salt: レコードのソルト
+
+        Returns:
+            導出された暗号化キー
+        """
+        if self.key_cache_size <= 0:
+            self.key_cache_misses += 1
+            return self._derive_key(self._require_password(), salt)
+
+        now = time.monotonic()
+        with self._key_cache_lock:
+            entry = self._key_cache.get(salt)
+            if entry is not None and now - entry[1] < self.key_cache_ttl:
+                self._key_cache.move_to_end(salt)
+                self.key_cache_hits += 1
+                return entry[0]
+            self.key_cache_misses += 1
+
+        # PBKDF2はロック外で実行（他スレッドのキャッシュヒットを妨げない）
+        key = self._derive_key(self._require_password(), salt)
+        self._store_key(salt, key, now)
         return key
 
+    def _store_key(self, salt: bytes, key: bytes, now: float) -> None:
+        """
+        導出キーをキャッシュに格納し、上限を超えた古いエントリを破棄
+
+        Args:
+            salt: レコードのソルト
+            key: 導出された暗号化キー
+            now: 格納時刻（time.monotonic）
+        """
+        if self.key_cache_size <= 0:
+            return
+
+        with self._key_cache_lock:
+            self._key_cache[salt] = (key, now)
+            self._key_cache.move_to_end(salt)
+            while len(self._key_cache) > self.key_cache_size:
+                self._key_cache.popitem(last=False)
+
+    def get_key_cache_stats(self) -> Dict[str, Any]:
+        """
+        導出キーキャッシュの統計情報を取得
+
+        Returns:
+            ヒット数・ミス数・ヒット率・エントリ数を含む辞書
+        """
+        with self._key_cache_lock:
+            size = len(self._key_cache)
+        total = self.key_cache_hits + self.key_cache_misses
+        return {
+            "hits": self.key_cache_hits,
+            "misses": self.key_cache_misses,
+            "hit_rate": self.key_cache_hits / total if total else 0.0,
+            "size": size,
+            "max_size": self.key_cache_size,
+            "ttl": self.key_cache_ttl,
+        }
+
+    def clear_key_cache(self) -> None:
+        """導出キーキャッシュを破棄"""
+        with self._key_cache_lock:
+            self._key_cache.clear()
+
     def encrypt(self, data: str) -> str:
         """
         データを暗号化（各暗号化ごとにランダムなソルトを生成）
@@ -110,14 +397,30 @@ class CryptoUtils:
 
         Returns:
             暗号化されたデータ（Base64エンコード）
-            形式: base64(salt + encrypted_data)
+            形式: "v2:" + base64(nonce + aes_gcm_ciphertext)（ボールト使用時）
+                  base64(salt + encrypted_data)（ボールト未使用時）
         """
         try:
+            if self.vault_header is not None:
+                if self._agent_vault_id is not None and self.agent is not None:
+                    return self.agent.encrypt(self._agent_vault_id, data)
+
+                # ボールトのマスターキーで暗号化（キー導出なし）
+                nonce = os.urandom(self.NONCE_LENGTH)
+                ciphertext = self._get_vault_cipher().encrypt(
+                    nonce, data.encode(), None
+                )
+                return (
+                    self.RECORD_PREFIX
+                    + base64.urlsafe_b64encode(nonce + ciphertext).decode()
+                )
+
             # ランダムなソルトを生成
             salt = os.urandom(self.SALT_LENGTH)
 
-            # ソルトから暗号化キーを導出
-            key = self._derive_key(self.password, salt)
+            # ソルトから暗号化キーを導出（直後の復号化に備えてキャッシュ）
+            key = self._derive_key(self._require_password(), salt)
+            self._store_key(salt, key, time.monotonic())
             cipher = Fernet(key)
 
             # データを暗号化
@@ -135,12 +438,25 @@ class CryptoUtils:
 
         Args:
             encrypted_data: 暗号化されたデータ（Base64エンコード）
-            形式: base64(salt + encrypted_data)
+            形式: "v2:" + base64(nonce + aes_gcm_ciphertext)
+                  または旧形式 base64(salt + encrypted_data)
 
         Returns:
             復号化されたデータ
         """
         try:
+            if not self.is_legacy_ciphertext(encrypted_data):
+                if self._agent_vault_id is not None and self.agent is not None:
+                    return self.agent.decrypt(self._agent_vault_id, encrypted_data)
+
+                payload = base64.urlsafe_b64decode(
+                    encrypted_data[len(self.RECORD_PREFIX) :].encode()
+                )
+                nonce = payload[: self.NONCE_LENGTH]
+                ciphertext = payload[self.NONCE_LENGTH :]
+                plaintext = self._get_vault_cipher().decrypt(nonce, ciphertext, None)
+                return plaintext.decode()
+
             # Base64デコード
             combined = base64.urlsafe_b64decode(encrypted_data.encode())
 
@@ -148,8 +464,8 @@ class CryptoUtils:
             salt = combined[: self.SALT_LENGTH]
             encrypted_bytes = combined[self.SALT_LENGTH :]
 
-            # ソルトから暗号化キーを導出
-            key = self._derive_key(self.password, salt)
+            # ソルトから暗号化キーを取得（キャッシュ済みなら導出を省略）
+            key = self._get_key(salt)
             cipher = Fernet(key)
 
             # データを復号化
@@ -192,6 +508,10 @@ class CryptoUtils:
 
     def clear_memory(self) -> None:
         """メモリ上の機密データをクリア"""
+        # 導出キーキャッシュとボールトのマスターキーを破棄
+        self.clear_key_cache()
+        self.lock_vault()
+
         # Pythonのガベージコレクションに依存
         # 実際の実装では、より積極的なメモリクリアを行う
         import gc
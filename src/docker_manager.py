@@ -6,13 +6,17 @@ otpauthコンテナの起動・停止・実行機能を提供
 import subprocess
 import os
 import tempfile
-from typing import Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
 from urllib.parse import urlparse, parse_qs, unquote
 
 
 class DockerManager:
     """Dockerコンテナ管理クラス"""
 
+    # 複数のQRコードURLを処理する際に同時に実行するコンテナ数の既定値
+    DEFAULT_CONTAINER_WORKERS = 4
+
     def __init__(
         self, image_name: str = "otpauth:latest", container_name: str = "otpauth"
     ):
@@ -171,26 +175,30 @@ class DockerManager:
             print(f"イメージビルドエラー: {str(e)}")
             return False
 
-    def run_container(self, qr_url: str) -> tuple[bool, str]:
+    def run_container(
+        self, qr_url: str, container_name: Optional[str] = None
+    ) -> tuple[bool, str]:
         """
         コンテナを実行してQRコードURLを解析
 
         Args:
             qr_url: QRコードのURL
+            container_name: コンテナ名（省略時はself.container_name）
 
         Returns:
             (成功フラグ, 出力結果)
         """
+        container_name = container_name or self.container_name
         try:
             # 既存のコンテナを停止・削除
-            self.stop_container()
+            self.stop_container(container_name)
 
             # コンテナを実行
             cmd = [
                 "docker",
                 "run",
                 "--name",
-                self.container_name,
+                container_name,
                 "--rm",
                 self.image_name,
                 "-link",
@@ -213,22 +221,26 @@ class DockerManager:
             print(error_msg)
             return False, error_msg
 
-    def stop_container(self) -> bool:
+    def stop_container(self, container_name: Optional[str] = None) -> bool:
         """
         コンテナを停止
 
+        Args:
+            container_name: コンテナ名（省略時はself.container_name）
+
         Returns:
             停止成功の場合True
         """
+        container_name = container_name or self.container_name
         try:
             # コンテナを停止
             subprocess.run(
-                ["docker", "stop", self.container_name], capture_output=True, timeout=10
+                ["docker", "stop", container_name], capture_output=True, timeout=10
             )
 
             # コンテナを削除
             subprocess.run(
-                ["docker", "rm", self.container_name], capture_output=True, timeout=10
+                ["docker", "rm", container_name], capture_output=True, timeout=10
             )
 
             return True
@@ -312,6 +324,26 @@ class DockerManager:
             print(f"出力解析エラー: {str(e)}")
             return None
 
+    def parse_otpauth_outputs(self, output: str) -> List[Dict[str, Optional[str]]]:
+        """
+        複数行のotpauthの出力を解析（1つの移行用QRコードに複数アカウントが含まれる場合）
+
+        Args:
+            output: otpauthの出力文字列（1行に1つのotpauth URI）
+
+        Returns:
+            解析できた行の結果のリスト
+        """
+        results = []
+        for line in output.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            parsed_data = self.parse_otpauth_output(line)
+            if parsed_data:
+                results.append(parsed_data)
+        return results
+
     def process_qr_url(self, qr_url: str) -> Optional[Dict[str, Optional[str]]]:
         """
         QRコードURLを処理してセキュリティコードを抽出
@@ -346,6 +378,62 @@ class DockerManager:
             print(f"QRコードURL処理エラー: {str(e)}")
             return None
 
+    def process_qr_urls(
+        self, qr_urls: List[str], max_workers: Optional[int] = None
+    ) -> List[Dict[str, Optional[str]]]:
+        """
+        複数のQRコードURL（分割された移行用QRコード）を処理して全アカウントを抽出
+
+        解析ツールは1回の実行で1つのURLしか受け付けないため、コンテナの起動待ちが
+        重ならないよう、max_workers個までのコンテナを同時に実行する
+
+        Args:
+            qr_urls: QRコードのURLのリスト
+            max_workers: 同時に実行するコンテナ数
+                （Noneの場合は環境変数OTP_DOCKER_WORKERS、未設定ならDEFAULT_CONTAINER_WORKERS）
+
+        Returns:
+            抽出された情報の辞書のリスト（処理できなかったURLは除く）
+        """
+        results: List[Dict[str, Optional[str]]] = []
+        try:
+            valid_urls = [url for url in qr_urls if self._validate_qr_url(url)]
+            if len(valid_urls) < len(qr_urls):
+                print(f"無効なQRコードURL形式です: {len(qr_urls) - len(valid_urls)}件")
+            if not valid_urls:
+                return results
+
+            # イメージの準備はまとめて1回だけ行う
+            if not self.ensure_image_available():
+                print("Dockerイメージの準備に失敗しました")
+                return results
+
+            if max_workers is None:
+                max_workers = int(os.environ.get("OTP_DOCKER_WORKERS", "0") or 0)
+            workers = min(
+                max_workers or self.DEFAULT_CONTAINER_WORKERS, len(valid_urls)
+            )
+
+            if workers <= 1:
+                outputs = [self.run_container(qr_url) for qr_url in valid_urls]
+            else:
+                # 同時に実行するコンテナの名前が重ならないよう、プロセスIDと連番を付ける
+                names = [
+                    f"{self.container_name}-{os.getpid()}-{i}"
+                    for i in range(len(valid_urls))
+                ]
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    outputs = list(executor.map(self.run_container, valid_urls, names))
+
+            # 結果は入力と同じ順序で解析する
+            for success, output in outputs:
+                if success:
+                    results.extend(self.parse_otpauth_outputs(output))
+
+        except Exception as e:
+            print(f"QRコードURL処理エラー: {str(e)}")
+        return results
+
     def _validate_qr_url(self, qr_url: str) -> bool:
         """
         QRコードURLの形式を検証
@@ -16,8 +16,17 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.security_manager import SecurityManager  # noqa: E402
 from src.otp_generator import OTPGenerator  # noqa: E402
-from src.camera_qr_reader import CameraQRReader  # noqa: E402
+from src.otp_viewer import OTPViewer  # noqa: E402
+from src.camera_qr_reader import CameraQRReader, expand_image_paths  # noqa: E402
+from src.migration_batch import MigrationBatchCollector  # noqa: E402
+from src.code_index import CodeIndex  # noqa: E402
 from src.docker_manager import DockerManager  # noqa: E402
+from src.unlock_agent import (  # noqa: E402
+    DEFAULT_IDLE_TIMEOUT,
+    connect_agent,
+    get_agent_socket_path,
+    start_agent_process,
+)
 
 
 class OneTimePasswordApp:
@@ -58,14 +67,22 @@ class OneTimePasswordApp:
         print("QRコードをカメラに向けてください。")
         print("Ctrl+C でキャンセル")
 
-        qr_data = None
         self.qr_detected_event.clear()
+        # 分割された移行用QRコードは全て揃うまで読み取りを続ける
+        collector = MigrationBatchCollector()
 
         def on_qr_detected(data: str) -> None:
-            nonlocal qr_data
-            qr_data = data
+            if not collector.add(data):
+                return
             print(f"\nQRコードを検出しました: {data}")
-            self.qr_detected_event.set()
+            if collector.is_complete:
+                self.qr_detected_event.set()
+            else:
+                missing = ", ".join(str(i + 1) for i in collector.missing_indices())
+                print(
+                    f"移行用QRコード {collector.collected}/{collector.batch_size} を"
+                    f"読み取りました（残り: {missing}）"
+                )
 
         def on_error(error: str) -> None:
             print(f"エラー: {error}")
@@ -77,10 +94,17 @@ class OneTimePasswordApp:
             while self.running and not self.qr_detected_event.is_set():
                 self.qr_detected_event.wait(timeout=0.1)
 
-            if qr_data:
-                return self._process_qr_data(qr_data)
-            else:
+            payloads = collector.payloads()
+            if not collector.is_complete:
+                if payloads:
+                    print(
+                        f"QRコードが揃っていません（{collector.collected}/"
+                        f"{collector.batch_size}）"
+                    )
                 return False
+            if len(payloads) == 1:
+                return self._process_qr_data(payloads[0])
+            return self._process_qr_batch(payloads)
 
         except KeyboardInterrupt:
             print("\nキャンセルされました")
@@ -101,6 +125,60 @@ class OneTimePasswordApp:
             print("QRコードの読み取りに失敗しました")
             return False
 
+    def add_accounts_from_images(
+        self, pattern: str, workers: Optional[int] = None
+    ) -> bool:
+        """
+        ディレクトリまたはglobパターンの画像ファイルからQRコードを一括で読み取り、
+        重複を除いて1回の書き込みでアカウントを追加
+
+        Args:
+            pattern: ディレクトリのパス、またはglobパターン
+            workers: 画像を読み取るワーカープロセス数（省略時はCPUコア数）
+
+        Returns:
+            アカウントを追加した場合True
+        """
+        image_paths = expand_image_paths(pattern)
+        if not image_paths:
+            print(f"画像ファイルが見つかりません: {pattern}")
+            return False
+
+        print(f"{len(image_paths)}件の画像ファイルからQRコードを読み取ります...")
+        started = time.perf_counter()
+        results = self.camera_reader.read_qr_from_images(image_paths, workers)
+        elapsed = time.perf_counter() - started
+
+        # 複数の画像に含まれる同じQRコードは最初の画像のものだけを使う
+        unique_payloads: List[str] = []
+        seen = set()
+        for image_path, (payloads, error) in zip(image_paths, results):
+            if error:
+                print(f"  [エラー] {image_path}: {error}")
+                continue
+            if not payloads:
+                print(f"  [なし]   {image_path}")
+                continue
+            for qr_data in payloads:
+                if qr_data in seen:
+                    print(f"  [重複]   {image_path}")
+                elif not self.camera_reader.validate_qr_data(qr_data):
+                    print(f"  [無効]   {image_path}")
+                else:
+                    seen.add(qr_data)
+                    unique_payloads.append(qr_data)
+                    print(f"  [OK]     {image_path}")
+
+        throughput = len(image_paths) / elapsed if elapsed > 0 else 0.0
+        print(
+            f"読み取り完了: {len(image_paths)}件の画像 / {elapsed:.2f}秒 "
+            f"（{throughput:.1f}枚/秒）、QRコード {len(unique_payloads)}件"
+        )
+        if not unique_payloads:
+            print("QRコードの読み取りに失敗しました")
+            return False
+        return self._process_qr_batch(unique_payloads)
+
     def _process_qr_data(self, qr_data: str) -> bool:
         """QRコードデータを処理してアカウントを追加"""
         try:
@@ -135,6 +213,9 @@ class OneTimePasswordApp:
                 account_name=str(parsed_data["account_name"]),
                 issuer=str(parsed_data.get("issuer", "")),
                 secret=str(parsed_data["secret"]),
+                algorithm=parsed_data.get("algorithm"),
+                digits=parsed_data.get("digits"),
+                period=parsed_data.get("period"),
             )
 
             print(f"アカウントを追加しました: {parsed_data['account_name']}")
@@ -145,6 +226,48 @@ class OneTimePasswordApp:
             print(f"QRコード処理エラー: {str(e)}")
             return False
 
+    def _process_qr_batch(self, qr_urls: List[str]) -> bool:
+        """分割された移行用QRコードをまとめて処理し、1回の書き込みでアカウントを追加"""
+        try:
+            print(f"QRコードを解析中...（{len(qr_urls)}件）")
+
+            # DockerコンテナでQRコードを解析
+            parsed_list = self.docker_manager.process_qr_urls(qr_urls)
+            accounts = [
+                {
+                    "device_name": str(parsed_data["device_name"]),
+                    "account_name": str(parsed_data["account_name"]),
+                    "issuer": str(parsed_data.get("issuer") or ""),
+                    "secret": str(parsed_data["secret"]),
+                    "algorithm": parsed_data.get("algorithm"),
+                    "digits": parsed_data.get("digits"),
+                    "period": parsed_data.get("period"),
+                }
+                for parsed_data in parsed_list
+                if parsed_data.get("device_name")
+                and parsed_data.get("account_name")
+                and parsed_data.get("secret")
+            ]
+            if len(accounts) < len(parsed_list):
+                print(
+                    f"必須フィールドが不足しています: {len(parsed_list) - len(accounts)}件"
+                )
+            if not accounts:
+                print("QRコードの解析に失敗しました")
+                return False
+
+            # アカウントを一括追加
+            account_ids = self.security_manager.add_many(accounts)
+
+            print(f"{len(account_ids)}件のアカウントを追加しました")
+            for account, account_id in zip(accounts, account_ids):
+                print(f"  {account['account_name']} (ID: {account_id})")
+            return True
+
+        except Exception as e:
+            print(f"QRコード処理エラー: {str(e)}")
+            return False
+
     def show_otp(
         self, account_id: Optional[str] = None, show_all: bool = False
     ) -> bool:
@@ -194,6 +317,23 @@ class OneTimePasswordApp:
         finally:
             self.otp_generator.stop_realtime_display()
 
+    def show_otp_tui(self) -> bool:
+        """全アカウントのOTPをスクロール・絞り込み可能なTUIで表示"""
+        try:
+            accounts = self.security_manager.get_all_accounts()
+            if not accounts:
+                print("登録されているアカウントがありません")
+                return False
+
+            OTPViewer(self.otp_generator, accounts).start()
+            return True
+
+        except KeyboardInterrupt:
+            return True
+        except Exception as e:
+            print(f"OTP表示エラー: {str(e)}")
+            return False
+
     def _print_accounts_table(self, accounts: List[Dict[str, Any]]) -> None:
         """アカウント情報をテーブル形式で表示（共通メソッド）"""
         if not accounts:
@@ -284,6 +424,27 @@ class OneTimePasswordApp:
         print(f"検索結果 ({len(accounts)}件):")
         self._print_accounts_table(accounts)
 
+    def lookup_code(self, code: str, window: int = 1) -> bool:
+        """OTPからアカウントを逆引き"""
+        try:
+            index = CodeIndex.from_security_manager(self.security_manager, window)
+            matches = index.lookup(code)
+        except Exception as e:
+            print(f"逆引きエラー: {str(e)}")
+            return False
+
+        if not matches:
+            print(f"OTP '{code}' に一致するアカウントが見つかりません")
+            return False
+
+        print(f"逆引き結果 ({len(matches)}件):")
+        self._print_accounts_table(matches)
+        for match in matches:
+            if match["offset"] != 0:
+                label = "前" if match["offset"] < 0 else "次"
+                print(f"  {match['id']}: {abs(match['offset'])}周期{label}のOTPと一致")
+        return True
+
     def setup_environment(self) -> bool:
         """環境をセットアップ"""
         print("Docker環境をセットアップしています...")
@@ -304,6 +465,53 @@ class OneTimePasswordApp:
             print("Dockerイメージの削除に失敗しました")
         return success
 
+    def manage_agent(
+        self, action: str, idle_timeout: float = DEFAULT_IDLE_TIMEOUT
+    ) -> bool:
+        """アンロックエージェントを操作"""
+        socket_path = get_agent_socket_path()
+        client = connect_agent(socket_path)
+
+        if action == "start":
+            if client:
+                print(f"エージェントは既に起動しています: {socket_path}")
+                return True
+            if not start_agent_process(socket_path, idle_timeout):
+                print("エージェントの起動に失敗しました")
+                return False
+            print(f"エージェントを起動しました: {socket_path}")
+            print("'otp agent unlock' でボールトを開いてください")
+            return True
+
+        if not client:
+            print("エージェントが起動していません（'otp agent start' で起動）")
+            return False
+
+        if action == "unlock":
+            crypto = self.security_manager.unlock()
+            if crypto.uses_agent:
+                print("ボールトは既にエージェントで開かれています")
+                return True
+            client.unlock(crypto.password, self.security_manager.vault or {})
+            print("エージェントでボールトを開きました")
+            return True
+
+        if action == "lock":
+            client.lock()
+            print("エージェントのマスターキーを破棄しました")
+            return True
+
+        if action == "stop":
+            client.stop()
+            print("エージェントを停止しました")
+            return True
+
+        status = client.status()
+        print(f"エージェント: 起動中 (PID {status.get('pid')}, {socket_path})")
+        print(f"開いているボールト数: {len(status.get('vaults', []))}")
+        print(f"アイドルタイムアウト: {status.get('idle_timeout')}秒")
+        return True
+
     def show_status(self) -> None:
         """アプリケーションの状態を表示"""
         print("アプリケーション状態:")
@@ -335,6 +543,7 @@ def main() -> None:
 使用例:
   python main.py add --camera                    # カメラでQRコード読み取り
   python main.py add --image qr_code.png         # 画像ファイルからQRコード読み取り
+  python main.py add --images "exports/*.png"    # 複数の画像ファイルから一括追加
   python main.py show --all                      # 全アカウントのOTP表示
   python main.py show <account_id>               # 特定アカウントのOTP表示
   python main.py list                             # アカウント一覧
@@ -344,6 +553,8 @@ def main() -> None:
   python main.py setup                           # 環境セットアップ
   python main.py cleanup                         # Dockerイメージ削除
   python main.py status                          # 状態表示
+  python main.py agent start                     # アンロックエージェント起動
+  python main.py agent unlock                    # エージェントでボールトを開く
         """,
     )
 
@@ -356,12 +567,27 @@ def main() -> None:
         "--camera", action="store_true", help="カメラでQRコード読み取り"
     )
     add_group.add_argument("--image", type=str, help="画像ファイルからQRコード読み取り")
+    add_group.add_argument(
+        "--images",
+        type=str,
+        help="ディレクトリまたはglobパターンの画像ファイルから一括追加",
+    )
+    add_parser.add_argument(
+        "--workers",
+        type=int,
+        help="--images の画像を読み取るワーカープロセス数（省略時はCPUコア数）",
+    )
 
     # show コマンド
     show_parser = subparsers.add_parser("show", help="OTPを表示")
     show_group = show_parser.add_mutually_exclusive_group(required=True)
     show_group.add_argument("--all", action="store_true", help="全アカウントのOTP表示")
     show_group.add_argument("account_id", nargs="?", help="アカウントID")
+    show_parser.add_argument(
+        "--tui",
+        action="store_true",
+        help="--all をスクロール・絞り込み可能な画面で表示",
+    )
 
     # list コマンド
     subparsers.add_parser("list", help="アカウント一覧を表示")
@@ -379,6 +605,13 @@ def main() -> None:
     search_parser = subparsers.add_parser("search", help="アカウントを検索")
     search_parser.add_argument("keyword", help="検索キーワード")
 
+    # lookup コマンド
+    lookup_parser = subparsers.add_parser("lookup", help="OTPからアカウントを逆引き")
+    lookup_parser.add_argument("code", help="OTP")
+    lookup_parser.add_argument(
+        "--window", type=int, default=1, help="前後に照合する周期数（既定: 1）"
+    )
+
     # setup コマンド
     subparsers.add_parser("setup", help="環境をセットアップ")
 
@@ -388,8 +621,25 @@ def main() -> None:
     # status コマンド
     subparsers.add_parser("status", help="アプリケーションの状態を表示")
 
+    # agent コマンド
+    agent_parser = subparsers.add_parser("agent", help="アンロックエージェントを操作")
+    agent_parser.add_argument(
+        "action",
+        choices=["start", "unlock", "lock", "stop", "status"],
+        help="操作",
+    )
+    agent_parser.add_argument(
+        "--timeout",
+        type=float,
+        default=DEFAULT_IDLE_TIMEOUT,
+        help="アイドルタイムアウト（秒、0で無効）",
+    )
+
     args = parser.parse_args()
 
+    if args.command == "show" and args.tui and not args.all:
+        show_parser.error("--tui は --all と組み合わせて指定してください")
+
     if not args.command:
         parser.print_help()
         return
@@ -404,9 +654,14 @@ def main() -> None:
                 app.add_account_from_camera()
             elif args.image:
                 app.add_account_from_image(args.image)
+            elif args.images:
+                app.add_accounts_from_images(args.images, args.workers)
 
         elif args.command == "show":
-            app.show_otp(args.account_id, args.all)
+            if args.all and args.tui:
+                app.show_otp_tui()
+            else:
+                app.show_otp(args.account_id, args.all)
 
         elif args.command == "list":
             app.list_accounts()
@@ -423,6 +678,9 @@ def main() -> None:
         elif args.command == "search":
             app.search_accounts(args.keyword)
 
+        elif args.command == "lookup":
+            app.lookup_code(args.code, args.window)
+
         elif args.command == "setup":
             app.setup_environment()
 
@@ -432,6 +690,9 @@ def main() -> None:
         elif args.command == "status":
             app.show_status()
 
+        elif args.command == "agent":
+            app.manage_agent(args.action, args.timeout)
+
     except Exception as e:
         print(f"エラー: {str(e)}")
         sys.exit(1)
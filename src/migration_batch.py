@@ -0,0 +1,190 @@
+"""
+移行用QRコードのバッチ収集モジュール
+Google Authenticatorのエクスポートは件数が多いと複数のQRコード
+（otpauth-migration://offline?data=...）に分割される。各QRコードのペイロードから
+バッチ情報（batch_id・batch_index・batch_size）を読み取り、全てのQRコードが
+揃うまで重複を除いて収集する
+"""
+
+import base64
+import hashlib
+import threading
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+from urllib.parse import parse_qs, urlparse
+
+MIGRATION_PREFIX = "otpauth-migration://offline?data="
+
+# MigrationPayload（protobuf）のフィールド番号
+FIELD_BATCH_SIZE = 3
+FIELD_BATCH_INDEX = 4
+FIELD_BATCH_ID = 5
+
+
+class BatchInfo(NamedTuple):
+    """移行用QRコードのバッチ情報"""
+
+    batch_id: int
+    batch_index: int
+    batch_size: int
+
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    """protobufのvarintを読み取る（値, 次の位置）"""
+    result = 0
+    shift = 0
+    while True:
+        if pos >= len(data) or shift > 63:
+            raise ValueError("varintが不正です")
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def decode_migration_data(qr_data: str) -> bytes:
+    """
+    移行用QRコードのdataパラメータをデコード
+
+    Args:
+        qr_data: QRコードのデータ
+
+    Returns:
+        MigrationPayloadのバイト列
+    """
+    values = parse_qs(urlparse(qr_data).query).get("data")
+    if not values:
+        raise ValueError("dataパラメータがありません")
+    # parse_qs は "+" を空白に変換するため元に戻す
+    encoded = values[0].replace(" ", "+")
+    encoded += "=" * (-len(encoded) % 4)
+    return base64.b64decode(encoded, validate=True)
+
+
+def parse_batch_info(qr_data: str) -> Optional[BatchInfo]:
+    """
+    移行用QRコードからバッチ情報を取得
+
+    Args:
+        qr_data: QRコードのデータ
+
+    Returns:
+        バッチ情報（移行用QRコードとして解析できない場合はNone）
+    """
+    if not qr_data or not qr_data.startswith(MIGRATION_PREFIX):
+        return None
+    try:
+        data = decode_migration_data(qr_data)
+        fields = {FIELD_BATCH_SIZE: 1, FIELD_BATCH_INDEX: 0, FIELD_BATCH_ID: 0}
+        pos = 0
+        while pos < len(data):
+            key, pos = _read_varint(data, pos)
+            field, wire_type = key >> 3, key & 0x07
+            if wire_type == 0:
+                value, pos = _read_varint(data, pos)
+                if field in fields:
+                    fields[field] = value
+            elif wire_type == 2:
+                length, pos = _read_varint(data, pos)
+                pos += length
+            elif wire_type == 1:
+                pos += 8
+            elif wire_type == 5:
+                pos += 4
+            else:
+                raise ValueError(f"未対応のワイヤータイプです: {wire_type}")
+        if pos > len(data):
+            raise ValueError("ペイロードが途中で切れています")
+    except ValueError:
+        return None
+
+    # batch_id は int32（負の値は64ビットの2の補数で格納される）
+    batch_id = fields[FIELD_BATCH_ID]
+    if batch_id >= 1 << 63:
+        batch_id -= 1 << 64
+    batch_size = max(1, fields[FIELD_BATCH_SIZE])
+    batch_index = fields[FIELD_BATCH_INDEX]
+    if batch_index >= batch_size:
+        return None
+    return BatchInfo(batch_id, batch_index, batch_size)
+
+
+class MigrationBatchCollector:
+    """分割された移行用QRコードを全て揃うまで収集するクラス"""
+
+    def __init__(self) -> None:
+        """初期化"""
+        self.batch_id: Optional[int] = None
+        self.batch_size = 0
+        self._parts: Dict[int, str] = {}
+        self._seen: Set[bytes] = set()
+        self._lock = threading.Lock()
+
+    @property
+    def collected(self) -> int:
+        """収集済みのQRコードの数"""
+        return len(self._parts)
+
+    @property
+    def is_complete(self) -> bool:
+        """全てのQRコードが揃ったか"""
+        return self.batch_size > 0 and len(self._parts) == self.batch_size
+
+    def add(self, qr_data: str) -> bool:
+        """
+        QRコードを追加
+
+        バッチ情報を読み取れないQRコードは、それだけで完結する1件のバッチとして扱う
+
+        Args:
+            qr_data: QRコードのデータ
+
+        Returns:
+            新しいQRコードとして追加した場合True
+            （読み取り済み・別のエクスポートのQRコード・収集完了後はFalse）
+        """
+        digest = hashlib.sha256(qr_data.encode("utf-8")).digest()
+        with self._lock:
+            if digest in self._seen or self.is_complete:
+                return False
+            self._seen.add(digest)
+
+            info = parse_batch_info(qr_data)
+            if info is None:
+                if self._parts:
+                    return False
+                info = BatchInfo(0, 0, 1)
+
+            if self._parts and (
+                info.batch_id != self.batch_id or info.batch_size != self.batch_size
+            ):
+                print("別のエクスポートのQRコードのため無視します")
+                return False
+            if info.batch_index in self._parts:
+                return False
+
+            self.batch_id = info.batch_id
+            self.batch_size = info.batch_size
+            self._parts[info.batch_index] = qr_data
+            return True
+
+    def missing_indices(self) -> List[int]:
+        """
+        未読み取りのQRコードの番号を取得
+
+        Returns:
+            未読み取りのバッチ番号（0始まり）のリスト
+        """
+        with self._lock:
+            return [i for i in range(self.batch_size) if i not in self._parts]
+
+    def payloads(self) -> List[str]:
+        """
+        収集したQRコードを取得
+
+        Returns:
+            バッチ番号順のQRコードのデータのリスト
+        """
+        with self._lock:
+            return [self._parts[i] for i in sorted(self._parts)]
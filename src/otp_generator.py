@@ -1,25 +1,97 @@
 """
 ワンタイムパスワード生成モジュール
-pyotpライブラリを使用してOTPを生成・管理
+事前計算済みHMAC状態を再利用するTOTPエンジンでOTPを生成・管理
 """
 
+import hashlib
 import pyotp
 import time
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 import threading
 
+from .refresh_scheduler import RefreshScheduler
+from .replay_store import ReplayStore
+from .terminal_renderer import TerminalRenderer
+from .totp_engine import (
+    DEFAULT_ALGORITHM,
+    DEFAULT_DIGITS,
+    DEFAULT_PERIOD,
+    OTPParameters,
+    TOTPEngine,
+    account_otp_parameters,
+    normalize_otp_parameters,
+)
+
 
 class OTPGenerator:
     """ワンタイムパスワード生成クラス"""
 
-    def __init__(self) -> None:
-        """初期化"""
+    def __init__(self, replay_store: Optional[ReplayStore] = None) -> None:
+        """
+        初期化
+
+        Args:
+            replay_store: 検証済みOTPの再利用を拒否するストア（Noneの場合は確認しない）
+        """
         self.running = False
+        self.replay_store = replay_store
         self.update_thread: Optional[threading.Thread] = None
+        self.engine = TOTPEngine()
+        self._engines: Dict[OTPParameters, TOTPEngine] = {}
+        self._stop_event = threading.Event()
+        self.renderer = TerminalRenderer()
+
+    def _get_engine(
+        self,
+        period: int = DEFAULT_PERIOD,
+        algorithm: str = DEFAULT_ALGORITHM,
+        digits: int = DEFAULT_DIGITS,
+    ) -> TOTPEngine:
+        """
+        OTP生成パラメータに対応するTOTPエンジンを取得
+        同じ (アルゴリズム, 桁数, 周期) のアカウントは同じエンジンを共有する
+
+        Args:
+            period: TOTP周期（秒）
+            algorithm: アルゴリズム名
+            digits: 桁数
+
+        Returns:
+            TOTPエンジン
+        """
+        params = normalize_otp_parameters(algorithm, digits, period)
+        if params == (DEFAULT_ALGORITHM, DEFAULT_DIGITS, DEFAULT_PERIOD):
+            return self.engine
+        engine = self._engines.get(params)
+        if engine is None:
+            engine = self._engines.setdefault(
+                params, TOTPEngine.for_parameters(*params)
+            )
+        return engine
+
+    def _get_account_engine(self, account: Dict[str, Any]) -> TOTPEngine:
+        """
+        アカウントのOTP生成パラメータに対応するTOTPエンジンを取得
+
+        Args:
+            account: アカウント情報
+
+        Returns:
+            TOTPエンジン
+        """
+        algorithm, digits, period = account_otp_parameters(account)
+        return self._get_engine(period, algorithm, digits)
 
     def generate_otp(
-        self, secret: str, account_name: str = "Unknown"
+        self,
+        secret: str,
+        account_name: str = "Unknown",
+        for_time: Optional[float] = None,
+        timestamp: Optional[datetime] = None,
+        period: int = DEFAULT_PERIOD,
+        algorithm: str = DEFAULT_ALGORITHM,
+        digits: int = DEFAULT_DIGITS,
     ) -> Dict[str, Any]:
         """
         ワンタイムパスワードを生成
@@ -27,39 +99,135 @@ class OTPGenerator:
         Args:
             secret: セキュリティコード
             account_name: アカウント名
+            for_time: 生成時刻（UNIX時刻、省略時は現在時刻）
+            timestamp: 結果に記録する時刻（省略時は現在時刻）
+            period: TOTP周期（秒）
+            algorithm: アルゴリズム名（SHA1・SHA256・SHA512）
+            digits: 桁数
 
         Returns:
             OTP情報を含む辞書
         """
         try:
-            # TOTPオブジェクトを作成
-            totp = pyotp.TOTP(secret)
+            if for_time is None:
+                for_time = time.time()
 
-            # 現在のOTPを生成
-            current_otp = totp.now()
+            # OTPを生成（同じ周期内はエンジンが前回の結果を返す）
+            engine = self._get_engine(period, algorithm, digits)
+            current_otp = engine.generate(secret, for_time)
 
             # 残り時間を計算
-            remaining_time = self._calculate_remaining_time()
+            remaining_time = self._calculate_remaining_time(for_time, engine.period)
 
             return {
                 "otp": current_otp,
                 "account_name": account_name,
                 "remaining_seconds": remaining_time,
-                "timestamp": datetime.now(),
+                "period": engine.period,
+                "timestamp": timestamp or datetime.now(),
                 "secret": secret,  # デバッグ用（本番では削除）
             }
         except Exception as e:
             raise Exception(f"OTP生成エラー ({account_name}): {str(e)}")
 
-    def _calculate_remaining_time(self) -> int:
+    def verify(
+        self,
+        account: Dict[str, Any],
+        code: str,
+        window: int = 1,
+        for_time: Optional[float] = None,
+    ) -> bool:
+        """
+        ユーザーが入力したOTPを検証（現在の周期±windowを許容）
+        replay_store が設定されている場合、受理済みのコードは期限内は再度受理しない
+
+        Args:
+            account: アカウント情報（secretを含む）
+            code: 検証するOTP
+            window: 前後に許容する周期数
+            for_time: 検証時刻（UNIX時刻、省略時は現在時刻）
+
+        Returns:
+            一致する場合True
+        """
+        try:
+            if for_time is None:
+                for_time = time.time()
+            engine = self._get_account_engine(account)
+            counter = engine.match_counter(account["secret"], code, for_time, window)
+            if counter is None:
+                return False
+            if self.replay_store is None:
+                return True
+
+            # このコードが受理されなくなる時刻まで使用済みとして記録
+            expires_at = float((counter + window + 1) * engine.period)
+            return self.replay_store.check_and_add(
+                self._replay_key(account), counter, expires_at, for_time
+            )
+        except Exception as e:
+            raise Exception(
+                f"OTP検証エラー ({account.get('account_name', 'Unknown')}): {str(e)}"
+            )
+
+    @staticmethod
+    def _replay_key(account: Dict[str, Any]) -> str:
+        """
+        リプレイ防止ストアで使用するアカウントのキー
+
+        Args:
+            account: アカウント情報
+
+        Returns:
+            アカウントID（IDがない場合はシークレットのハッシュ）
+        """
+        if account.get("id"):
+            return str(account["id"])
+        return hashlib.sha256(account["secret"].encode("utf-8")).hexdigest()
+
+    def verify_many(
+        self,
+        pairs: Iterable[Tuple[Dict[str, Any], str]],
+        window: int = 1,
+        for_time: Optional[float] = None,
+    ) -> List[bool]:
+        """
+        複数の (アカウント, OTP) をまとめて検証（全件で同じ時刻を使用）
+
+        Args:
+            pairs: (アカウント情報, 検証するOTP) のリスト
+            window: 前後に許容する周期数
+            for_time: 検証時刻（UNIX時刻、省略時は現在時刻）
+
+        Returns:
+            各組の検証結果のリスト（検証できないアカウントはFalse）
         """
-        残り時間を計算（30秒周期）
+        if for_time is None:
+            for_time = time.time()
+
+        results = []
+        for account, code in pairs:
+            try:
+                results.append(self.verify(account, code, window, for_time))
+            except Exception as e:
+                print(f"エラー: {account.get('account_name', 'Unknown')} - {str(e)}")
+                results.append(False)
+        return results
+
+    def _calculate_remaining_time(
+        self, for_time: Optional[float] = None, period: int = DEFAULT_PERIOD
+    ) -> int:
+        """
+        残り時間を計算
+
+        Args:
+            for_time: 基準時刻（UNIX時刻、省略時は現在時刻）
+            period: TOTP周期（秒、既定は30秒）
 
         Returns:
             残り秒数
         """
-        current_time = int(time.time())
-        period = 30  # TOTPの周期は30秒
+        current_time = int(time.time() if for_time is None else for_time)
         remaining = period - (current_time % period)
         return remaining
 
@@ -75,12 +243,22 @@ class OTPGenerator:
         Returns:
             OTP情報のリスト
         """
+        # 全アカウントで同じ時刻を使用（周期の境界をまたいでも表示が揃う）
+        for_time = time.time()
+        timestamp = datetime.now()
         otps = []
         for account in accounts:
             try:
                 if "secret" in account:
+                    algorithm, digits, period = account_otp_parameters(account)
                     otp_info = self.generate_otp(
-                        account["secret"], account.get("account_name", "Unknown")
+                        account["secret"],
+                        account.get("account_name", "Unknown"),
+                        for_time,
+                        timestamp,
+                        period,
+                        algorithm,
+                        digits,
                     )
                     otps.append(otp_info)
             except Exception as e:
@@ -88,6 +266,43 @@ class OTPGenerator:
                 continue
         return otps
 
+    def generate_codes(
+        self, accounts: List[Dict[str, Any]], for_time: Optional[float] = None
+    ) -> List[Optional[str]]:
+        """
+        複数のアカウントのOTPを一括生成（大量アカウントの監査などで使用）
+        (アルゴリズム, 桁数, 周期) ごとにまとめて generate_batch で計算する
+
+        Args:
+            accounts: アカウント情報のリスト（secretを含む）
+            for_time: 生成時刻（UNIX時刻、省略時は現在時刻）
+
+        Returns:
+            OTPのリスト（入力と同じ順序、生成できないアカウントはNone）
+        """
+        if for_time is None:
+            for_time = time.time()
+
+        groups: Dict[OTPParameters, Tuple[List[int], List[bytes]]] = {}
+        for index, account in enumerate(accounts):
+            try:
+                params = account_otp_parameters(account)
+                key = TOTPEngine.decode_secret(account["secret"])
+            except Exception as e:
+                print(f"エラー: {account.get('account_name', 'Unknown')} - {str(e)}")
+                continue
+            members, keys = groups.setdefault(params, ([], []))
+            members.append(index)
+            keys.append(key)
+
+        codes: List[Optional[str]] = [None] * len(accounts)
+        for (algorithm, digits, period), (members, keys) in groups.items():
+            engine = self._get_engine(period, algorithm, digits)
+            values = engine.format_codes(engine.generate_batch(keys, for_time))
+            for index, code in zip(members, values):
+                codes[index] = code
+        return codes
+
     def start_realtime_display(
         self, accounts: List[Dict[str, Any]], update_interval: int = 1
     ) -> None:
@@ -99,6 +314,7 @@ class OTPGenerator:
             update_interval: 更新間隔（秒）
         """
         self.running = True
+        self._stop_event.clear()
         self.update_thread = threading.Thread(
             target=self._realtime_update_loop, args=(accounts, update_interval)
         )
@@ -108,6 +324,7 @@ class OTPGenerator:
     def stop_realtime_display(self) -> None:
         """リアルタイム表示を停止"""
         self.running = False
+        self._stop_event.set()
         if self.update_thread:
             self.update_thread.join()
 
@@ -116,22 +333,39 @@ class OTPGenerator:
     ) -> None:
         """
         リアルタイム更新ループ
+        OTPの再生成は表示中アカウントの周期境界でのみ行い、
+        残り時間のカウントダウンは update_interval ごとに表示だけ更新する
 
         Args:
             accounts: アカウント情報のリスト
-            update_interval: 更新間隔（秒）
+            update_interval: カウントダウン更新間隔（秒）
         """
+        scheduler = RefreshScheduler(
+            (self.account_period(account) for account in accounts), update_interval
+        )
+        otps: List[Dict[str, Any]] = []
+        regenerate = True
+
         while self.running:
             try:
-                # 画面をクリア
-                self._clear_screen()
-
-                # OTPを生成・表示
-                otps = self.generate_multiple_otps(accounts)
-                self._display_otps(otps)
-
-                # 更新間隔分待機
-                time.sleep(update_interval)
+                now = time.time()
+                rolled, ticked = scheduler.pop_due(now)
+                if regenerate or rolled:
+                    # 周期境界: OTPを生成
+                    otps = self.generate_multiple_otps(accounts)
+                    regenerate = False
+                elif ticked:
+                    # カウントダウン: 残り時間のみ更新
+                    self._update_remaining(otps, now)
+
+                if rolled or ticked:
+                    # 変化した行のみ書き換え
+                    self.renderer.render(self._format_otps(otps))
+
+                # 次のタイマーまで待機（停止要求があれば即座に抜ける）
+                timeout = max(0.0, scheduler.next_deadline() - time.time())
+                if self._stop_event.wait(timeout):
+                    break
 
             except KeyboardInterrupt:
                 print("\n\n表示を停止します...")
@@ -139,30 +373,61 @@ class OTPGenerator:
                 break
             except Exception as e:
                 print(f"\nエラー: {str(e)}")
-                time.sleep(update_interval)
+                regenerate = True
+                self.renderer.reset()
+                if self._stop_event.wait(update_interval):
+                    break
 
-    def _clear_screen(self) -> None:
-        """画面をクリア"""
-        import os
+    @staticmethod
+    def account_period(account: Dict[str, Any]) -> int:
+        """
+        アカウントのTOTP周期（不正な値の場合は既定値）
 
-        os.system("cls" if os.name == "nt" else "clear")
+        Args:
+            account: アカウント情報
 
-    def _display_otps(self, otps: List[Dict[str, Any]]) -> None:
+        Returns:
+            周期（秒）
         """
-        OTPを表示
+        try:
+            return account_otp_parameters(account)[2]
+        except ValueError:
+            return DEFAULT_PERIOD
+
+    def _update_remaining(self, otps: List[Dict[str, Any]], now: float) -> None:
+        """
+        表示中のOTP情報の残り時間のみ更新
+
+        Args:
+            otps: OTP情報のリスト
+            now: 現在時刻（UNIX時刻）
+        """
+        for otp_info in otps:
+            otp_info["remaining_seconds"] = self._calculate_remaining_time(
+                now, otp_info.get("period", DEFAULT_PERIOD)
+            )
+
+    def _format_otps(self, otps: List[Dict[str, Any]]) -> List[str]:
+        """
+        OTP表示用の行を作成
 
         Args:
             otps: OTP情報のリスト
+
+        Returns:
+            表示する行のリスト
         """
-        print("=" * 60)
-        print("ワンタイムパスワード")
-        print("=" * 60)
-        print(f"更新時刻: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        print("-" * 60)
+        lines = [
+            "=" * 60,
+            "ワンタイムパスワード",
+            "=" * 60,
+            f"更新時刻: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+            "-" * 60,
+        ]
 
         if not otps:
-            print("登録されているアカウントがありません。")
-            return
+            lines.append("登録されているアカウントがありません。")
+            return lines
 
         for otp_info in otps:
             account_name = otp_info["account_name"]
@@ -170,14 +435,27 @@ class OTPGenerator:
             remaining = otp_info["remaining_seconds"]
 
             # プログレスバーを作成
-            progress_bar = self._create_progress_bar(remaining, 30)
+            progress_bar = self._create_progress_bar(
+                remaining, otp_info.get("period", DEFAULT_PERIOD)
+            )
+
+            lines.append(f"アカウント: {account_name}")
+            lines.append(f"OTP: {otp}")
+            lines.append(f"残り時間: {remaining}秒 {progress_bar}")
+            lines.append("-" * 60)
 
-            print(f"アカウント: {account_name}")
-            print(f"OTP: {otp}")
-            print(f"残り時間: {remaining}秒 {progress_bar}")
-            print("-" * 60)
+        lines.append("")
+        lines.append("Ctrl+C で停止")
+        return lines
 
-        print("\nCtrl+C で停止")
+    def _display_otps(self, otps: List[Dict[str, Any]]) -> None:
+        """
+        OTPを表示
+
+        Args:
+            otps: OTP情報のリスト
+        """
+        print("\n".join(self._format_otps(otps)))
 
     def _create_progress_bar(self, remaining: int, total: int) -> str:
         """
@@ -214,12 +492,23 @@ class OTPGenerator:
         except Exception:
             return False
 
-    def get_secret_info(self, secret: str) -> Dict[str, Any]:
+    def get_secret_info(
+        self,
+        secret: str,
+        algorithm: Optional[str] = None,
+        digits: Optional[int] = None,
+        period: Optional[int] = None,
+        issuer: Optional[str] = None,
+    ) -> Dict[str, Any]:
         """
         セキュリティコードの情報を取得
 
         Args:
             secret: セキュリティコード
+            algorithm: アルゴリズム名（省略時はSHA1）
+            digits: 桁数（省略時は6）
+            period: 周期（秒、省略時は30）
+            issuer: 発行者名
 
         Returns:
             セキュリティコードの情報
@@ -227,12 +516,15 @@ class OTPGenerator:
         try:
             # TOTPオブジェクトを作成して検証
             pyotp.TOTP(secret)
+            algorithm, digits, period = normalize_otp_parameters(
+                algorithm, digits, period
+            )
             return {
                 "valid": True,
-                "algorithm": "SHA1",
-                "digits": 6,
-                "period": 30,
-                "issuer": "Unknown",
+                "algorithm": algorithm,
+                "digits": digits,
+                "period": period,
+                "issuer": issuer or "Unknown",
             }
         except Exception as e:
             return {"valid": False, "error": str(e)}
@@ -0,0 +1,276 @@
+"""
+OTPビューアーモジュール
+cursesによるスクロール可能なTUIで、画面に見えている範囲のアカウントだけ
+OTPを生成・描画する（1フレームの処理量は画面の高さに比例し、件数に依存しない）
+"""
+
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+try:
+    import curses
+except ImportError:  # pragma: no cover - Windows標準のPythonにはcursesがない
+    curses = None  # type: ignore[assignment]
+
+from .otp_generator import OTPGenerator
+from .refresh_scheduler import RefreshScheduler
+from .totp_engine import account_otp_parameters
+
+# 画面上部（タイトル・検索欄）と下部（操作説明）の行数
+HEADER_LINES = 2
+FOOTER_LINES = 1
+
+
+class OTPViewer:
+    """全アカウントのOTPを表示するスクロール・絞り込み対応ビューアー"""
+
+    def __init__(self, generator: OTPGenerator, accounts: List[Dict[str, Any]]) -> None:
+        """
+        初期化
+
+        Args:
+            generator: OTP生成器
+            accounts: アカウント情報のリスト（secretを含む）
+        """
+        self.generator = generator
+        self.accounts = [account for account in accounts if "secret" in account]
+        # 絞り込み用の検索キー（アカウント名・発行者を小文字化して事前計算）
+        self._search_keys = [
+            f"{account.get('account_name', '')}\0{account.get('issuer', '')}".lower()
+            for account in self.accounts
+        ]
+        self.filter_text = ""
+        self._matches: List[int] = list(range(len(self.accounts)))
+        self.selected = 0
+        self.top = 0
+        self.running = False
+
+    @property
+    def match_count(self) -> int:
+        """絞り込み後の件数"""
+        return len(self._matches)
+
+    def set_filter(self, text: str) -> None:
+        """
+        絞り込み文字列を設定
+        文字を追加した場合は現在の一致結果だけを再検査する（インクリメンタル）
+
+        Args:
+            text: 絞り込み文字列（アカウント名・発行者の部分一致、大文字小文字を区別しない）
+        """
+        keyword = text.lower()
+        candidates: Sequence[int]
+        if keyword.startswith(self.filter_text.lower()):
+            candidates = self._matches
+        else:
+            candidates = range(len(self.accounts))
+
+        self._matches = [i for i in candidates if keyword in self._search_keys[i]]
+        self.filter_text = text
+        self.selected = 0
+        self.top = 0
+
+    def move(self, delta: int, page_size: int) -> None:
+        """
+        選択位置を移動し、選択行が見えるようにスクロール
+
+        Args:
+            delta: 移動量（行）
+            page_size: 一覧表示の行数
+        """
+        if not self._matches:
+            self.selected = self.top = 0
+            return
+        self.selected = max(0, min(self.selected + delta, len(self._matches) - 1))
+        page_size = max(1, page_size)
+        if self.selected < self.top:
+            self.top = self.selected
+        elif self.selected >= self.top + page_size:
+            self.top = self.selected - page_size + 1
+
+    def visible_accounts(self, page_size: int) -> List[Dict[str, Any]]:
+        """
+        画面に表示する範囲のアカウントを取得
+
+        Args:
+            page_size: 一覧表示の行数
+
+        Returns:
+            表示範囲のアカウント情報のリスト
+        """
+        window = self._matches[self.top : self.top + max(0, page_size)]
+        return [self.accounts[i] for i in window]
+
+    def build_rows(
+        self, page_size: int, width: int, for_time: Optional[float] = None
+    ) -> List[str]:
+        """
+        表示範囲のアカウントのOTP行を作成（表示範囲外のOTPは生成しない）
+
+        Args:
+            page_size: 一覧表示の行数
+            width: 画面の幅
+            for_time: 生成時刻（UNIX時刻、省略時は現在時刻）
+
+        Returns:
+            表示する行のリスト
+        """
+        if for_time is None:
+            for_time = time.time()
+        timestamp = datetime.now()
+
+        rows = []
+        for account in self.visible_accounts(page_size):
+            name = account.get("account_name", "Unknown")
+            try:
+                algorithm, digits, period = account_otp_parameters(account)
+                otp_info = self.generator.generate_otp(
+                    account["secret"],
+                    name,
+                    for_time,
+                    timestamp,
+                    period,
+                    algorithm,
+                    digits,
+                )
+                otp = otp_info["otp"]
+                remaining = otp_info["remaining_seconds"]
+                bar = self._countdown_bar(remaining, otp_info["period"])
+                status = f"{remaining:>3}秒 {bar}"
+            except Exception:
+                otp, status = "------", "生成エラー"
+
+            issuer = account.get("issuer", "")
+            row = f" {otp:>10}  {status}  {issuer} / {name}"
+            rows.append(row[:width])
+        return rows
+
+    @staticmethod
+    def _countdown_bar(remaining: int, total: int, length: int = 10) -> str:
+        """
+        残り時間の短いバーを作成
+
+        Args:
+            remaining: 残り時間
+            total: 総時間
+            length: バーの長さ
+
+        Returns:
+            バーの文字列
+        """
+        filled = int(length * remaining / total) if total else 0
+        return "█" * filled + "░" * (length - filled)
+
+    def handle_key(self, key: Union[str, int], page_size: int) -> bool:
+        """
+        キー入力を処理
+
+        Args:
+            key: get_wch の戻り値（文字またはキーコード）
+            page_size: 一覧表示の行数
+
+        Returns:
+            表示を続ける場合True
+        """
+        if key in ("\x1b", 27):
+            # Esc: 絞り込みを解除、絞り込みがなければ終了
+            if not self.filter_text:
+                return False
+            self.set_filter("")
+        elif key in (curses.KEY_BACKSPACE, "\x7f", "\b", 127, 8):
+            self.set_filter(self.filter_text[:-1])
+        elif key == curses.KEY_UP:
+            self.move(-1, page_size)
+        elif key == curses.KEY_DOWN:
+            self.move(1, page_size)
+        elif key == curses.KEY_PPAGE:
+            self.move(-page_size, page_size)
+        elif key == curses.KEY_NPAGE:
+            self.move(page_size, page_size)
+        elif key == curses.KEY_HOME:
+            self.move(-self.match_count, page_size)
+        elif key == curses.KEY_END:
+            self.move(self.match_count, page_size)
+        elif isinstance(key, str) and key.isprintable():
+            self.set_filter(self.filter_text + key)
+        return True
+
+    def _draw(self, stdscr: Any) -> int:
+        """
+        1フレームを描画
+
+        Args:
+            stdscr: cursesの画面オブジェクト
+
+        Returns:
+            一覧表示の行数
+        """
+        height, width = stdscr.getmaxyx()
+        page_size = max(0, height - HEADER_LINES - FOOTER_LINES)
+        # 端末サイズが変わった場合も選択行が見えるように調整
+        self.move(0, page_size)
+
+        stdscr.erase()
+        title = (
+            f" ワンタイムパスワード  {self.match_count}/{len(self.accounts)}件  "
+            f"{datetime.now().strftime('%H:%M:%S')}"
+        )
+        self._add_line(stdscr, 0, title, width, curses.A_BOLD)
+        self._add_line(stdscr, 1, f" 検索: {self.filter_text}", width)
+
+        for offset, row in enumerate(self.build_rows(page_size, width)):
+            attr = curses.A_REVERSE if self.top + offset == self.selected else 0
+            self._add_line(stdscr, HEADER_LINES + offset, row, width, attr)
+
+        help_text = " ↑↓ PgUp/PgDn: 移動  文字入力: 絞り込み  Esc: 解除/終了"
+        self._add_line(stdscr, height - 1, help_text, width, curses.A_DIM)
+        stdscr.refresh()
+        return int(page_size)
+
+    @staticmethod
+    def _add_line(stdscr: Any, row: int, text: str, width: int, attr: int = 0) -> None:
+        """画面の1行に文字列を書き込む（右端・下端の書き込みエラーは無視）"""
+        if row < 0 or width <= 0:
+            return
+        try:
+            stdscr.addnstr(row, 0, text, width - 1, attr)
+        except curses.error:
+            pass
+
+    def run(self, stdscr: Any) -> None:
+        """
+        ビューアーのメインループ（curses.wrapperから呼び出す）
+
+        Args:
+            stdscr: cursesの画面オブジェクト
+        """
+        try:
+            curses.curs_set(0)
+        except curses.error:
+            pass
+
+        scheduler = RefreshScheduler(
+            OTPGenerator.account_period(account) for account in self.accounts
+        )
+        self.running = True
+        while self.running:
+            page_size = self._draw(stdscr)
+
+            # 次の周期境界またはカウントダウン更新までキー入力を待つ
+            timeout = scheduler.next_deadline() - time.time()
+            stdscr.timeout(max(0, int(timeout * 1000)))
+            try:
+                key = stdscr.get_wch()
+            except curses.error:
+                key = None
+
+            if key is not None and not self.handle_key(key, page_size):
+                self.running = False
+            scheduler.pop_due(time.time())
+
+    def start(self) -> None:
+        """ビューアーを起動"""
+        if curses is None:
+            raise Exception("TUI表示エラー: cursesが利用できません")
+        curses.wrapper(self.run)
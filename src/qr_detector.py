@@ -0,0 +1,277 @@
+"""
+段階的QRコード検出モジュール
+縮小したグレースケール画像で高速な detect()（ArUcoベースの検出器）を行い、
+候補が見つかった場合だけ元の解像度から切り出して正面化した領域をデコードする
+（1フレーム内の複数のQRコードにも対応）。
+また前回処理したフレームからほとんど変化のないフレームは処理をスキップする
+"""
+
+from typing import List, Optional, Tuple, cast
+
+import cv2
+import numpy as np
+
+# 正面化した領域の一辺（ピクセル）の範囲
+MIN_ROI_SIDE = 64
+MAX_ROI_SIDE = 480
+
+
+def _to_gray(image: np.ndarray, dst: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    BGR画像をグレースケールに変換（既にグレースケールの場合はコピー）
+
+    呼び出し側は結果を作業バッファとして使い回すため、入力と同じ配列は返さない
+    """
+    if image.ndim == 2:
+        if dst is None or dst.shape != image.shape or dst.dtype != image.dtype:
+            return image.copy()
+        np.copyto(dst, image)
+        return dst
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY, dst=dst)
+
+
+def _scaled_size(shape: Tuple[int, ...], width: int) -> Tuple[int, int]:
+    """幅を指定値以下に縮小したサイズ (幅, 高さ) を計算（縦横比は維持）"""
+    height, frame_width = shape[:2]
+    if frame_width <= width:
+        return frame_width, height
+    return width, max(1, round(height * width / frame_width))
+
+
+class MotionGate:
+    """縮小グレースケール画像のフレーム間差分で処理の要否を判定するクラス"""
+
+    def __init__(
+        self,
+        width: int = 160,
+        pixel_threshold: int = 12,
+        changed_ratio: float = 0.01,
+        max_skip: int = 30,
+    ) -> None:
+        """
+        初期化
+
+        Args:
+            width: 比較に使用する縮小画像の幅
+            pixel_threshold: 変化したとみなす画素値の差
+            changed_ratio: 処理が必要とみなす変化した画素の割合
+            max_skip: 連続してスキップするフレーム数の上限（静止していても定期的に処理する）
+        """
+        self.width = width
+        self.pixel_threshold = pixel_threshold
+        self.changed_ratio = changed_ratio
+        self.max_skip = max_skip
+        self._skipped = 0
+        # 比較用の作業バッファ（フレームごとに確保しない）
+        self._resized: Optional[np.ndarray] = None
+        self._current: Optional[np.ndarray] = None
+        self._reference: Optional[np.ndarray] = None
+        self._diff: Optional[np.ndarray] = None
+
+    def reset(self) -> None:
+        """基準フレームを破棄（次のフレームは必ず処理する）"""
+        self._reference = None
+        self._skipped = 0
+
+    def should_process(self, frame: np.ndarray) -> bool:
+        """
+        フレームを処理する必要があるか判定
+
+        Args:
+            frame: カメラのフレーム（BGRまたはグレースケール）
+
+        Returns:
+            前回処理したフレームから変化がある場合True
+        """
+        size = _scaled_size(frame.shape, self.width)
+        self._resized = cv2.resize(
+            frame, size, dst=self._resized, interpolation=cv2.INTER_AREA
+        )
+        self._current = _to_gray(self._resized, self._current)
+
+        reference = self._reference
+        if reference is None or reference.shape != self._current.shape:
+            self._reference = self._current.copy()
+            self._skipped = 0
+            return True
+
+        self._diff = cv2.absdiff(self._current, reference, dst=self._diff)
+        cv2.threshold(
+            self._diff, self.pixel_threshold, 255, cv2.THRESH_BINARY, dst=self._diff
+        )
+        changed = cv2.countNonZero(self._diff) / self._diff.size
+        if changed < self.changed_ratio and self._skipped < self.max_skip:
+            self._skipped += 1
+            return False
+
+        # 処理するフレームを次の基準にする（バッファを入れ替えてコピーしない）
+        self._reference, self._current = self._current, reference
+        self._skipped = 0
+        return True
+
+
+class StagedQRDetector:
+    """縮小画像での検出と切り出し領域のデコードを段階的に行うQRコード検出クラス"""
+
+    def __init__(self, scale_width: int = 320, roi_margin: float = 0.1) -> None:
+        """
+        初期化
+
+        Args:
+            scale_width: 検出に使用する縮小画像の幅
+            roi_margin: 正面化した領域に加える余白（QRコードの一辺に対する割合）
+        """
+        self.scale_width = scale_width
+        self.roi_margin = roi_margin
+        self.detector = cv2.QRCodeDetector()
+        # 候補の検出にはより高速なArUcoベースの検出器を使う（OpenCV 4.8以降）
+        aruco_detector = getattr(cv2, "QRCodeDetectorAruco", None)
+        self.candidate_detector = (
+            aruco_detector() if aruco_detector is not None else self.detector
+        )
+        # 縮小・グレースケール変換の作業バッファ（フレームごとに確保しない）
+        self._resized: Optional[np.ndarray] = None
+        self._gray: Optional[np.ndarray] = None
+
+    def _downscale(self, frame: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        検出用の縮小グレースケール画像を作成
+
+        Returns:
+            (縮小グレースケール画像, 元の解像度に戻す倍率 [x, y])
+        """
+        size = _scaled_size(frame.shape, self.scale_width)
+        if size == (frame.shape[1], frame.shape[0]):
+            small = frame
+        else:
+            self._resized = cv2.resize(
+                frame, size, dst=self._resized, interpolation=cv2.INTER_AREA
+            )
+            small = self._resized
+        self._gray = _to_gray(small, self._gray)
+        scale = np.array(
+            [frame.shape[1] / size[0], frame.shape[0] / size[1]], dtype=np.float32
+        )
+        return self._gray, scale
+
+    def detect(self, frame: np.ndarray) -> Optional[np.ndarray]:
+        """
+        縮小したグレースケール画像でQRコードの候補を検出
+
+        Args:
+            frame: カメラのフレーム（BGRまたはグレースケール）
+
+        Returns:
+            元の解像度でのQRコードの四隅の座標（4x2、候補がない場合はNone）
+        """
+        gray, scale = self._downscale(frame)
+        found, points = self.candidate_detector.detect(gray)
+        if not found or points is None:
+            return None
+        return cast(np.ndarray, points.reshape(4, 2).astype(np.float32) * scale)
+
+    def detect_multi(self, frame: np.ndarray) -> List[np.ndarray]:
+        """
+        縮小したグレースケール画像で複数のQRコードの候補を検出
+
+        Args:
+            frame: カメラのフレーム（BGRまたはグレースケール）
+
+        Returns:
+            元の解像度でのQRコードの四隅の座標（4x2）のリスト
+        """
+        gray, scale = self._downscale(frame)
+        found, points = self.candidate_detector.detectMulti(gray)
+        if not found or points is None:
+            return []
+        return [quad * scale for quad in points.reshape(-1, 4, 2).astype(np.float32)]
+
+    def rectify(
+        self, frame: np.ndarray, points: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        QRコードの領域を元の解像度から切り出して正面化
+
+        Args:
+            frame: カメラのフレーム
+            points: QRコードの四隅の座標（4x2）
+
+        Returns:
+            (正面化したグレースケール画像, 画像内のQRコードの四隅の座標)
+        """
+        edges = np.linalg.norm(points - np.roll(points, -1, axis=0), axis=1)
+        side = int(np.clip(edges.max(), MIN_ROI_SIDE, MAX_ROI_SIDE))
+        margin = max(4, int(side * self.roi_margin))
+        corners = np.array(
+            [
+                [margin, margin],
+                [margin + side, margin],
+                [margin + side, margin + side],
+                [margin, margin + side],
+            ],
+            dtype=np.float32,
+        )
+        transform = cv2.getPerspectiveTransform(points, corners)
+        roi = cv2.warpPerspective(
+            frame,
+            transform,
+            (side + 2 * margin, side + 2 * margin),
+            borderMode=cv2.BORDER_REPLICATE,
+        )
+        return _to_gray(roi), corners
+
+    def detect_and_decode(self, frame: np.ndarray) -> Tuple[str, Optional[np.ndarray]]:
+        """
+        QRコードを検出してデコード（候補がないフレームはデコードしない）
+
+        Args:
+            frame: カメラのフレーム（BGRまたはグレースケール）
+
+        Returns:
+            (QRコードのデータ（デコードできない場合は空文字列),
+             元の解像度でのQRコードの四隅の座標（候補がない場合はNone）)
+        """
+        points = self.detect(frame)
+        if points is None:
+            return "", None
+        return self._decode_candidate(frame, points), points
+
+    def detect_and_decode_multi(
+        self, frame: np.ndarray
+    ) -> Tuple[List[str], List[np.ndarray]]:
+        """
+        フレーム内の全てのQRコードを検出してデコード
+
+        Args:
+            frame: カメラのフレーム（BGRまたはグレースケール）
+
+        Returns:
+            (デコードできたQRコードのデータのリスト（重複なし）,
+             それぞれの元の解像度での四隅の座標のリスト)
+        """
+        payloads: List[str] = []
+        found: List[np.ndarray] = []
+        for points in self.detect_multi(frame):
+            data = self._decode_candidate(frame, points)
+            if data and data not in payloads:
+                payloads.append(data)
+                found.append(points)
+        return payloads, found
+
+    def _decode_candidate(self, frame: np.ndarray, points: np.ndarray) -> str:
+        """
+        候補の領域を正面化してデコード
+
+        Args:
+            frame: カメラのフレーム
+            points: 元の解像度でのQRコードの四隅の座標（4x2）
+
+        Returns:
+            QRコードのデータ（デコードできない場合は空文字列）
+        """
+        roi, corners = self.rectify(frame, points)
+        data, _ = self.detector.decode(roi, corners.reshape(1, 4, 2))
+        if not data:
+            # 縮小画像での座標の誤差でデコードできない場合は切り出し領域内で検出し直す
+            data, _, _ = self.detector.detectAndDecode(roi)
+        return data or ""
@@ -0,0 +1,97 @@
+"""
+OTP表示更新スケジューラー
+各TOTP周期の境界（OTPが切り替わる時刻）をタイマーヒープで管理し、
+残り時間表示用のカウントダウンは別の軽量なタイマーとしてまとめて扱う
+"""
+
+import heapq
+import math
+import time
+from typing import Iterable, List, Optional, Set, Tuple
+
+
+class RefreshScheduler:
+    """周期境界とカウントダウンのタイマーを管理するクラス"""
+
+    def __init__(
+        self,
+        periods: Iterable[int],
+        tick_interval: float = 1.0,
+        now: Optional[float] = None,
+    ) -> None:
+        """
+        初期化
+
+        Args:
+            periods: 表示中アカウントのTOTP周期（秒）
+            tick_interval: カウントダウン更新間隔（秒）
+            now: 基準時刻（UNIX時刻、省略時は現在時刻）
+        """
+        self.tick_interval = tick_interval
+        self._periods: Set[int] = set()
+        self._heap: List[Tuple[float, int]] = []
+        self._next_tick = 0.0
+        self.set_periods(periods, now)
+
+    @staticmethod
+    def next_boundary(now: float, period: int) -> float:
+        """
+        次の周期境界の時刻を計算
+
+        Args:
+            now: 基準時刻（UNIX時刻）
+            period: TOTP周期（秒）
+
+        Returns:
+            次にOTPが切り替わる時刻
+        """
+        return float((int(now) // period + 1) * period)
+
+    def set_periods(self, periods: Iterable[int], now: Optional[float] = None) -> None:
+        """
+        監視する周期を設定（同じ周期のアカウントは1つのタイマーにまとめる）
+
+        Args:
+            periods: TOTP周期（秒）
+            now: 基準時刻（UNIX時刻、省略時は現在時刻）
+        """
+        if now is None:
+            now = time.time()
+        self._periods = {int(period) for period in periods if period and period > 0}
+        self._heap = [(self.next_boundary(now, p), p) for p in self._periods]
+        heapq.heapify(self._heap)
+        self._next_tick = now
+
+    def next_deadline(self) -> float:
+        """
+        次に処理が必要な時刻を取得
+
+        Returns:
+            周期境界とカウントダウンのうち早い方の時刻
+        """
+        if self._heap:
+            return min(self._heap[0][0], self._next_tick)
+        return self._next_tick
+
+    def pop_due(self, now: float) -> Tuple[List[int], bool]:
+        """
+        期限を迎えたタイマーを取り出し、次の時刻で再登録
+
+        Args:
+            now: 現在時刻（UNIX時刻）
+
+        Returns:
+            (OTPが切り替わった周期のリスト, カウントダウン更新が必要か)
+        """
+        rolled = []
+        while self._heap and self._heap[0][0] <= now:
+            _, period = heapq.heappop(self._heap)
+            rolled.append(period)
+            heapq.heappush(self._heap, (self.next_boundary(now, period), period))
+
+        ticked = self._next_tick <= now
+        if ticked or rolled:
+            # 遅れて起床した場合も取りこぼした分はまとめて1回の更新にする
+            interval = self.tick_interval
+            self._next_tick = (math.floor(now / interval) + 1) * interval
+        return rolled, ticked or bool(rolled)
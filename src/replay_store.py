@@ -0,0 +1,223 @@
+"""
+リプレイ防止ストア
+検証に成功したOTPを (アカウントID, カウンタ値) で記録し、許容範囲（window）を
+過ぎるまで同じコードの再利用を拒否する。件数の上限と、再起動をまたぐための
+追記型ファイルへの永続化（任意）に対応する
+"""
+
+import heapq
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .account_storage import write_file_atomic
+
+
+class ReplayStore:
+    """使用済みOTPを有効期限付きで保持するクラス"""
+
+    DEFAULT_MAX_ENTRIES = 100000
+    # 永続化ファイルを書き直す行数の下限
+    COMPACT_MIN_LINES = 1024
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        persist_file: Optional[str] = None,
+        fsync: bool = False,
+    ) -> None:
+        """
+        初期化
+
+        Args:
+            max_entries: 保持する件数の上限（超えた場合は期限の近いものから破棄）
+            persist_file: 永続化ファイルのパス（Noneの場合はメモリのみ）
+            fsync: 記録ごとに永続化ファイルをfsyncするか（Falseの場合はOSへの書き出しのみ）
+        """
+        self.max_entries = max(1, max_entries)
+        self.persist_file = persist_file
+        self.fsync = fsync
+        self._entries: Dict[Tuple[str, int], float] = {}
+        self._heap: List[Tuple[float, str, int]] = []
+        self._lock = threading.Lock()
+        self._file: Optional[Any] = None
+        self._file_lines = 0
+        self.reset_metrics()
+
+        if persist_file:
+            self._load()
+            self._compact()
+
+    def __len__(self) -> int:
+        """保持している件数"""
+        return len(self._entries)
+
+    def __contains__(self, key: Tuple[str, int]) -> bool:
+        """(アカウントID, カウンタ値) が記録済みか"""
+        return key in self._entries
+
+    def reset_metrics(self) -> None:
+        """メトリクスのカウンタを初期化"""
+        self.added = 0
+        self.rejected = 0
+        self.expired = 0
+        self.evicted = 0
+        self._metrics_started = time.monotonic()
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        メトリクスを取得
+
+        Returns:
+            件数・上限・記録数・拒否数（リプレイ）・期限切れ・上限による破棄と
+            1秒あたりの破棄件数（eviction_rate）を含む辞書
+        """
+        with self._lock:
+            elapsed = max(time.monotonic() - self._metrics_started, 1e-9)
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "added": self.added,
+                "rejected": self.rejected,
+                "expired": self.expired,
+                "evicted": self.evicted,
+                "eviction_rate": (self.expired + self.evicted) / elapsed,
+            }
+
+    def check_and_add(
+        self,
+        account_id: str,
+        counter: int,
+        expires_at: float,
+        now: Optional[float] = None,
+    ) -> bool:
+        """
+        未使用であれば記録する
+
+        Args:
+            account_id: アカウントID
+            counter: 検証に成功したカウンタ値
+            expires_at: 記録を破棄してよい時刻（UNIX時刻、コードが受理されなくなる時刻）
+            now: 現在時刻（UNIX時刻、省略時は現在時刻）
+
+        Returns:
+            初めての使用で記録した場合True、使用済み（リプレイ）の場合False
+        """
+        if now is None:
+            now = time.time()
+        key = (account_id, counter)
+
+        with self._lock:
+            self._evict_expired(now)
+            if key in self._entries:
+                self.rejected += 1
+                return False
+            if expires_at <= now:
+                # 既に受理されない時刻のコードは記録不要
+                return True
+
+            self._insert(key, expires_at)
+            self.added += 1
+            self._append(key, expires_at)
+            return True
+
+    def evict_expired(self, now: Optional[float] = None) -> int:
+        """
+        期限切れの記録を破棄
+
+        Args:
+            now: 現在時刻（UNIX時刻、省略時は現在時刻）
+
+        Returns:
+            破棄した件数
+        """
+        with self._lock:
+            return self._evict_expired(time.time() if now is None else now)
+
+    def _evict_expired(self, now: float) -> int:
+        """期限切れの記録を破棄（ロック取得済みで呼び出す）"""
+        count = 0
+        while self._heap and self._heap[0][0] <= now:
+            _, account_id, counter = heapq.heappop(self._heap)
+            del self._entries[(account_id, counter)]
+            count += 1
+        self.expired += count
+        return count
+
+    def _insert(self, key: Tuple[str, int], expires_at: float) -> None:
+        """記録を追加し、上限を超えた場合は期限の近いものから破棄"""
+        self._entries[key] = expires_at
+        heapq.heappush(self._heap, (expires_at, key[0], key[1]))
+        while len(self._entries) > self.max_entries:
+            _, account_id, counter = heapq.heappop(self._heap)
+            del self._entries[(account_id, counter)]
+            self.evicted += 1
+
+    def _load(self) -> None:
+        """永続化ファイルから期限内の記録を読み込む"""
+        if not self.persist_file or not os.path.exists(self.persist_file):
+            return
+
+        now = time.time()
+        with open(self.persist_file, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    account_id, counter, expires_at = json.loads(line)
+                except (ValueError, TypeError):
+                    # 書き込み途中で中断された末尾の行は無視
+                    continue
+                key = (str(account_id), int(counter))
+                if expires_at > now and key not in self._entries:
+                    self._insert(key, float(expires_at))
+
+    def _append(self, key: Tuple[str, int], expires_at: float) -> None:
+        """記録を永続化ファイルに追記（ロック取得済みで呼び出す）"""
+        if self._file is None:
+            return
+        line = json.dumps([key[0], key[1], expires_at], separators=(",", ":"))
+        self._file.write(line + "\n")
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self._file_lines += 1
+
+        if self._file_lines > max(self.COMPACT_MIN_LINES, 2 * len(self._entries)):
+            self._compact()
+
+    def _compact(self) -> None:
+        """期限内の記録だけで永続化ファイルを書き直し、追記用に開き直す"""
+        if not self.persist_file:
+            return
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+        directory = os.path.dirname(self.persist_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        lines = [
+            json.dumps([account_id, counter, expires_at], separators=(",", ":"))
+            for (account_id, counter), expires_at in self._entries.items()
+        ]
+        content = "".join(line + "\n" for line in lines)
+        write_file_atomic(self.persist_file, content.encode("utf-8"))
+
+        fd = os.open(self.persist_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        self._file = os.fdopen(fd, "a", encoding="utf-8")
+        self._file_lines = len(lines)
+
+    def clear(self) -> None:
+        """全ての記録を破棄"""
+        with self._lock:
+            self._entries.clear()
+            self._heap.clear()
+            self._compact()
+
+    def close(self) -> None:
+        """永続化ファイルを閉じる"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
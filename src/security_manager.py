@@ -3,33 +3,175 @@
 アカウント情報の保存・読み込み・管理機能を提供
 """
 
-import json
 import os
 import uuid
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Dict, Iterator, List, Optional, Any, Tuple
+from .account_storage import AccountStorage, create_storage
 from .crypto_utils import CryptoUtils
+from .totp_engine import OTP_PARAMETER_FIELDS, normalize_otp_parameters
+from .unlock_agent import connect_agent
+
+# 並列復号化ワーカープロセス内で使用するCryptoUtils
+_worker_crypto: Optional[CryptoUtils] = None
+
+
+def _init_decrypt_worker(password: str, iterations: int) -> None:
+    """
+    並列復号化ワーカープロセスを初期化
+
+    Args:
+        password: マスターパスワード
+        iterations: 旧形式レコードのPBKDF2反復回数
+    """
+    global _worker_crypto
+    _worker_crypto = CryptoUtils(password)
+    _worker_crypto.PBKDF2_ITERATIONS = iterations
+
+
+def _decrypt_secret(
+    crypto: CryptoUtils, encrypted_secret: str
+) -> Tuple[Optional[str], Optional[str]]:
+    """
+    セキュリティコードを復号化（例外を戻り値に変換）
+
+    Args:
+        crypto: 復号化に使用するCryptoUtils
+        encrypted_secret: 暗号化されたセキュリティコード
+
+    Returns:
+        (復号化されたセキュリティコード, エラーメッセージ)
+    """
+    try:
+        return crypto.decrypt(encrypted_secret), None
+    except Exception as e:
+        return None, str(e)
+
+
+def _decrypt_secret_in_worker(
+    encrypted_secret: str,
+) -> Tuple[Optional[str], Optional[str]]:
+    """
+    ワーカープロセス内でセキュリティコードを復号化
+
+    Args:
+        encrypted_secret: 暗号化されたセキュリティコード
+
+    Returns:
+        (復号化されたセキュリティコード, エラーメッセージ)
+    """
+    assert _worker_crypto is not None
+    return _decrypt_secret(_worker_crypto, encrypted_secret)
 
 
 class SecurityManager:
     """セキュリティコード管理クラス"""
 
+    # データファイルの形式バージョン
+    FORMAT_VERSION = 2
+    # 旧形式レコードの移行時、この件数ごとに途中結果を保存（中断後に再開可能）
+    MIGRATION_BATCH_SIZE = 100
+    # 並列復号化を行う旧形式レコード数の下限（プロセス起動コストとの釣り合い）
+    PARALLEL_DECRYPT_THRESHOLD = 8
+
     def __init__(
-        self, data_file: str = "data/accounts.json", password: Optional[str] = None
+        self,
+        data_file: Optional[str] = None,
+        password: Optional[str] = None,
+        decrypt_workers: Optional[int] = None,
+        decrypt_chunk_size: int = 16,
+        storage: Optional[AccountStorage] = None,
     ):
         """
         初期化
 
         Args:
             data_file: データファイルのパス
+                （Noneの場合は環境変数OTP_DATA_FILE、未設定ならdata/accounts.json。
+                拡張子が.db/.sqlite/.sqlite3の場合はSQLiteで保存）
             password: 暗号化用パスワード
+            decrypt_workers: 並列復号化のワーカープロセス数
+                （Noneの場合は環境変数OTP_DECRYPT_WORKERS、0または1で逐次処理）
+            decrypt_chunk_size: ワーカーへ一度に渡すレコード数
+            storage: 使用するストレージ（Noneの場合はdata_fileから作成）
         """
+        if data_file is None:
+            data_file = os.environ.get("OTP_DATA_FILE", "") or "data/accounts.json"
         self.data_file = data_file
-        self.crypto = CryptoUtils(password)
-        self.accounts: List[Dict[str, Any]] = []
+        if decrypt_workers is None:
+            decrypt_workers = int(os.environ.get("OTP_DECRYPT_WORKERS", "0") or 0)
+        self.decrypt_workers = decrypt_workers
+        self.decrypt_chunk_size = max(1, decrypt_chunk_size)
+        # CryptoUtilsはセキュリティコードが必要になった時点で生成する
+        # （一覧・検索ではパスワード入力もキー導出も行わない）
+        self._password = password
+        self._crypto: Optional[CryptoUtils] = None
+        self.vault: Optional[Dict[str, Any]] = None
+        # アカウントレコードの保存・索引はストレージが担う
+        self._storage = storage if storage is not None else create_storage(data_file)
+        # batch()の入れ子の深さ（最も外側のbatch()の終了時にまとめて保存）
+        self._batch_depth = 0
         self._ensure_data_directory()
         self._load_accounts()
 
+    @property
+    def accounts(self) -> List[Dict[str, Any]]:
+        """アカウントデータ（暗号化済み）のリスト（登録順）"""
+        return list(self._storage.iter_accounts())
+
+    @property
+    def crypto(self) -> CryptoUtils:
+        """ボールトを開いたCryptoUtils（初回アクセス時に生成）"""
+        return self.unlock()
+
+    def unlock(self) -> CryptoUtils:
+        """
+        ボールトを開く（開いていない場合のみ。旧形式レコードはこの時点で移行）
+
+        Returns:
+            ボールトを開いたCryptoUtilsインスタンス
+
+        Raises:
+            Exception: パスワードが正しくない場合（データ消失を防ぐため伝播）
+        """
+        if self._crypto is None:
+            # パスワード未指定で、エージェントがこのボールトを開いていれば利用する
+            # （旧形式レコードの移行にはパスワードが必要なためエージェントは使わない）
+            agent = None
+            if (
+                self._password is None
+                and self.vault is not None
+                and not self._has_legacy_accounts()
+            ):
+                agent = connect_agent()
+            self._crypto = CryptoUtils(self._password, agent=agent)
+            self._open_vault()
+        return self._crypto
+
+    def _open_vault(self) -> None:
+        """読み込んだヘッダーでボールトを開き（未作成の場合は作成して保存）、旧形式を移行"""
+        assert self._crypto is not None
+        vault_created = self.vault is None
+        try:
+            self.vault = self._crypto.unlock_vault(self.vault)
+            if vault_created and self._has_legacy_accounts():
+                # 旧形式のみのデータファイルでは、入力されたパスワードで旧形式レコードを
+                # 復号化できるまで新しいボールトヘッダーを保存しない
+                # （誤ったパスワードでヘッダーを保存すると正しいパスワードで開けなくなる）
+                self._migrate_legacy_accounts(save_vault=True)
+                return
+        except Exception:
+            self._crypto = None
+            if vault_created:
+                self.vault = None
+            raise
+        if vault_created:
+            # 新しく作成したボールトヘッダーを直ちに保存
+            self._save_accounts()
+        self._migrate_legacy_accounts()
+
     def _ensure_data_directory(self) -> None:
         """データディレクトリが存在することを確認"""
         data_dir = os.path.dirname(self.data_file)
@@ -38,78 +180,400 @@ class SecurityManager:
 
     def _load_accounts(self) -> None:
         """アカウントデータを読み込み"""
+        data: Dict[str, Any] = {}
+        file_exists = self._storage.exists()
         try:
-            if os.path.exists(self.data_file):
-                with open(self.data_file, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    self.accounts = data.get("accounts", [])
-            else:
-                self.accounts = []
-                self._save_accounts()
+            data = self._storage.load()
         except Exception as e:
             print(f"アカウントデータ読み込みエラー: {str(e)}")
-            self.accounts = []
+
+        self.vault = data.get("vault")
+
+        if not file_exists:
+            self._save_accounts()
+
+        # 既にボールトを開いている場合（復元時など）は読み込んだヘッダーで開き直す
+        if self._crypto is not None:
+            self._open_vault()
+
+    def _has_legacy_accounts(self) -> bool:
+        """
+        旧形式の暗号文を持つレコードがあるか確認
+
+        Returns:
+            旧形式のレコードがある場合True
+        """
+        return bool(
+            self._storage.find_legacy_accounts(CryptoUtils.RECORD_PREFIX, limit=1)
+        )
+
+    def _migrate_legacy_accounts(self, save_vault: bool = False) -> None:
+        """
+        旧形式（レコードごとにPBKDF2）の暗号文をボールト形式v2へ移行
+
+        MIGRATION_BATCH_SIZE件ごとに保存するため、中断された場合も
+        次回読み込み時に未移行のレコードから再開される。
+
+        Args:
+            save_vault: 最初のバッチと同時にボールトヘッダーを保存するか
+                （先頭の旧形式レコードを復号化できない場合はパスワードが正しくないとみなす）
+
+        Raises:
+            Exception: save_vaultがTrueで、先頭の旧形式レコードを復号化できない場合
+        """
+        legacy_accounts = self._storage.find_legacy_accounts(CryptoUtils.RECORD_PREFIX)
+        if not legacy_accounts:
+            return
+
+        if save_vault:
+            # 全件のキー導出を行う前に、先頭の旧形式レコード1件でパスワードを確認
+            # （導出したキーはキャッシュされるため、移行時に再導出はしない）
+            _, error = _decrypt_secret(
+                self.crypto, legacy_accounts[0]["encrypted_secret"]
+            )
+            if error is not None:
+                raise Exception(
+                    "ボールトを開けませんでした。"
+                    "マスターパスワードが正しいか確認してください。"
+                )
+
+        print(f"アカウントデータを新形式に移行しています ({len(legacy_accounts)}件)...")
+        migrated = 0
+        for start in range(0, len(legacy_accounts), self.MIGRATION_BATCH_SIZE):
+            batch = legacy_accounts[start : start + self.MIGRATION_BATCH_SIZE]
+            results = self._decrypt_secrets(
+                [account["encrypted_secret"] for account in batch]
+            )
+            migrated_accounts = []
+            for account, (secret, error) in zip(batch, results):
+                if secret is None:
+                    # 復号化できないレコードは旧形式のまま残す
+                    print(f"移行をスキップしました ({account.get('id')}): {error}")
+                    continue
+                migrated_account = account.copy()
+                migrated_account["encrypted_secret"] = self.crypto.encrypt(secret)
+                migrated_accounts.append(migrated_account)
+            if save_vault:
+                # ボールトヘッダーは最初のバッチの移行結果と同時に保存
+                with self.batch():
+                    self._save_accounts()
+                    self._put_accounts(migrated_accounts)
+                save_vault = False
+            else:
+                self._put_accounts(migrated_accounts)
+            migrated += len(migrated_accounts)
+        print(f"アカウントデータの移行が完了しました ({migrated}件)")
+
+    def _decrypt_secrets(
+        self, encrypted_secrets: List[str]
+    ) -> List[Tuple[Optional[str], Optional[str]]]:
+        """
+        複数のセキュリティコードを復号化（結果は入力と同じ順序）
+
+        旧形式レコードはレコードごとにPBKDF2が必要なCPUバウンド処理のため、
+        decrypt_workersが2以上の場合はProcessPoolExecutorで並列に処理する。
+        v2形式レコードはAES-GCMのみで軽量なため常にこのプロセスで処理する。
+
+        Args:
+            encrypted_secrets: 暗号化されたセキュリティコードのリスト
+
+        Returns:
+            (復号化されたセキュリティコード, エラーメッセージ) のリスト
+        """
+        results: List[Optional[Tuple[Optional[str], Optional[str]]]] = [None] * len(
+            encrypted_secrets
+        )
+
+        legacy_positions = [
+            i
+            for i, encrypted_secret in enumerate(encrypted_secrets)
+            if CryptoUtils.is_legacy_ciphertext(encrypted_secret)
+        ]
+        if (
+            self.decrypt_workers > 1
+            and len(legacy_positions) >= self.PARALLEL_DECRYPT_THRESHOLD
+        ):
+            with ProcessPoolExecutor(
+                max_workers=self.decrypt_workers,
+                initializer=_init_decrypt_worker,
+                initargs=(self.crypto.password, self.crypto.PBKDF2_ITERATIONS),
+            ) as executor:
+                legacy_results = executor.map(
+                    _decrypt_secret_in_worker,
+                    [encrypted_secrets[i] for i in legacy_positions],
+                    chunksize=self.decrypt_chunk_size,
+                )
+                for i, result in zip(legacy_positions, legacy_results):
+                    results[i] = result
+
+        return [
+            (
+                result
+                if result is not None
+                else _decrypt_secret(self.crypto, encrypted_secrets[i])
+            )
+            for i, result in enumerate(results)
+        ]
+
+    def _decrypt_accounts(self, accounts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        複数のアカウントデータを復号化（結果は入力と同じ順序）
+
+        Args:
+            accounts: 暗号化されたアカウントデータのリスト
+
+        Returns:
+            復号化されたアカウントデータのリスト
+        """
+        # 先にボールトを開く（未移行の旧形式レコードはここでv2形式に移行される）
+        self.unlock()
+        encrypted = [account for account in accounts if "encrypted_secret" in account]
+        results = iter(
+            self._decrypt_secrets(
+                [account["encrypted_secret"] for account in encrypted]
+            )
+        )
+
+        decrypted_accounts = []
+        for account in accounts:
+            decrypted_account = account.copy()
+            if "encrypted_secret" in account:
+                secret, error = next(results)
+                if secret is None:
+                    raise Exception(error)
+                decrypted_account["secret"] = secret
+                del decrypted_account["encrypted_secret"]
+            decrypted_accounts.append(decrypted_account)
+        return decrypted_accounts
 
     def _save_accounts(self) -> None:
-        """アカウントデータを保存"""
+        """アカウントデータを保存（メタデータを含む全データを永続化）"""
         try:
-            data = {
-                "accounts": self.accounts,
-                "last_updated": datetime.now().isoformat(),
-            }
-            with open(self.data_file, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            self._storage.save({"version": self.FORMAT_VERSION, "vault": self.vault})
         except Exception as e:
             raise Exception(f"アカウントデータ保存エラー: {str(e)}")
 
-    def add_account(
-        self, device_name: str, account_name: str, issuer: str, secret: str
-    ) -> str:
+    def _put_accounts(self, accounts: List[Dict[str, Any]]) -> None:
         """
-        新しいアカウントを追加
+        アカウントレコードをストレージに保存（追加または上書き）
+
+        Args:
+            accounts: 暗号化済みのアカウントレコードのリスト
+        """
+        try:
+            self._storage.put_many(accounts)
+        except Exception as e:
+            raise Exception(f"アカウントデータ保存エラー: {str(e)}")
+
+    def compact(self) -> None:
+        """保留中の変更をデータファイルに統合（JSONではジャーナルをスナップショットへ）"""
+        try:
+            self._storage.flush()
+        except Exception as e:
+            raise Exception(f"アカウントデータ保存エラー: {str(e)}")
+
+    @contextmanager
+    def batch(self) -> Iterator["SecurityManager"]:
+        """
+        複数の変更をまとめて1回の書き込みで保存するコンテキストマネージャー
+
+        ブロック内の追加・更新・削除は終了時に一括で保存され、例外が発生した場合は
+        全て破棄される。入れ子にした場合は最も外側のブロックの終了時に保存する。
+
+        Yields:
+            このSecurityManagerインスタンス
+        """
+        if self._batch_depth > 0:
+            self._batch_depth += 1
+            try:
+                yield self
+            finally:
+                self._batch_depth -= 1
+            return
+
+        vault = self.vault
+        self._storage.begin()
+        self._batch_depth = 1
+        try:
+            yield self
+        except BaseException:
+            self._batch_depth = 0
+            self._storage.rollback()
+            if self.vault != vault:
+                # ブロック内で作成したボールトヘッダーは保存先の状態に合わせる
+                self._load_accounts()
+            raise
+        self._batch_depth = 0
+        try:
+            self._storage.commit()
+        except Exception as e:
+            raise Exception(f"アカウントデータ保存エラー: {str(e)}")
+
+    # batch()の別名
+    transaction = batch
+
+    def _new_account_record(
+        self,
+        device_name: str,
+        account_name: str,
+        issuer: str,
+        secret: str,
+        algorithm: Optional[Any] = None,
+        digits: Optional[Any] = None,
+        period: Optional[Any] = None,
+    ) -> Dict[str, Any]:
+        """
+        新しいアカウントのレコードを作成（暗号化済み）
 
         Args:
             device_name: デバイス名
             account_name: アカウント名
             issuer: 発行者名
             secret: セキュリティコード
+            algorithm: アルゴリズム名（省略時はSHA1）
+            digits: 桁数（省略時は6）
+            period: 周期（秒、省略時は30）
 
         Returns:
-            アカウントID
+            暗号化済みのアカウントレコード
         """
-        account_id = str(uuid.uuid4())
-
+        algorithm, digits, period = normalize_otp_parameters(algorithm, digits, period)
+        now = datetime.now().isoformat()
         account_data = {
-            "id": account_id,
+            "id": str(uuid.uuid4()),
             "device_name": device_name,
             "account_name": account_name,
             "issuer": issuer,
             "secret": secret,
-            "created_at": datetime.now().isoformat(),
-            "updated_at": datetime.now().isoformat(),
+            "algorithm": algorithm,
+            "digits": digits,
+            "period": period,
+            "created_at": now,
+            "updated_at": now,
         }
+        return self.crypto.encrypt_account_data(account_data)
 
+    def add_account(
+        self,
+        device_name: str,
+        account_name: str,
+        issuer: str,
+        secret: str,
+        algorithm: Optional[Any] = None,
+        digits: Optional[Any] = None,
+        period: Optional[Any] = None,
+    ) -> str:
+        """
+        新しいアカウントを追加
+
+        Args:
+            device_name: デバイス名
+            account_name: アカウント名
+            issuer: 発行者名
+            secret: セキュリティコード
+            algorithm: アルゴリズム名（省略時はSHA1）
+            digits: 桁数（省略時は6）
+            period: 周期（秒、省略時は30）
+
+        Returns:
+            アカウントID
+        """
         # 暗号化して保存
-        encrypted_account = self.crypto.encrypt_account_data(account_data)
-        self.accounts.append(encrypted_account)
-        self._save_accounts()
+        encrypted_account = self._new_account_record(
+            device_name, account_name, issuer, secret, algorithm, digits, period
+        )
+        self._put_accounts([encrypted_account])
+
+        return str(encrypted_account["id"])
 
-        return account_id
+    def add_many(self, accounts: List[Dict[str, Any]]) -> List[str]:
+        """
+        複数のアカウントを1回の書き込みで追加
+
+        Args:
+            accounts: アカウント情報のリスト
+                （各要素にdevice_name・account_name・issuer・secretを含む。
+                algorithm・digits・periodは任意）
+
+        Returns:
+            追加したアカウントIDのリスト（入力と同じ順序）
+        """
+        encrypted_accounts = [
+            self._new_account_record(
+                account["device_name"],
+                account["account_name"],
+                account["issuer"],
+                account["secret"],
+                account.get("algorithm"),
+                account.get("digits"),
+                account.get("period"),
+            )
+            for account in accounts
+        ]
+        self._put_accounts(encrypted_accounts)
+        return [account["id"] for account in encrypted_accounts]
+
+    def find_account_ids(self, prefix: str, limit: Optional[int] = None) -> List[str]:
+        """
+        前方一致するアカウントIDを検索（ストレージの索引を使用）
+
+        Args:
+            prefix: アカウントIDの先頭部分
+            limit: 返す件数の上限（Noneの場合は全件）
+
+        Returns:
+            前方一致したアカウントIDのリスト（昇順）
+        """
+        return self._storage.find_ids(prefix, limit)
+
+    def resolve_account_id(self, account_id: str) -> Optional[str]:
+        """
+        完全なIDまたは一意な先頭部分からアカウントIDを特定
+
+        Args:
+            account_id: アカウントIDまたはその一意な先頭部分
+
+        Returns:
+            アカウントID（見つからない、または複数が該当する場合はNone）
+        """
+        if self._storage.get(account_id) is not None:
+            return account_id
+        if not account_id:
+            return None
+        matches = self.find_account_ids(account_id, limit=2)
+        return matches[0] if len(matches) == 1 else None
 
     def get_account(self, account_id: str) -> Optional[Dict[str, Any]]:
         """
         アカウント情報を取得（復号化済み）
 
         Args:
-            account_id: アカウントID
+            account_id: アカウントID（一意な先頭部分でも可）
 
         Returns:
             アカウント情報（復号化済み）
         """
-        for account in self.accounts:
-            if account["id"] == account_id:
-                return self.crypto.decrypt_account_data(account)
-        return None
+        account = self._find_account(account_id)
+        if account is None:
+            return None
+        return self.crypto.decrypt_account_data(account)
+
+    def _find_account(self, account_id: str) -> Optional[Dict[str, Any]]:
+        """
+        アカウントレコード（暗号化済み）を取得
+
+        Args:
+            account_id: アカウントID（一意な先頭部分でも可）
+
+        Returns:
+            アカウントレコード（見つからない場合はNone）
+        """
+        account = self._storage.get(account_id)
+        if account is None and account_id:
+            matches = self.find_account_ids(account_id, limit=2)
+            if len(matches) == 1:
+                account = self._storage.get(matches[0])
+        return account
 
     def get_all_accounts(self) -> List[Dict[str, Any]]:
         """
@@ -118,118 +582,160 @@ class SecurityManager:
         Returns:
             アカウント情報のリスト（復号化済み）
         """
-        decrypted_accounts = []
-        for account in self.accounts:
-            decrypted_account = self.crypto.decrypt_account_data(account)
-            decrypted_accounts.append(decrypted_account)
-        return decrypted_accounts
+        # 先にボールトを開き、移行後のレコードを取得する
+        self.unlock()
+        return self._decrypt_accounts(self.accounts)
 
     def update_account(self, account_id: str, **kwargs: Any) -> bool:
         """
         アカウント情報を更新
 
         Args:
-            account_id: アカウントID
+            account_id: アカウントID（一意な先頭部分でも可）
             **kwargs: 更新するフィールド
 
         Returns:
             更新成功の場合True
         """
-        for i, account in enumerate(self.accounts):
-            if account["id"] == account_id:
-                # 復号化
-                decrypted_account = self.crypto.decrypt_account_data(account)
-
-                # 更新
-                for key, value in kwargs.items():
-                    if key in decrypted_account:
-                        decrypted_account[key] = value
-
-                decrypted_account["updated_at"] = datetime.now().isoformat()
+        account = self._find_account(account_id)
+        if account is None:
+            return False
 
-                # 再暗号化して保存
-                encrypted_account = self.crypto.encrypt_account_data(decrypted_account)
-                self.accounts[i] = encrypted_account
-                self._save_accounts()
-                return True
-        return False
+        # 復号化
+        decrypted_account = self.crypto.decrypt_account_data(account)
+
+        # 更新
+        for key, value in kwargs.items():
+            if key in decrypted_account or key in OTP_PARAMETER_FIELDS:
+                decrypted_account[key] = value
+
+        if any(key in kwargs for key in OTP_PARAMETER_FIELDS):
+            # OTP生成パラメータは正規化して保存（旧アカウントには既定値を補う）
+            params = normalize_otp_parameters(
+                *(decrypted_account.get(key) for key in OTP_PARAMETER_FIELDS)
+            )
+            decrypted_account.update(zip(OTP_PARAMETER_FIELDS, params))
+
+        decrypted_account["updated_at"] = datetime.now().isoformat()
+
+        if "secret" in kwargs:
+            # セキュリティコードが変わった場合のみ再暗号化
+            encrypted_account = self.crypto.encrypt_account_data(decrypted_account)
+        else:
+            # 既存の暗号文を再利用（キー導出を省略）
+            encrypted_account = decrypted_account.copy()
+            encrypted_account.pop("secret", None)
+            if "encrypted_secret" in account:
+                encrypted_account["encrypted_secret"] = account["encrypted_secret"]
+        # 既存IDへの上書きのため登録順は変わらない
+        self._put_accounts([encrypted_account])
+        return True
 
     def delete_account(self, account_id: str) -> bool:
         """
         アカウントを削除
 
         Args:
-            account_id: アカウントID
+            account_id: アカウントID（一意な先頭部分でも可）
 
         Returns:
             削除成功の場合True
         """
-        for i, account in enumerate(self.accounts):
-            if account["id"] == account_id:
-                del self.accounts[i]
-                self._save_accounts()
-                return True
-        return False
+        resolved_id = self.resolve_account_id(account_id)
+        if resolved_id is None:
+            return False
+
+        try:
+            return self._storage.delete(resolved_id)
+        except Exception as e:
+            raise Exception(f"アカウントデータ保存エラー: {str(e)}")
+
+    def update_many(self, updates: Dict[str, Dict[str, Any]]) -> int:
+        """
+        複数のアカウントを1回の書き込みで更新
+
+        Args:
+            updates: アカウントID → 更新するフィールドの辞書
+
+        Returns:
+            更新したアカウント数
+        """
+        with self.batch():
+            return sum(
+                self.update_account(account_id, **fields)
+                for account_id, fields in updates.items()
+            )
 
-    def list_accounts(self) -> List[Dict[str, Any]]:
+    def delete_many(self, account_ids: List[str]) -> int:
+        """
+        複数のアカウントを1回の書き込みで削除
+
+        Args:
+            account_ids: アカウントIDのリスト
+
+        Returns:
+            削除したアカウント数
+        """
+        with self.batch():
+            return sum(self.delete_account(account_id) for account_id in account_ids)
+
+    def list_accounts(
+        self, offset: int = 0, limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
         """
         アカウント一覧を取得（セキュリティコードは含まない）
 
+        Args:
+            offset: 先頭から読み飛ばす件数
+            limit: 取得件数の上限（Noneの場合は全件）
+
         Returns:
             アカウント一覧
         """
-        account_list = []
-        for account in self.accounts:
-            decrypted_account = self.crypto.decrypt_account_data(account)
-            # セキュリティコードを除外
-            safe_account = {
-                "id": decrypted_account["id"],
-                "device_name": decrypted_account["device_name"],
-                "account_name": decrypted_account["account_name"],
-                "issuer": decrypted_account["issuer"],
-                "created_at": decrypted_account["created_at"],
-                "updated_at": decrypted_account["updated_at"],
-            }
-            account_list.append(safe_account)
-        return account_list
-
-    def search_accounts(self, keyword: str) -> List[Dict[str, Any]]:
+        # 平文のメタデータのみを使用（復号化・キー導出を行わない）
+        return [
+            self._to_safe_account(account)
+            for account in self._storage.list_page(offset, limit)
+        ]
+
+    def search_accounts(
+        self, keyword: str, offset: int = 0, limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
         """
         キーワードでアカウントを検索
 
         Args:
             keyword: 検索キーワード
+            offset: 先頭から読み飛ばす件数
+            limit: 取得件数の上限（Noneの場合は全件）
 
         Returns:
             マッチしたアカウントのリスト
         """
-        keyword_lower = keyword.lower()
-        matching_accounts = []
-
-        for account in self.accounts:
-            decrypted_account = self.crypto.decrypt_account_data(account)
-
-            # 検索対象フィールド
-            search_fields = [
-                decrypted_account.get("device_name", ""),
-                decrypted_account.get("account_name", ""),
-                decrypted_account.get("issuer", ""),
-            ]
-
-            # キーワードマッチング
-            if any(keyword_lower in field.lower() for field in search_fields):
-                # セキュリティコードを除外
-                safe_account = {
-                    "id": decrypted_account["id"],
-                    "device_name": decrypted_account["device_name"],
-                    "account_name": decrypted_account["account_name"],
-                    "issuer": decrypted_account["issuer"],
-                    "created_at": decrypted_account["created_at"],
-                    "updated_at": decrypted_account["updated_at"],
-                }
-                matching_accounts.append(safe_account)
-
-        return matching_accounts
+        # 検索対象フィールドは平文で保存されているため復号化は不要
+        return [
+            self._to_safe_account(account)
+            for account in self._storage.search(keyword, offset, limit)
+        ]
+
+    def _to_safe_account(self, account: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        セキュリティコードを除いたアカウント情報を作成
+
+        Args:
+            account: アカウントデータ（暗号化済み・復号化済みのどちらでも可）
+
+        Returns:
+            表示用のアカウント情報
+        """
+        return {
+            "id": account["id"],
+            "device_name": account["device_name"],
+            "account_name": account["account_name"],
+            "issuer": account["issuer"],
+            "created_at": account["created_at"],
+            "updated_at": account["updated_at"],
+        }
 
     def get_account_count(self) -> int:
         """
@@ -238,7 +744,7 @@ class SecurityManager:
         Returns:
             アカウント数
         """
-        return len(self.accounts)
+        return self._storage.count()
 
     def backup_accounts(self, backup_file: str) -> bool:
         """
@@ -251,9 +757,7 @@ class SecurityManager:
             バックアップ成功の場合True
         """
         try:
-            import shutil
-
-            shutil.copy2(self.data_file, backup_file)
+            self._storage.backup(backup_file)
             return True
         except Exception as e:
             print(f"バックアップエラー: {str(e)}")
@@ -274,9 +778,7 @@ class SecurityManager:
                 print(f"バックアップファイルが見つかりません: {backup_file}")
                 return False
 
-            import shutil
-
-            shutil.copy2(backup_file, self.data_file)
+            self._storage.restore(backup_file)
             self._load_accounts()
             return True
         except Exception as e:
@@ -291,8 +793,7 @@ class SecurityManager:
             削除成功の場合True
         """
         try:
-            self.accounts = []
-            self._save_accounts()
+            self._storage.clear()
             return True
         except Exception as e:
             print(f"全削除エラー: {str(e)}")
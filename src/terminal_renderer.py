@@ -0,0 +1,98 @@
+"""
+ターミナル描画モジュール
+ANSIエスケープシーケンスのカーソル移動で、前回のフレームから変化した行だけを
+その場で書き換える（clearコマンドの起動や全体の再出力を行わない）
+"""
+
+import os
+import sys
+from typing import List, Optional, TextIO
+
+
+class TerminalRenderer:
+    """差分描画を行うターミナルレンダラークラス"""
+
+    CLEAR_SCREEN = "\x1b[2J\x1b[H"
+    CLEAR_LINE = "\x1b[K"
+    CLEAR_BELOW = "\x1b[J"
+
+    def __init__(self, stream: Optional[TextIO] = None) -> None:
+        """
+        初期化
+
+        Args:
+            stream: 出力先（省略時は sys.stdout）
+        """
+        self.stream = stream if stream is not None else sys.stdout
+        self._previous: Optional[List[str]] = None
+
+    @property
+    def is_tty(self) -> bool:
+        """
+        カーソル制御が使える端末かどうか
+
+        Returns:
+            TTYかつ TERM=dumb でない場合True
+        """
+        isatty = getattr(self.stream, "isatty", None)
+        if isatty is None or not isatty():
+            return False
+        return os.environ.get("TERM", "") != "dumb"
+
+    @staticmethod
+    def _move_to(row: int) -> str:
+        """指定行（0始まり）の先頭へカーソルを移動するシーケンス"""
+        return f"\x1b[{row + 1};1H"
+
+    def reset(self) -> None:
+        """次のフレームで画面全体を描き直す"""
+        self._previous = None
+
+    def build_frame(self, lines: List[str]) -> str:
+        """
+        前回のフレームとの差分から出力文字列を作成
+
+        Args:
+            lines: 今回のフレームの行
+
+        Returns:
+            出力文字列（変化がない場合は空文字列）
+        """
+        previous = self._previous
+        self._previous = list(lines)
+
+        if not self.is_tty:
+            # 非TTY（パイプ・ログ）ではエスケープシーケンスを使わず、変化時のみ全体を出力
+            if previous == lines:
+                return ""
+            return "\n".join(lines) + "\n"
+
+        parts = []
+        if previous is None:
+            parts.append(self.CLEAR_SCREEN)
+            previous = []
+
+        for row, line in enumerate(lines):
+            if row >= len(previous) or previous[row] != line:
+                parts.append(self._move_to(row) + line + self.CLEAR_LINE)
+
+        if len(lines) < len(previous):
+            parts.append(self._move_to(len(lines)) + self.CLEAR_BELOW)
+
+        if not parts:
+            return ""
+        # 他の出力が描画領域を壊さないようフレームの下にカーソルを置く
+        parts.append(self._move_to(len(lines)))
+        return "".join(parts)
+
+    def render(self, lines: List[str]) -> None:
+        """
+        フレームを描画（1フレームにつき1回の write）
+
+        Args:
+            lines: 今回のフレームの行
+        """
+        frame = self.build_frame(lines)
+        if frame:
+            self.stream.write(frame)
+            self.stream.flush()
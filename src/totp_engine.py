@@ -0,0 +1,410 @@
+"""
+TOTP生成エンジン
+シークレットのBase32デコードとHMACの鍵スケジュール（inner/outer状態）を
+一度だけ計算してキャッシュし、カウンタごとにはコピーして使用する
+直近のカウンタ値とOTPも保持し、周期内の再生成ではHMACを計算しない
+大量のシークレットはNumPyによる一括切り詰め（generate_batch）で処理する
+検証（verify）は現在のカウンタ±windowの範囲を定数時間比較で照合する
+"""
+
+import base64
+import hashlib
+import hmac
+import struct
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple, cast
+
+import numpy as np
+
+# otpauth URIの既定値（RFC 6238 / Google Authenticatorの Key Uri Format）
+DEFAULT_ALGORITHM = "SHA1"
+DEFAULT_DIGITS = 6
+DEFAULT_PERIOD = 30
+
+# 対応するアルゴリズム名とハッシュ関数
+ALGORITHMS = {
+    "SHA1": hashlib.sha1,
+    "SHA256": hashlib.sha256,
+    "SHA512": hashlib.sha512,
+}
+
+# OTP生成パラメータ（アルゴリズム, 桁数, 周期）
+OTPParameters = Tuple[str, int, int]
+# OTP生成パラメータを保存するアカウントのフィールド名（OTPParametersと同じ順序）
+OTP_PARAMETER_FIELDS = ("algorithm", "digits", "period")
+
+
+def normalize_otp_parameters(
+    algorithm: Optional[Any] = None,
+    digits: Optional[Any] = None,
+    period: Optional[Any] = None,
+) -> OTPParameters:
+    """
+    OTP生成パラメータを正規化（未指定は既定値、文字列の数値は整数に変換）
+
+    Args:
+        algorithm: アルゴリズム名（SHA1・SHA256・SHA512、大文字小文字を区別しない）
+        digits: 桁数（6〜10）
+        period: 周期（秒、1以上）
+
+    Returns:
+        (アルゴリズム, 桁数, 周期) のタプル
+    """
+    algorithm = str(algorithm or DEFAULT_ALGORITHM).upper()
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"unsupported algorithm: {algorithm}")
+
+    digits = int(digits) if digits not in (None, "") else DEFAULT_DIGITS
+    if not 6 <= digits <= 10:
+        raise ValueError(f"digits must be between 6 and 10: {digits}")
+
+    period = int(period) if period not in (None, "") else DEFAULT_PERIOD
+    if period <= 0:
+        raise ValueError(f"period must be positive: {period}")
+
+    return algorithm, digits, period
+
+
+def account_otp_parameters(account: Dict[str, Any]) -> OTPParameters:
+    """
+    アカウント情報からOTP生成パラメータを取得（未保存の旧アカウントは既定値）
+
+    Args:
+        account: アカウント情報
+
+    Returns:
+        (アルゴリズム, 桁数, 周期) のタプル
+    """
+    return normalize_otp_parameters(
+        account.get("algorithm"), account.get("digits"), account.get("period")
+    )
+
+
+class _CacheEntry:
+    """シークレットごとのキャッシュエントリ"""
+
+    __slots__ = ("mac", "last")
+
+    def __init__(self, mac: Any) -> None:
+        """
+        初期化
+
+        Args:
+            mac: メッセージ未投入のHMACオブジェクト
+        """
+        self.mac = mac
+        # (直近のカウンタ値, 直近のOTP)
+        self.last: Tuple[int, str] = (-1, "")
+
+
+class TOTPEngine:
+    """事前計算済みHMAC状態を再利用するTOTP生成クラス（pyotp互換）"""
+
+    DEFAULT_CACHE_SIZE = 16384
+
+    def __init__(
+        self,
+        digits: int = 6,
+        period: int = 30,
+        digest: Any = hashlib.sha1,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+    ) -> None:
+        """
+        初期化
+
+        Args:
+            digits: OTPの桁数
+            period: TOTPの周期（秒）
+            digest: HMACのハッシュ関数
+            cache_size: 事前計算済みHMAC状態のキャッシュ件数上限
+        """
+        if digits > 10:
+            raise ValueError("digits must be no greater than 10")
+        self.digits = digits
+        self.period = period
+        self.digest = digest
+        self.cache_size = cache_size
+        self._modulus = 10**digits
+        self._cache: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_parameters(
+        cls,
+        algorithm: str = DEFAULT_ALGORITHM,
+        digits: int = DEFAULT_DIGITS,
+        period: int = DEFAULT_PERIOD,
+    ) -> "TOTPEngine":
+        """
+        OTP生成パラメータに対応するエンジンを作成
+
+        Args:
+            algorithm: アルゴリズム名
+            digits: 桁数
+            period: 周期（秒）
+
+        Returns:
+            TOTPエンジン
+        """
+        algorithm, digits, period = normalize_otp_parameters(algorithm, digits, period)
+        return cls(digits=digits, period=period, digest=ALGORITHMS[algorithm])
+
+    @staticmethod
+    def decode_secret(secret: str) -> bytes:
+        """
+        Base32のシークレットをデコード（pyotpと同じパディング・大文字小文字の扱い）
+
+        Args:
+            secret: Base32形式のシークレット
+
+        Returns:
+            デコードされた鍵
+        """
+        missing_padding = len(secret) % 8
+        if missing_padding != 0:
+            secret += "=" * (8 - missing_padding)
+        return base64.b32decode(secret, casefold=True)
+
+    def _get_entry(self, secret: str) -> _CacheEntry:
+        """
+        シークレットに対応するキャッシュエントリを取得
+
+        Args:
+            secret: Base32形式のシークレット
+
+        Returns:
+            事前計算済みHMACオブジェクトと直近のカウンタ値・OTPを持つエントリ
+        """
+        with self._lock:
+            entry = self._cache.get(secret)
+            if entry is not None:
+                self._cache.move_to_end(secret)
+                return entry
+
+        mac = hmac.new(self.decode_secret(secret), digestmod=self.digest)
+        if mac.digest_size < 18:
+            raise ValueError(
+                "digest size is lower than 18 bytes, "
+                "which will trigger error on otp generation"
+            )
+
+        entry = _CacheEntry(mac)
+        if self.cache_size > 0:
+            with self._lock:
+                self._cache[secret] = entry
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return entry
+
+    def _compute(self, mac: Any, counter: int) -> str:
+        """
+        事前計算済みHMAC状態をコピーしてOTPを計算
+
+        Args:
+            mac: メッセージ未投入のHMACオブジェクト
+            counter: HMACカウンタ値
+
+        Returns:
+            OTP文字列
+        """
+        mac = mac.copy()
+        mac.update(struct.pack(">Q", counter))
+        hmac_hash = mac.digest()
+        offset = hmac_hash[-1] & 0xF
+        code = int.from_bytes(hmac_hash[offset : offset + 4], "big") & 0x7FFFFFFF
+        return str(code % self._modulus).zfill(self.digits)
+
+    def generate_at(self, secret: str, counter: int) -> str:
+        """
+        指定カウンタのOTPを生成
+        直近と同じカウンタの場合はHMACを再計算せずに前回の結果を返す
+
+        Args:
+            secret: Base32形式のシークレット
+            counter: HMACカウンタ値
+
+        Returns:
+            OTP文字列
+        """
+        if counter < 0:
+            raise ValueError("input must be positive integer")
+        entry = self._get_entry(secret)
+        cached_counter, cached_code = entry.last
+        if cached_counter == counter:
+            return cached_code
+
+        code = self._compute(entry.mac, counter)
+        # カウンタとOTPは1つのタプルとして差し替え（他スレッドから不整合な組は見えない）
+        entry.last = (counter, code)
+        return code
+
+    def timecode(self, for_time: Optional[float] = None) -> int:
+        """
+        時刻からカウンタ値を計算
+
+        Args:
+            for_time: UNIX時刻（省略時は現在時刻）
+
+        Returns:
+            カウンタ値
+        """
+        if for_time is None:
+            for_time = time.time()
+        return int(for_time) // self.period
+
+    def generate(self, secret: str, for_time: Optional[float] = None) -> str:
+        """
+        指定時刻（省略時は現在時刻）のOTPを生成
+
+        Args:
+            secret: Base32形式のシークレット
+            for_time: UNIX時刻
+
+        Returns:
+            OTP文字列
+        """
+        return self.generate_at(secret, self.timecode(for_time))
+
+    def match_counter(
+        self,
+        secret: str,
+        code: str,
+        for_time: Optional[float] = None,
+        window: int = 1,
+    ) -> Optional[int]:
+        """
+        OTPが一致するカウンタ値を検索（現在のカウンタ±window）
+        比較は定数時間で行い、一致しても残りの候補を比較し終えてから返す
+
+        Args:
+            secret: Base32形式のシークレット
+            code: 検証するOTP
+            for_time: UNIX時刻（省略時は現在時刻）
+            window: 前後に許容する周期数
+
+        Returns:
+            一致したカウンタ値（一致しない場合None）
+        """
+        counter = self.timecode(for_time)
+        entry = self._get_entry(secret)
+        # pyotp.utils.strings_equal と同じく NFKC 正規化してから比較
+        expected = unicodedata.normalize("NFKC", str(code)).encode("utf-8")
+
+        matched = None
+        for candidate in range(max(0, counter - window), counter + window + 1):
+            if candidate == counter:
+                # 現在のカウンタは表示用と共通のキャッシュを利用
+                otp = self.generate_at(secret, candidate)
+            else:
+                otp = self._compute(entry.mac, candidate)
+            if hmac.compare_digest(otp.encode("utf-8"), expected) and matched is None:
+                matched = candidate
+        return matched
+
+    def verify(
+        self,
+        secret: str,
+        code: str,
+        for_time: Optional[float] = None,
+        window: int = 1,
+    ) -> bool:
+        """
+        OTPを検証
+
+        Args:
+            secret: Base32形式のシークレット
+            code: 検証するOTP
+            for_time: UNIX時刻（省略時は現在時刻）
+            window: 前後に許容する周期数
+
+        Returns:
+            一致する場合True
+        """
+        return self.match_counter(secret, code, for_time, window) is not None
+
+    @classmethod
+    def decode_secrets(cls, secrets: Sequence[str]) -> List[bytes]:
+        """
+        複数のシークレットをまとめてデコード（generate_batch用）
+
+        Args:
+            secrets: Base32形式のシークレットのリスト
+
+        Returns:
+            デコードされた鍵のリスト
+        """
+        return [cls.decode_secret(secret) for secret in secrets]
+
+    def generate_batch(
+        self, keys: Sequence[bytes], for_time: Optional[float] = None
+    ) -> np.ndarray:
+        """
+        デコード済みの鍵の配列からOTPを一括生成
+        全件で同じ時刻（カウンタ）を使用し、HMACの出力を1つのバッファにまとめて
+        動的切り詰めと剰余をNumPyで一括計算する
+
+        Args:
+            keys: デコード済みの鍵のリスト
+            for_time: UNIX時刻（省略時は現在時刻）
+
+        Returns:
+            OTPの整数値の配列（int64、桁数に満たない場合は format_codes で0埋め）
+        """
+        return self.generate_batch_at(keys, self.timecode(for_time))
+
+    def generate_batch_at(self, keys: Sequence[bytes], counter: int) -> np.ndarray:
+        """
+        デコード済みの鍵の配列から指定カウンタのOTPを一括生成
+
+        Args:
+            keys: デコード済みの鍵のリスト
+            counter: HMACカウンタ値
+
+        Returns:
+            OTPの整数値の配列（int64）
+        """
+        if counter < 0:
+            raise ValueError("input must be positive integer")
+        if len(keys) == 0:
+            return np.zeros(0, dtype=np.int64)
+
+        message = struct.pack(">Q", counter)
+        digest_size = hmac.new(b"", digestmod=self.digest).digest_size
+        if digest_size < 18:
+            raise ValueError(
+                "digest size is lower than 18 bytes, "
+                "which will trigger error on otp generation"
+            )
+        buffer = b"".join(hmac.digest(key, message, self.digest) for key in keys)
+        hashes = np.frombuffer(buffer, dtype=np.uint8).reshape(len(keys), digest_size)
+
+        offsets = (hashes[:, -1] & 0x0F).astype(np.intp)
+        indices = offsets[:, None] + np.arange(4, dtype=np.intp)
+        parts = np.take_along_axis(hashes, indices, axis=1).astype(np.int64)
+        codes = (
+            (parts[:, 0] & 0x7F) << 24
+            | parts[:, 1] << 16
+            | parts[:, 2] << 8
+            | parts[:, 3]
+        )
+        return cast(np.ndarray, codes % self._modulus)
+
+    def format_codes(self, codes: np.ndarray) -> List[str]:
+        """
+        generate_batch の結果を0埋めしたOTP文字列に変換
+
+        Args:
+            codes: OTPの整数値の配列
+
+        Returns:
+            OTP文字列のリスト
+        """
+        return cast(List[str], np.char.zfill(codes.astype(str), self.digits).tolist())
+
+    def clear_cache(self) -> None:
+        """事前計算済みHMAC状態のキャッシュを破棄"""
+        with self._lock:
+            self._cache.clear()
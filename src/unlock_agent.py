@@ -0,0 +1,479 @@
+"""
+アンロックエージェントモジュール
+ssh-agentと同様に、開いたボールトのマスターキーをUnixドメインソケット越しに
+保持するバックグラウンドプロセスと、そのクライアントを提供
+
+CLIを繰り返し実行してもキー導出（PBKDF2）はエージェントへのアンロック時の1回のみ。
+エージェントはパスワードを保持せず、マスターキーのみを保持する。
+"""
+
+import argparse
+import json
+import os
+import socket
+import socketserver
+import struct
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from .crypto_utils import CryptoUtils
+
+# 既定のソケットパス（環境変数OTP_AGENT_SOCKで上書き可能）
+DEFAULT_SOCKET_PATH = "~/.otp_agent.sock"
+# 既定のアイドルタイムアウト（秒）。経過するとマスターキーを破棄
+DEFAULT_IDLE_TIMEOUT = 900.0
+
+
+def get_agent_socket_path() -> str:
+    """
+    エージェントのソケットパスを取得
+
+    Returns:
+        ソケットパス
+    """
+    return os.path.expanduser(
+        os.environ.get("OTP_AGENT_SOCK", "") or DEFAULT_SOCKET_PATH
+    )
+
+
+class UnlockAgent:
+    """開いたボールトのマスターキーを保持するエージェント"""
+
+    def __init__(
+        self,
+        socket_path: Optional[str] = None,
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+    ):
+        """
+        初期化
+
+        Args:
+            socket_path: Unixドメインソケットのパス
+            idle_timeout: 最後のリクエストからマスターキーを破棄するまでの秒数
+        """
+        self.socket_path = socket_path or get_agent_socket_path()
+        self.idle_timeout = idle_timeout
+        self._vaults: Dict[str, CryptoUtils] = {}
+        self._lock = threading.Lock()
+        self._last_activity = time.monotonic()
+        self._server: Optional[socketserver.ThreadingUnixStreamServer] = None
+        self._stop_event = threading.Event()
+
+    def handle_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        リクエストを処理
+
+        Args:
+            request: {"op": 操作名, ...パラメータ}
+
+        Returns:
+            {"ok": True, ...結果} または {"ok": False, "error": メッセージ}
+        """
+        op = request.get("op")
+        try:
+            with self._lock:
+                self._last_activity = time.monotonic()
+
+                if op == "ping":
+                    return {"ok": True}
+                if op == "status":
+                    return {
+                        "ok": True,
+                        "vaults": sorted(self._vaults),
+                        "idle_timeout": self.idle_timeout,
+                        "pid": os.getpid(),
+                    }
+                if op == "unlock":
+                    return self._unlock(request["password"], request["vault"])
+                if op == "lock":
+                    self._lock_all()
+                    return {"ok": True}
+                if op == "stop":
+                    self._lock_all()
+                    self._stop_event.set()
+                    return {"ok": True}
+                if op == "encrypt":
+                    crypto = self._get_vault(request["vault_id"])
+                    return {"ok": True, "data": crypto.encrypt(request["data"])}
+                if op == "decrypt":
+                    crypto = self._get_vault(request["vault_id"])
+                    return {"ok": True, "data": self._decrypt(crypto, request["data"])}
+            return {"ok": False, "error": f"不明な操作です: {op}"}
+        except KeyError as e:
+            return {"ok": False, "error": f"パラメータが不足しています: {str(e)}"}
+        except Exception as e:
+            return {"ok": False, "error": str(e)}
+
+    def _unlock(self, password: str, vault_header: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        ボールトを開いてマスターキーを保持
+
+        Args:
+            password: マスターパスワード
+            vault_header: ボールトヘッダー
+
+        Returns:
+            レスポンス
+        """
+        crypto = CryptoUtils(password, key_cache_size=0)
+        crypto.unlock_vault(vault_header)
+        # パスワードは保持しない（旧形式レコードはエージェントでは扱わない）
+        crypto.password = ""
+        vault_id = CryptoUtils.get_vault_id(vault_header)
+        self._vaults[vault_id] = crypto
+        return {"ok": True, "vault_id": vault_id}
+
+    def _get_vault(self, vault_id: str) -> CryptoUtils:
+        """
+        保持しているボールトを取得
+
+        Args:
+            vault_id: ボールトID
+
+        Returns:
+            ボールトを開いたCryptoUtils
+        """
+        crypto = self._vaults.get(vault_id)
+        if crypto is None:
+            raise Exception("ボールトはエージェントで開かれていません")
+        return crypto
+
+    def _decrypt(self, crypto: CryptoUtils, encrypted_data: str) -> str:
+        """
+        v2形式の暗号文を復号化
+
+        Args:
+            crypto: ボールトを開いたCryptoUtils
+            encrypted_data: 暗号化されたデータ
+
+        Returns:
+            復号化されたデータ
+        """
+        if CryptoUtils.is_legacy_ciphertext(encrypted_data):
+            raise Exception("旧形式のレコードはエージェントでは復号化できません")
+        return crypto.decrypt(encrypted_data)
+
+    def _lock_all(self) -> None:
+        """保持している全てのマスターキーを破棄"""
+        for crypto in self._vaults.values():
+            crypto.clear_memory()
+        self._vaults.clear()
+
+    def lock(self) -> None:
+        """保持している全てのマスターキーを破棄"""
+        with self._lock:
+            self._lock_all()
+
+    def check_idle(self) -> bool:
+        """
+        アイドルタイムアウトを確認し、経過していればマスターキーを破棄
+
+        Returns:
+            マスターキーを破棄した場合True
+        """
+        with self._lock:
+            if not self._vaults or self.idle_timeout <= 0:
+                return False
+            if time.monotonic() - self._last_activity < self.idle_timeout:
+                return False
+            self._lock_all()
+            return True
+
+    def serve_forever(self) -> None:
+        """ソケットを開いてリクエストの処理を開始（stop要求まで戻らない）"""
+        self._prepare_socket_path()
+
+        agent = self
+
+        class _Handler(socketserver.StreamRequestHandler):
+            def handle(self) -> None:
+                if not _is_same_user(self.request):
+                    return
+                for line in self.rfile:
+                    try:
+                        request = json.loads(line)
+                    except ValueError:
+                        response = {"ok": False, "error": "不正なリクエストです"}
+                    else:
+                        response = agent.handle_request(request)
+                    self.wfile.write(json.dumps(response).encode() + b"\n")
+                    self.wfile.flush()
+                    if agent._stop_event.is_set():
+                        return
+
+        # ソケットファイルは所有者のみアクセス可能にする
+        old_umask = os.umask(0o077)
+        try:
+            self._server = socketserver.ThreadingUnixStreamServer(
+                self.socket_path, _Handler
+            )
+        finally:
+            os.umask(old_umask)
+        self._server.daemon_threads = True
+        os.chmod(self.socket_path, 0o600)
+
+        server_thread = threading.Thread(target=self._server.serve_forever)
+        server_thread.daemon = True
+        server_thread.start()
+
+        poll_interval = min(1.0, self.idle_timeout) if self.idle_timeout > 0 else 1.0
+        try:
+            while not self._stop_event.wait(timeout=poll_interval):
+                self.check_idle()
+        finally:
+            self._server.shutdown()
+            self._server.server_close()
+            self.lock()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    def stop(self) -> None:
+        """エージェントを停止"""
+        self._stop_event.set()
+
+    def _prepare_socket_path(self) -> None:
+        """既存のソケットファイルを確認（稼働中のエージェントがあればエラー）"""
+        if not os.path.exists(self.socket_path):
+            return
+        if AgentClient(self.socket_path).is_running():
+            raise Exception(f"エージェントは既に起動しています: {self.socket_path}")
+        # 異常終了したエージェントの残骸を削除
+        os.unlink(self.socket_path)
+
+
+def _is_same_user(sock: socket.socket) -> bool:
+    """
+    接続元が同じユーザーか確認（SO_PEERCREDが使えない環境ではソケットの権限に依存）
+
+    Args:
+        sock: 接続済みソケット
+
+    Returns:
+        同じユーザーの場合True
+    """
+    if not hasattr(socket, "SO_PEERCRED"):
+        return True
+    creds = sock.getsockopt(
+        socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i")
+    )
+    _, uid, _ = struct.unpack("3i", creds)
+    return bool(uid == os.getuid())
+
+
+class AgentClient:
+    """アンロックエージェントのクライアント"""
+
+    def __init__(self, socket_path: Optional[str] = None, timeout: float = 5.0):
+        """
+        初期化
+
+        Args:
+            socket_path: Unixドメインソケットのパス
+            timeout: 通信タイムアウト（秒）
+        """
+        self.socket_path = socket_path or get_agent_socket_path()
+        self.timeout = timeout
+        self._sock: Optional[socket.socket] = None
+        self._reader: Optional[Any] = None
+
+    def _connect(self) -> None:
+        """エージェントに接続（接続は1回のCLI実行の間再利用）"""
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except Exception:
+            sock.close()
+            raise
+        self._sock = sock
+        self._reader = sock.makefile("rb")
+
+    def _request(self, op: str, **params: Any) -> Dict[str, Any]:
+        """
+        リクエストを送信してレスポンスを受信
+
+        Args:
+            op: 操作名
+            **params: パラメータ
+
+        Returns:
+            レスポンス
+
+        Raises:
+            Exception: 通信エラー、またはエージェントがエラーを返した場合
+        """
+        if self._sock is None:
+            self._connect()
+        assert self._sock is not None and self._reader is not None
+
+        try:
+            self._sock.sendall(json.dumps({"op": op, **params}).encode() + b"\n")
+            line = self._reader.readline()
+        except Exception:
+            self.close()
+            raise
+        if not line:
+            self.close()
+            raise Exception("エージェントとの接続が切断されました")
+
+        response: Dict[str, Any] = json.loads(line)
+        if not response.get("ok"):
+            raise Exception(f"エージェントエラー: {response.get('error')}")
+        return response
+
+    def close(self) -> None:
+        """接続を閉じる"""
+        try:
+            if self._reader:
+                self._reader.close()
+            if self._sock:
+                self._sock.close()
+        finally:
+            self._reader = None
+            self._sock = None
+
+    def is_running(self) -> bool:
+        """
+        エージェントが稼働中か確認
+
+        Returns:
+            稼働中の場合True
+        """
+        try:
+            self._request("ping")
+            return True
+        except Exception:
+            self.close()
+            return False
+
+    def status(self) -> Dict[str, Any]:
+        """エージェントの状態を取得"""
+        return self._request("status")
+
+    def has_vault(self, vault_id: str) -> bool:
+        """
+        ボールトがエージェントで開かれているか確認
+
+        Args:
+            vault_id: ボールトID
+
+        Returns:
+            開かれている場合True
+        """
+        return vault_id in self.status().get("vaults", [])
+
+    def unlock(self, password: str, vault_header: Dict[str, Any]) -> str:
+        """
+        エージェントでボールトを開く
+
+        Args:
+            password: マスターパスワード
+            vault_header: ボールトヘッダー
+
+        Returns:
+            ボールトID
+        """
+        return str(
+            self._request("unlock", password=password, vault=vault_header)["vault_id"]
+        )
+
+    def encrypt(self, vault_id: str, data: str) -> str:
+        """エージェントでデータを暗号化"""
+        return str(self._request("encrypt", vault_id=vault_id, data=data)["data"])
+
+    def decrypt(self, vault_id: str, encrypted_data: str) -> str:
+        """エージェントでデータを復号化"""
+        return str(
+            self._request("decrypt", vault_id=vault_id, data=encrypted_data)["data"]
+        )
+
+    def lock(self) -> None:
+        """エージェントが保持するマスターキーを破棄"""
+        self._request("lock")
+
+    def stop(self) -> None:
+        """エージェントを停止"""
+        self._request("stop")
+        self.close()
+
+
+def connect_agent(socket_path: Optional[str] = None) -> Optional[AgentClient]:
+    """
+    稼働中のエージェントに接続
+
+    Args:
+        socket_path: Unixドメインソケットのパス
+
+    Returns:
+        稼働中の場合はAgentClient、それ以外はNone
+    """
+    path = socket_path or get_agent_socket_path()
+    if not hasattr(socket, "AF_UNIX") or not os.path.exists(path):
+        return None
+    client = AgentClient(path)
+    return client if client.is_running() else None
+
+
+def start_agent_process(
+    socket_path: Optional[str] = None,
+    idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+    wait_seconds: float = 5.0,
+) -> bool:
+    """
+    エージェントをバックグラウンドプロセスとして起動
+
+    Args:
+        socket_path: Unixドメインソケットのパス
+        idle_timeout: アイドルタイムアウト（秒）
+        wait_seconds: 起動完了を待つ最大秒数
+
+    Returns:
+        起動に成功した場合True
+    """
+    path = socket_path or get_agent_socket_path()
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "src.unlock_agent",
+            "--socket",
+            path,
+            "--timeout",
+            str(idle_timeout),
+        ],
+        cwd=project_root,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+    deadline = time.monotonic() + wait_seconds
+    while time.monotonic() < deadline:
+        if connect_agent(path):
+            return True
+        time.sleep(0.1)
+    return False
+
+
+def main() -> None:
+    """エージェントをフォアグラウンドで実行"""
+    parser = argparse.ArgumentParser(description="OTPアンロックエージェント")
+    parser.add_argument("--socket", type=str, help="Unixドメインソケットのパス")
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=DEFAULT_IDLE_TIMEOUT,
+        help="アイドルタイムアウト（秒、0で無効）",
+    )
+    args = parser.parse_args()
+
+    UnlockAgent(args.socket, args.timeout).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
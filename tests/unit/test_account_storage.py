@@ -0,0 +1,437 @@
+"""
+account_storage.pyのテスト
+"""
+
+import pytest
+import json
+import os
+import tempfile
+from unittest.mock import patch
+from src.account_storage import (
+    JournalStorage,
+    JsonFileStorage,
+    SQLiteStorage,
+    create_storage,
+    get_group_commit_window,
+)
+
+
+def _account(account_id, name="user@example.com"):
+    """テスト用アカウントレコード"""
+    return {"id": account_id, "account_name": name, "encrypted_secret": "v2:xxx"}
+
+
+class TestJournalStorage:
+    """JournalStorageクラスのテスト"""
+
+    @pytest.fixture
+    def data_file(self):
+        """一時データファイルのパス"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            yield os.path.join(temp_dir, "accounts.json")
+
+    @pytest.fixture
+    def storage(self, data_file):
+        """スナップショット作成済みのストレージ"""
+        storage = JournalStorage(data_file, background_compaction=False)
+        storage.write_snapshot({"version": 2, "vault": None, "accounts": []})
+        return storage
+
+    def _read_snapshot(self, data_file):
+        with open(data_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def test_append_and_replay(self, storage, data_file):
+        """TC-STORAGE-001: 追記したレコードを読み込み時に再適用"""
+        storage.append([{"op": "put", "account": _account("a")}])
+        storage.append([{"op": "put", "account": _account("b")}])
+        storage.append([{"op": "put", "account": _account("a", "renamed")}])
+        storage.append([{"op": "delete", "id": "b"}])
+
+        # スナップショットは書き換えられない
+        assert self._read_snapshot(data_file)["accounts"] == []
+
+        data = JournalStorage(data_file).load()
+        assert data["accounts"] == [_account("a", "renamed")]
+        assert data["version"] == 2
+
+    def test_torn_record_discarded(self, storage, data_file):
+        """TC-STORAGE-002: 書き込み途中の末尾レコードを破棄"""
+        storage.append([{"op": "put", "account": _account("a")}])
+        with open(storage.journal_file, "ab") as f:
+            f.write(b'{"op": "put", "account": {"id": "b"')
+
+        reloaded = JournalStorage(data_file)
+        assert reloaded.load()["accounts"] == [_account("a")]
+        assert reloaded.journal_entries == 1
+
+        # 破棄後の追記は正しく読み込める
+        reloaded.append([{"op": "put", "account": _account("c")}])
+        accounts = JournalStorage(data_file).load()["accounts"]
+        assert [account["id"] for account in accounts] == ["a", "c"]
+
+    def test_compaction(self, storage, data_file):
+        """TC-STORAGE-003: コンパクションでスナップショットに統合"""
+        storage.append([{"op": "put", "account": _account("a")}])
+
+        storage.compact({"version": 2, "vault": None, "accounts": [_account("a")]})
+
+        assert not os.path.exists(storage.journal_file)
+        assert storage.journal_entries == 0
+        assert self._read_snapshot(data_file)["accounts"] == [_account("a")]
+
+    def test_compaction_keeps_later_records(self, storage, data_file):
+        """TC-STORAGE-004: コンパクション中に追記されたレコードを保持"""
+        storage.append([{"op": "put", "account": _account("a")}])
+        generation, offset = storage._generation, storage._journal_size
+        storage.append([{"op": "put", "account": _account("b")}])
+
+        storage._compact(
+            {"version": 2, "vault": None, "accounts": [_account("a")]},
+            generation,
+            offset,
+        )
+
+        assert storage.journal_entries == 1
+        accounts = JournalStorage(data_file).load()["accounts"]
+        assert [account["id"] for account in accounts] == ["a", "b"]
+
+    def test_stale_compaction_discarded(self, storage, data_file):
+        """TC-STORAGE-005: 古いデータによるコンパクションは破棄"""
+        generation, offset = storage._generation, storage._journal_size
+        storage.write_snapshot(
+            {"version": 2, "vault": None, "accounts": [_account("new")]}
+        )
+
+        storage._compact(
+            {"version": 2, "vault": None, "accounts": []}, generation, offset
+        )
+
+        assert self._read_snapshot(data_file)["accounts"] == [_account("new")]
+
+    def test_replay_after_interrupted_compaction(self, storage, data_file):
+        """TC-STORAGE-006: スナップショット置換後・ジャーナル削除前の中断"""
+        storage.append([{"op": "put", "account": _account("a")}])
+        storage.append([{"op": "put", "account": _account("b")}])
+        storage.append([{"op": "delete", "id": "a"}])
+
+        # スナップショットのみ置き換わり、ジャーナルが残った状態
+        with patch.object(storage, "_truncate_journal"):
+            storage.compact({"version": 2, "vault": None, "accounts": [_account("b")]})
+
+        assert os.path.exists(storage.journal_file)
+        assert JournalStorage(data_file).load()["accounts"] == [_account("b")]
+
+    def test_needs_compaction(self, storage):
+        """TC-STORAGE-007: コンパクション要否の判定"""
+        with patch.object(JournalStorage, "COMPACT_MIN_ENTRIES", 3):
+            storage.append([{"op": "put", "account": _account("a")}] * 2)
+            assert storage.needs_compaction() is False
+
+            storage.append([{"op": "put", "account": _account("a")}])
+            # ジャーナルがスナップショットより小さい場合は不要
+            storage._snapshot_size = storage._journal_size + 1
+            assert storage.needs_compaction() is False
+
+            with patch.object(JournalStorage, "COMPACT_MAX_BYTES", 1):
+                assert storage.needs_compaction() is True
+
+            storage._snapshot_size = 0
+            assert storage.needs_compaction() is True
+
+    def test_background_compaction(self, data_file):
+        """TC-STORAGE-008: バックグラウンドスレッドでのコンパクション"""
+        storage = JournalStorage(data_file)
+        storage.append([{"op": "put", "account": _account("a")}])
+
+        storage.compact({"version": 2, "vault": None, "accounts": [_account("a")]})
+        storage.wait_for_compaction()
+
+        assert storage.journal_entries == 0
+        assert self._read_snapshot(data_file)["accounts"] == [_account("a")]
+
+    def test_restore_snapshot(self, storage, data_file):
+        """TC-STORAGE-009: バックアップの書き戻しでジャーナルを破棄"""
+        backup_file = data_file + ".bak"
+        storage.copy_snapshot(backup_file)
+        storage.append([{"op": "put", "account": _account("a")}])
+
+        storage.restore_snapshot(backup_file)
+
+        assert not os.path.exists(storage.journal_file)
+        assert JournalStorage(data_file).load()["accounts"] == []
+
+    def test_atomic_write_interrupted(self, storage, data_file):
+        """TC-STORAGE-021: 書き込み途中の中断では元のスナップショットを保持"""
+        with open(data_file, "rb") as f:
+            original = f.read()
+
+        with patch("src.account_storage.os.fsync", side_effect=SystemExit(0)):
+            with pytest.raises(SystemExit):
+                storage.write_snapshot({"version": 2, "accounts": [_account("a")]})
+
+        with open(data_file, "rb") as f:
+            assert f.read() == original
+        # 一時ファイルは残らない
+        assert os.listdir(os.path.dirname(data_file)) == ["accounts.json"]
+
+    def test_snapshot_permissions(self, storage, data_file):
+        """TC-STORAGE-022: スナップショットは所有者のみ読み書き可能"""
+        assert os.stat(data_file).st_mode & 0o777 == 0o600
+
+    def test_journal_permissions(self, storage):
+        """TC-STORAGE-029: ジャーナルは所有者のみ読み書き可能"""
+        old_umask = os.umask(0o022)
+        try:
+            storage.append([{"op": "put", "account": _account("a")}])
+        finally:
+            os.umask(old_umask)
+
+        assert os.stat(storage.journal_file).st_mode & 0o777 == 0o600
+
+    def test_group_commit(self, data_file):
+        """TC-STORAGE-023: グループコミットで連続した追記のfsyncをまとめる"""
+        storage = JournalStorage(data_file, group_commit_window=60)
+
+        for i in range(10):
+            storage.append([{"op": "put", "account": _account(f"id-{i}")}])
+
+        # 追記はOSに書き込み済みで読み込み可能だが、fsyncはまだ行われていない
+        assert storage.fsync_count == 0
+        assert len(JournalStorage(data_file).load()["accounts"]) == 10
+
+        storage.close()
+        assert storage.fsync_count == 1
+        storage.sync()
+        assert storage.fsync_count == 1
+
+    def test_group_commit_timer(self, data_file):
+        """TC-STORAGE-024: 待機時間の経過後に自動でfsync"""
+        storage = JournalStorage(data_file, group_commit_window=0.01)
+        storage.append([{"op": "put", "account": _account("a")}])
+        storage.append([{"op": "put", "account": _account("b")}])
+
+        timer = storage._sync_timer
+        timer.join(timeout=5)
+
+        assert storage.fsync_count == 1
+        assert storage._sync_timer is None
+
+    def test_fsync_per_append_by_default(self, data_file):
+        """TC-STORAGE-025: 既定では追記ごとにfsync"""
+        storage = JournalStorage(data_file)
+        storage.append([{"op": "put", "account": _account("a")}])
+        storage.append([{"op": "put", "account": _account("b")}])
+
+        assert storage.fsync_count == 2
+
+    def test_torn_batch_discarded(self, data_file):
+        """TC-STORAGE-020: 書き込み途中の一括変更は全体を破棄"""
+        storage = JsonFileStorage(data_file)
+        storage.load()
+        storage.save({"version": 2})
+        storage.begin()
+        storage.put_many([_account("a"), _account("b")])
+        storage.commit()
+        with open(storage.journal.journal_file, "rb+") as f:
+            content = f.read()
+            f.truncate(len(content) - 20)
+
+        assert JsonFileStorage(data_file).load() == {"version": 2}
+        reloaded = JsonFileStorage(data_file)
+        reloaded.load()
+        assert reloaded.count() == 0
+
+    def test_load_without_snapshot(self, data_file):
+        """TC-STORAGE-010: スナップショットが存在しない場合"""
+        assert JournalStorage(data_file).load() == {}
+
+
+class TestAccountStorageBackends:
+    """JsonFileStorage・SQLiteStorage共通のテスト"""
+
+    @pytest.fixture(params=["accounts.json", "accounts.db"])
+    def data_file(self, request):
+        """一時データファイルのパス（拡張子でバックエンドを選択）"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            yield os.path.join(temp_dir, request.param)
+
+    @pytest.fixture
+    def storage(self, data_file):
+        """メタデータ保存済みのストレージ"""
+        storage = create_storage(data_file)
+        storage.load()
+        storage.save({"version": 2, "vault": {"salt": "abc"}})
+        yield storage
+        storage.close()
+
+    def _reopen(self, storage, data_file):
+        storage.close()
+        reopened = create_storage(data_file)
+        reopened.load()
+        return reopened
+
+    def test_create_storage(self, data_file):
+        """TC-STORAGE-011: 拡張子に応じたバックエンドの選択"""
+        storage = create_storage(data_file)
+        expected = SQLiteStorage if data_file.endswith(".db") else JsonFileStorage
+        assert isinstance(storage, expected)
+        assert storage.exists() is False
+
+    def test_put_get_delete(self, storage, data_file):
+        """TC-STORAGE-012: 追加・取得・上書き・削除と永続化"""
+        storage.put(_account("a"))
+        storage.put_many([_account("b"), _account("c")])
+        storage.put(_account("a", "renamed"))
+        assert storage.delete("b") is True
+        assert storage.delete("missing") is False
+
+        reopened = self._reopen(storage, data_file)
+        assert reopened.load() == {"version": 2, "vault": {"salt": "abc"}}
+        assert reopened.get("a") == _account("a", "renamed")
+        assert reopened.get("b") is None
+        # 上書きしても登録順は変わらない
+        assert [account["id"] for account in reopened.iter_accounts()] == ["a", "c"]
+        assert reopened.count() == 2
+        reopened.close()
+
+    def test_list_page_and_search(self, storage):
+        """TC-STORAGE-013: ページングと検索"""
+        storage.put_many(
+            [
+                {**_account(f"id-{i}", f"user{i}@Example.com"), "issuer": "GitHub"}
+                for i in range(5)
+            ]
+            + [{**_account("other"), "issuer": "Google", "device_name": "Phone"}]
+        )
+
+        page = storage.list_page(offset=2, limit=2)
+        assert [account["id"] for account in page] == ["id-2", "id-3"]
+        assert len(storage.list_page()) == 6
+
+        assert len(storage.search("github")) == 5
+        assert [account["id"] for account in storage.search("HUB", 3, 10)] == [
+            "id-3",
+            "id-4",
+        ]
+        assert [account["id"] for account in storage.search("phone")] == ["other"]
+        assert storage.search("user3@example")[0]["id"] == "id-3"
+        assert storage.search("nothing") == []
+
+    def test_search_non_ascii(self, storage):
+        """TC-STORAGE-027: ASCII以外の文字も大文字小文字を区別せずに検索"""
+        storage.put_many(
+            [
+                {**_account("cafe", "ÉLODIE@example.com"), "issuer": "Café"},
+                {**_account("zenkaku", "ユーザー"), "issuer": "ＧＩＴＨＵＢ"},
+            ]
+        )
+
+        assert [account["id"] for account in storage.search("élodie")] == ["cafe"]
+        assert [account["id"] for account in storage.search("CAFÉ")] == ["cafe"]
+        assert [account["id"] for account in storage.search("ｇｉｔ")] == ["zenkaku"]
+        assert [account["id"] for account in storage.search("ユーザ")] == ["zenkaku"]
+
+    def test_search_after_update(self, storage, data_file):
+        """TC-STORAGE-028: 上書き・削除・全件削除後の検索と記号を含むキーワード"""
+        storage.put_many(
+            [
+                {**_account("a", 'say "hi" OR*'), "issuer": "GitHub"},
+                {**_account("b", "other"), "issuer": "GitLab"},
+            ]
+        )
+        storage.put({**_account("b", "other"), "issuer": "Bitbucket"})
+        storage.delete("a")
+        storage.put({**_account("c", 'say "hi" OR*'), "issuer": "Gitea"})
+
+        assert [account["id"] for account in storage.search("git")] == ["c"]
+        assert [account["id"] for account in storage.search("bucket")] == ["b"]
+        assert [account["id"] for account in storage.search('"hi" or*')] == ["c"]
+        assert [account["id"] for account in storage.search("t")] == ["b", "c"]
+
+        reopened = self._reopen(storage, data_file)
+        assert [account["id"] for account in reopened.search("BITB")] == ["b"]
+        reopened.clear()
+        assert reopened.search("bitb") == []
+        reopened.close()
+
+    def test_find_ids(self, storage):
+        """TC-STORAGE-014: IDの前方一致検索"""
+        storage.put_many([_account(i) for i in ("abc-1", "abd-2", "b-3")])
+
+        assert storage.find_ids("ab") == ["abc-1", "abd-2"]
+        assert storage.find_ids("ab", limit=1) == ["abc-1"]
+        assert storage.find_ids("abd") == ["abd-2"]
+        assert storage.find_ids("c") == []
+        storage.delete("abc-1")
+        assert storage.find_ids("ab") == ["abd-2"]
+
+    def test_find_legacy_accounts(self, storage):
+        """TC-STORAGE-015: 旧形式レコードの検索"""
+        legacy = {**_account("legacy"), "encrypted_secret": "Z0FBQUFB"}
+        storage.put_many([_account("a"), legacy, {"id": "no-secret"}])
+
+        assert storage.find_legacy_accounts("v2:") == [legacy]
+        assert storage.find_legacy_accounts("v2:", limit=1) == [legacy]
+
+    def test_clear(self, storage, data_file):
+        """TC-STORAGE-016: 全件削除"""
+        storage.put_many([_account("a"), _account("b")])
+
+        storage.clear()
+
+        reopened = self._reopen(storage, data_file)
+        assert reopened.count() == 0
+        assert reopened.load()["vault"] == {"salt": "abc"}
+        reopened.close()
+
+    def test_backup_and_restore(self, storage, data_file):
+        """TC-STORAGE-017: バックアップと復元"""
+        storage.put(_account("a"))
+        backup_file = data_file + ".bak"
+        storage.backup(backup_file)
+
+        storage.put(_account("b"))
+        storage.restore(backup_file)
+        storage.load()
+
+        assert [account["id"] for account in storage.iter_accounts()] == ["a"]
+
+    def test_transaction(self, storage, data_file):
+        """TC-STORAGE-018: トランザクションのコミットとロールバック"""
+        storage.put(_account("a"))
+
+        storage.begin()
+        storage.put(_account("b"))
+        storage.delete("a")
+        assert [account["id"] for account in storage.iter_accounts()] == ["b"]
+        storage.rollback()
+        assert [account["id"] for account in storage.iter_accounts()] == ["a"]
+
+        storage.begin()
+        storage.clear()
+        storage.put_many([_account("c"), _account("d")])
+        storage.commit()
+
+        reopened = self._reopen(storage, data_file)
+        assert [account["id"] for account in reopened.iter_accounts()] == ["c", "d"]
+        assert reopened.find_ids("c") == ["c"]
+        reopened.close()
+
+    def test_nested_begin_rejected(self, storage):
+        """TC-STORAGE-019: 二重のトランザクション開始"""
+        storage.begin()
+        with pytest.raises(Exception):
+            storage.begin()
+        storage.rollback()
+
+    def test_group_commit_from_environment(self, data_file):
+        """TC-STORAGE-026: 環境変数OTP_GROUP_COMMIT_MSによるグループコミットの設定"""
+        with patch.dict("os.environ", {"OTP_GROUP_COMMIT_MS": "5"}):
+            storage = create_storage(data_file)
+
+        if isinstance(storage, SQLiteStorage):
+            assert storage.synchronous == "NORMAL"
+        else:
+            assert storage.journal.group_commit_window == 0.005
+        assert get_group_commit_window() == 0.0
@@ -5,8 +5,13 @@ CameraQRReaderクラスのテスト
 import pytest
 import cv2
 import numpy as np
+import time
 from unittest.mock import patch, Mock, MagicMock
-from src.camera_qr_reader import CameraQRReader
+from src.camera_qr_reader import (
+    CameraQRReader,
+    DetectionMetrics,
+    expand_image_paths,
+)
 
 
 class TestCameraQRReader:
@@ -221,30 +226,30 @@ class TestCameraQRReader:
     def test_qr_detection_loop_success(self, camera_reader):
         """TC-CAM-022: QR検出ループ（成功）"""
         mock_qr_data = "otpauth-migration://offline?data=test_data"
-        camera_reader.camera = Mock()
-        camera_reader.camera.read.return_value = (
-            True,
-            np.zeros((100, 100, 3), dtype=np.uint8),
-        )
+        camera_reader.camera, _ = self._fake_camera(camera_reader)
         camera_reader.is_running = True
+        detected = []
 
-        with patch("cv2.QRCodeDetector") as mock_detector_class:
+        def on_qr_detected(data):
+            detected.append(data)
+            camera_reader.is_running = False
+
+        camera_reader.on_qr_detected = on_qr_detected
+
+        with patch("src.camera_qr_reader.StagedQRDetector") as mock_detector_class:
             mock_detector = Mock()
             mock_detector_class.return_value = mock_detector
-            mock_detector.detectAndDecode.return_value = (mock_qr_data, None, None)
+            mock_detector.detect_and_decode_multi.return_value = (
+                [mock_qr_data],
+                [None],
+            )
 
-            # _qr_detection_loopはコールバックを使用するため、テスト方法を変更
-            # 実際にはこのメソッドは直接テストするのではなく、
-            # start_qr_detection経由でテストする方が適切
-            # ここでは簡略化して、QRコードが検出されたことのみを確認
-            with patch("time.sleep", side_effect=[None, KeyboardInterrupt]):
-                try:
-                    camera_reader._qr_detection_loop()
-                except KeyboardInterrupt:
-                    pass
+            camera_reader._qr_detection_loop()
 
-            # QRCodeDetectorが呼ばれたことを確認
-            mock_detector.detectAndDecode.assert_called()
+            # 検出器が呼ばれ、検出結果が1回だけ通知されたことを確認
+            mock_detector.detect_and_decode_multi.assert_called()
+        assert detected == [mock_qr_data]
+        assert camera_reader.is_running is False
 
     def test_qr_detection_loop_no_qr(self, camera_reader):
         """TC-CAM-023: QR検出ループ（QRコードなし）"""
@@ -385,3 +390,263 @@ class TestCameraQRReader:
 
         assert camera_reader.is_running is False
         mock_camera.release.assert_called_once()
+
+    @staticmethod
+    def _fake_camera(reader, max_reads=10000):
+        """in-placeで読み取る（image引数のバッファに書き込む）カメラのモック"""
+        calls = []
+
+        def read(image=None):
+            calls.append(image)
+            if len(calls) > max_reads:
+                reader.is_running = False
+                return False, None
+            time.sleep(0.001)
+            if image is None:
+                return True, np.zeros((48, 64, 3), dtype=np.uint8)
+            image[:] = len(calls) % 256
+            return True, image
+
+        camera = Mock()
+        camera.read.side_effect = read
+        return camera, calls
+
+    def test_qr_detection_loop_reuses_detector_and_buffers(self):
+        """TC-CAM-031: QR検出ループ（検出器とフレームバッファの再利用）"""
+        camera_reader = CameraQRReader(decode_workers=2)
+        camera_reader.camera, calls = self._fake_camera(camera_reader)
+        camera_reader.is_running = True
+        decodes = []
+
+        def detect(frame):
+            decodes.append(frame)
+            if len(decodes) >= 5:
+                camera_reader.is_running = False
+            return [], []
+
+        with patch("src.camera_qr_reader.StagedQRDetector") as mock_detector_class:
+            mock_detector_class.return_value.detect_and_decode_multi.side_effect = (
+                detect
+            )
+            camera_reader._qr_detection_loop()
+
+        # 検出器はワーカーごとに1回だけ作成され、
+        # 2フレーム目以降は事前確保したバッファ（ワーカー数+2枚）に読み取る
+        assert mock_detector_class.call_count == 2
+        ring_ids = {id(buffer) for buffer in camera_reader._frame_ring}
+        assert len(ring_ids) == 4
+        assert calls[0] is None
+        assert {id(buffer) for buffer in calls[1:]} <= ring_ids
+        assert {id(frame) for frame in decodes} <= ring_ids
+
+        metrics = camera_reader.get_detection_metrics()
+        assert metrics["processed"] >= 5
+        assert metrics["frames"] == (
+            metrics["processed"] + metrics["dropped"] + metrics["skipped"]
+        )
+
+    def test_publish_frame_keeps_only_latest(self, camera_reader):
+        """TC-CAM-032: フレームの受け渡し（最新フレームのみ保持・解像度変更）"""
+        first = np.zeros((48, 64, 3), dtype=np.uint8)
+        camera_reader._publish_frame(first, None)
+        ring = list(camera_reader._frame_ring)
+        assert len(ring) == camera_reader.decode_workers + 2
+        assert camera_reader._latest_frame is first
+
+        # デコードされないまま次のフレームが来た場合は古いフレームを破棄して再利用
+        buffer = camera_reader._acquire_buffer()
+        camera_reader._publish_frame(buffer, buffer)
+        assert camera_reader._latest_frame is buffer
+        assert any(first is free for free in camera_reader._free_buffers)
+        assert camera_reader.get_detection_metrics()["dropped"] == 1
+
+        # バッファとは別の配列が返された場合はバッファを作り直す
+        resized = np.zeros((96, 128, 3), dtype=np.uint8)
+        camera_reader._publish_frame(resized, camera_reader._acquire_buffer())
+        assert camera_reader._frame_ring[0] is resized
+        assert all(b.shape == resized.shape for b in camera_reader._free_buffers)
+
+    def test_decode_worker_first_success_cancels_pending(self, camera_reader):
+        """TC-CAM-033: デコードワーカー（最初の成功で処理待ちのフレームを破棄）"""
+        camera_reader._publish_frame(np.zeros((48, 64, 3), dtype=np.uint8), None)
+        on_qr_detected = Mock()
+        camera_reader.on_qr_detected = on_qr_detected
+        detector = Mock()
+
+        def detect(frame):
+            # デコード中に次のフレームが届く
+            buffer = camera_reader._acquire_buffer()
+            camera_reader._publish_frame(buffer, buffer)
+            camera_reader._pipeline_stopped = True
+            return ["otpauth-migration://offline?data=first"], [None]
+
+        detector.detect_and_decode_multi.side_effect = detect
+        camera_reader._decode_worker(detector)
+
+        on_qr_detected.assert_called_once_with("otpauth-migration://offline?data=first")
+        assert camera_reader._decode_generation == 1
+        assert camera_reader._latest_frame is None
+
+    def test_decode_worker_discards_stale_result(self, camera_reader):
+        """TC-CAM-034: デコードワーカー（他のワーカーが先に成功した場合は結果を破棄）"""
+        camera_reader._publish_frame(np.zeros((48, 64, 3), dtype=np.uint8), None)
+        on_qr_detected = Mock()
+        camera_reader.on_qr_detected = on_qr_detected
+        detector = Mock()
+
+        def detect(frame):
+            # このデコード中に他のワーカーが成功した
+            camera_reader._decode_generation += 1
+            camera_reader._pipeline_stopped = True
+            return ["otpauth-migration://offline?data=late"], [None]
+
+        detector.detect_and_decode_multi.side_effect = detect
+        camera_reader._decode_worker(detector)
+
+        on_qr_detected.assert_not_called()
+        assert camera_reader.get_detection_metrics()["decoded"] == 1
+
+    def test_detection_metrics(self):
+        """TC-CAM-035: fpsとデコード時間の集計"""
+        metrics = DetectionMetrics()
+        metrics.record_capture(10.0)
+        metrics.record_capture(10.1)
+        metrics.record_capture(10.2)
+        metrics.record_drop()
+        metrics.record_skip()
+        metrics.record_decode(0.002, True)
+        metrics.record_decode(0.006, False)
+
+        result = metrics.snapshot()
+        assert result["frames"] == 3
+        assert result["processed"] == 2
+        assert result["dropped"] == 1
+        assert result["skipped"] == 1
+        assert result["decoded"] == 1
+        assert result["fps"] == pytest.approx(10.0)
+        assert result["decode_ms_last"] == pytest.approx(6.0)
+        assert result["decode_ms_avg"] == pytest.approx(4.0)
+        assert result["decode_ms_max"] == pytest.approx(6.0)
+
+        metrics.reset()
+        assert metrics.snapshot()["frames"] == 0
+
+    def test_qr_detection_loop_skips_static_frames(self, camera_reader):
+        """TC-CAM-036: QR検出ループ（変化のないフレームはデコードしない）"""
+        reads = []
+
+        def read(image=None):
+            reads.append(image)
+            if len(reads) > 20:
+                camera_reader.is_running = False
+                return False, None
+            time.sleep(0.001)
+            if image is None:
+                return True, np.full((48, 64, 3), 128, dtype=np.uint8)
+            image[:] = 128
+            return True, image
+
+        camera_reader.camera = Mock()
+        camera_reader.camera.read.side_effect = read
+        camera_reader.is_running = True
+
+        with patch("src.camera_qr_reader.StagedQRDetector") as mock_detector_class:
+            mock_detector = mock_detector_class.return_value
+            mock_detector.detect_and_decode_multi.return_value = ([], [])
+            camera_reader._qr_detection_loop()
+
+        # 最初のフレームだけデコードし、静止している残りのフレームはスキップする
+        metrics = camera_reader.get_detection_metrics()
+        assert metrics["frames"] == 20
+        assert metrics["skipped"] == 19
+        assert mock_detector.detect_and_decode_multi.call_count <= 1
+
+    def test_decode_worker_multiple_codes(self, camera_reader):
+        """TC-CAM-037: デコードワーカー（1フレーム内の複数のQRコードをそれぞれ通知）"""
+        on_qr_detected = Mock()
+        camera_reader.on_qr_detected = on_qr_detected
+        detector = Mock()
+
+        def detect(frame):
+            camera_reader._pipeline_stopped = True
+            return results.pop(0), [None, None]
+
+        detector.detect_and_decode_multi.side_effect = detect
+        results = [["part1", "part2"], ["part2", "part3"]]
+        for _ in range(2):
+            camera_reader._pipeline_stopped = False
+            camera_reader._publish_frame(np.zeros((48, 64, 3), dtype=np.uint8), None)
+            camera_reader._decode_worker(detector)
+
+        # 2フレーム目の part2 はクールダウン中のため通知しない
+        assert [c.args[0] for c in on_qr_detected.call_args_list] == [
+            "part1",
+            "part2",
+            "part3",
+        ]
+
+    @staticmethod
+    def _write_qr_image(path, payload):
+        """QRコードの画像ファイルを作成"""
+        qr = cv2.QRCodeEncoder.create().encode(payload)
+        qr = cv2.resize(qr, (240, 240), interpolation=cv2.INTER_NEAREST)
+        qr = cv2.copyMakeBorder(qr, 40, 40, 40, 40, cv2.BORDER_CONSTANT, value=255)
+        cv2.imwrite(str(path), qr)
+        return str(path)
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_read_qr_from_images(self, camera_reader, tmp_path, workers):
+        """TC-CAM-038: 複数の画像ファイルの一括読み取り（結果は入力と同じ順序）"""
+        paths = [
+            self._write_qr_image(tmp_path / f"qr{i}.png", f"otpauth://totp/u{i}")
+            for i in range(3)
+        ]
+        blank = tmp_path / "blank.png"
+        cv2.imwrite(str(blank), np.full((200, 200), 255, dtype=np.uint8))
+        paths += [str(blank), str(tmp_path / "missing.png")]
+
+        results = camera_reader.read_qr_from_images(paths, workers=workers)
+
+        assert [payloads for payloads, _ in results[:4]] == [
+            ["otpauth://totp/u0"],
+            ["otpauth://totp/u1"],
+            ["otpauth://totp/u2"],
+            [],
+        ]
+        assert all(error is None for _, error in results[:4])
+        assert results[4][0] == []
+        assert results[4][1]
+
+    def test_read_qr_from_images_parallel(self, camera_reader):
+        """TC-CAM-039: 一定枚数以上はプロセスプールで並列に読み取る"""
+        paths = [f"qr{i}.png" for i in range(8)]
+
+        with patch("src.camera_qr_reader.ProcessPoolExecutor") as mock_executor:
+            executor = mock_executor.return_value.__enter__.return_value
+            executor.map.return_value = iter([(["data"], None)] * 8)
+            results = camera_reader.read_qr_from_images(paths, workers=2)
+
+        assert len(results) == 8
+        assert mock_executor.call_args.kwargs["max_workers"] == 2
+        assert list(executor.map.call_args.args[1]) == paths
+
+        # 少数の画像はプロセスを起動せずに読み取る
+        with patch("src.camera_qr_reader.ProcessPoolExecutor") as mock_executor:
+            camera_reader.read_qr_from_images(paths[:2], workers=2)
+        mock_executor.assert_not_called()
+
+    def test_expand_image_paths(self, tmp_path):
+        """TC-CAM-040: ディレクトリ・globパターンからの画像ファイルの列挙"""
+        (tmp_path / "sub").mkdir()
+        for name in ["b.png", "a.JPG", "note.txt", "sub/c.png"]:
+            (tmp_path / name).write_bytes(b"")
+
+        assert expand_image_paths(str(tmp_path)) == [
+            str(tmp_path / "a.JPG"),
+            str(tmp_path / "b.png"),
+        ]
+        assert expand_image_paths(str(tmp_path / "**" / "*.png")) == [
+            str(tmp_path / "b.png"),
+            str(tmp_path / "sub" / "c.png"),
+        ]
+        assert expand_image_paths(str(tmp_path / "none" / "*.png")) == []
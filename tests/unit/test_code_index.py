@@ -0,0 +1,120 @@
+"""
+code_index.pyのテスト
+"""
+
+import base64
+import hashlib
+import pyotp
+from unittest.mock import Mock
+from src.code_index import CodeIndex
+
+
+def _accounts(count):
+    """テスト用アカウント（アカウントごとに異なるシークレット）"""
+    return [
+        {
+            "id": f"id-{i:05d}",
+            "device_name": "Device",
+            "account_name": f"user{i}@example.com",
+            "issuer": "Service",
+            "secret": base64.b32encode(i.to_bytes(20, "big")).decode(),
+        }
+        for i in range(count)
+    ]
+
+
+class TestCodeIndex:
+    """CodeIndexクラスのテスト"""
+
+    NOW = 1640995215.0
+
+    def test_lookup_current_and_adjacent(self):
+        """TC-INDEX-001: 現在と前後の周期のOTPで逆引き"""
+        accounts = _accounts(200)
+        index = CodeIndex(window=1)
+        index.build(accounts, for_time=self.NOW)
+
+        target = accounts[123]
+        totp = pyotp.TOTP(target["secret"])
+        for offset in (-1, 0, 1):
+            results = index.lookup(totp.at(self.NOW + offset * 30), for_time=self.NOW)
+            match = [r for r in results if r["id"] == "id-00123"]
+            assert match and match[0]["offset"] == offset
+            assert "secret" not in match[0]
+
+        # window外のOTPは一致しない
+        results = index.lookup(totp.at(self.NOW - 60), for_time=self.NOW)
+        assert "id-00123" not in [r["id"] for r in results]
+
+    def test_incremental_refresh(self):
+        """TC-INDEX-002: 周期の境界では新しいカウンタ分のみ計算"""
+        accounts = _accounts(50)
+        index = CodeIndex(window=1)
+        index.build(accounts, for_time=self.NOW)
+        assert index.computed_counters == 3
+
+        # 同じ周期内では再計算しない
+        index.refresh(self.NOW + 10)
+        assert index.computed_counters == 3
+
+        # 次の周期では1カウンタ分のみ計算
+        index.refresh(self.NOW + 30)
+        assert index.computed_counters == 4
+
+        code = pyotp.TOTP(accounts[7]["secret"]).at(self.NOW + 60)
+        assert "id-00007" in [
+            r["id"] for r in index.lookup(code, for_time=self.NOW + 30)
+        ]
+
+        # 大きく時間が進んだ場合は全カウンタを計算し直す
+        index.refresh(self.NOW + 3000)
+        assert index.computed_counters == 7
+
+    def test_period_groups(self):
+        """TC-INDEX-003: 周期の異なるアカウント"""
+        accounts = _accounts(2)
+        accounts[1]["period"] = 60
+        index = CodeIndex(window=0)
+        index.build(accounts, for_time=self.NOW)
+
+        code = pyotp.TOTP(accounts[1]["secret"], interval=60).at(self.NOW)
+        assert [r["id"] for r in index.lookup(code, for_time=self.NOW)] == ["id-00001"]
+
+    def test_invalid_input(self):
+        """TC-INDEX-004: 不正なOTP・シークレット"""
+        accounts = _accounts(3) + [{"id": "bad", "secret": "invalid_secret"}]
+        index = CodeIndex()
+        index.build(accounts, for_time=self.NOW)
+
+        assert len(index.accounts) == 3
+        assert index.lookup("abcdef", for_time=self.NOW) == []
+        assert index.lookup("12345", for_time=self.NOW) == []
+        # ASCII以外の数字（上付き・アラビア・インド数字）は受け付けない
+        assert index.lookup("²" * 6, for_time=self.NOW) == []
+        current = pyotp.TOTP(accounts[0]["secret"]).at(self.NOW)
+        arabic_indic = current.translate(str.maketrans("0123456789", "٠١٢٣٤٥٦٧٨٩"))
+        assert index.lookup(arabic_indic, for_time=self.NOW) == []
+
+    def test_from_security_manager(self):
+        """TC-INDEX-005: SecurityManagerの全アカウントから作成"""
+        manager = Mock()
+        manager.get_all_accounts.return_value = _accounts(5)
+
+        index = CodeIndex.from_security_manager(manager, window=2)
+
+        assert index.window == 2
+        assert len(index.accounts) == 5
+        code = pyotp.TOTP(_accounts(5)[2]["secret"]).now()
+        assert "id-00002" in [r["id"] for r in index.lookup(code)]
+
+    def test_parameter_groups(self):
+        """TC-INDEX-006: (アルゴリズム, 桁数, 周期) ごとのグループ"""
+        accounts = _accounts(3)
+        accounts[1].update({"algorithm": "SHA256", "digits": 8})
+        index = CodeIndex(window=0)
+        index.build(accounts, for_time=self.NOW)
+
+        totp = pyotp.TOTP(accounts[1]["secret"], digits=8, digest=hashlib.sha256)
+        results = index.lookup(totp.at(self.NOW), for_time=self.NOW)
+        assert [r["id"] for r in results] == ["id-00001"]
+        assert len(index._groups) == 2
@@ -4,6 +4,8 @@ DockerManagerクラスのテスト
 
 import pytest
 import subprocess
+import threading
+import time
 from unittest.mock import patch, Mock, MagicMock
 from src.docker_manager import DockerManager
 
@@ -503,3 +505,87 @@ class TestDockerManager:
 
                     assert len(results) == 3
                     assert all(result is not None for result in results)
+
+    def test_parse_otpauth_outputs_multiple_lines(self, docker_manager):
+        """TC-DM-033: 複数行のotpauth出力の解析"""
+        output = (
+            "otpauth://totp/Example:alice@example.com?issuer=Example&secret=JBSWY3DPEHPK3PXP\n"
+            "\n"
+            "invalid line\n"
+            "otpauth://totp/bob?secret=GEZDGNBVGY3TQOJQ&period=60\n"
+        )
+
+        results = docker_manager.parse_otpauth_outputs(output)
+
+        assert [result["account_name"] for result in results] == [
+            "alice@example.com",
+            "bob",
+        ]
+        assert results[1]["period"] == "60"
+
+    def test_process_qr_urls(self, docker_manager):
+        """TC-DM-034: 分割された移行用QRコードの一括処理"""
+        outputs = {
+            "otpauth-migration://offline?data=part1": (
+                True,
+                "otpauth://totp/a?secret=JBSWY3DPEHPK3PXP\n"
+                "otpauth://totp/b?secret=GEZDGNBVGY3TQOJQ",
+            ),
+            "otpauth-migration://offline?data=part2": (
+                True,
+                "otpauth://totp/c?secret=MZXW6YTBOI======",
+            ),
+        }
+
+        with patch.object(
+            docker_manager, "ensure_image_available", return_value=True
+        ) as mock_ensure:
+            with patch.object(
+                docker_manager, "run_container", side_effect=outputs.get
+            ) as mock_run:
+                results = docker_manager.process_qr_urls(
+                    list(outputs) + ["invalid_qr_data"]
+                )
+
+        assert [result["account_name"] for result in results] == ["a", "b", "c"]
+        # イメージの準備は1回、コンテナは有効なURLごとに実行
+        mock_ensure.assert_called_once()
+        assert mock_run.call_count == 2
+
+    def test_process_qr_urls_concurrent(self, docker_manager):
+        """TC-DM-035: 複数のコンテナを同時に実行（結果は入力の順序、名前は重複しない）"""
+        urls = [f"otpauth-migration://offline?data=part{i}" for i in range(6)]
+        lock = threading.Lock()
+        running = [0]
+        peak = [0]
+        names = []
+
+        def run_container(qr_url, container_name=None):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+                names.append(container_name)
+            time.sleep(0.05)
+            with lock:
+                running[0] -= 1
+            index = qr_url[-1]
+            return True, f"otpauth://totp/user{index}?secret=JBSWY3DPEHPK3PXP"
+
+        with (
+            patch.object(docker_manager, "ensure_image_available", return_value=True),
+            patch.object(docker_manager, "run_container", side_effect=run_container),
+        ):
+            results = docker_manager.process_qr_urls(urls, max_workers=3)
+
+        assert [r["account_name"] for r in results] == [f"user{i}" for i in range(6)]
+        assert 1 < peak[0] <= 3
+        assert len(set(names)) == 6
+
+        # 1の場合は既定のコンテナ名で順番に実行
+        names.clear()
+        with (
+            patch.object(docker_manager, "ensure_image_available", return_value=True),
+            patch.object(docker_manager, "run_container", side_effect=run_container),
+        ):
+            docker_manager.process_qr_urls(urls[:2], max_workers=1)
+        assert names == [None, None]
@@ -2,6 +2,7 @@
 Mainモジュールのテスト
 """
 
+import base64
 import pytest
 import sys
 from unittest.mock import patch, Mock, MagicMock
@@ -49,6 +50,9 @@ class TestOneTimePasswordApp:
             account_name="test@example.com",
             issuer="TestService",
             secret="JBSWY3DPEHPK3PXP",
+            algorithm=None,
+            digits=None,
+            period=None,
         )
 
     def test_add_account_from_camera_qr_failure(self, app):
@@ -102,6 +106,113 @@ class TestOneTimePasswordApp:
 
         assert result is False
 
+    @staticmethod
+    def _migration_part(batch_index, batch_size, batch_id=7):
+        """分割された移行用QRコードのURLを作成（バッチ情報のみのペイロード）"""
+        payload = bytes([0x18, batch_size, 0x20, batch_index, 0x28, batch_id])
+        data = base64.b64encode(payload).decode("ascii")
+        return "otpauth-migration://offline?data=" + data
+
+    def test_add_account_from_camera_batch(self, app):
+        """TC-MAIN-043: 分割された移行用QRコードを全て読み取って一括追加"""
+        parts = [self._migration_part(i, 3) for i in range(3)]
+
+        # 1フレームに複数・順不同・重複を含めて検出させる
+        def mock_start_qr_detection(on_qr_detected, on_error):
+            for data in (parts[1], parts[1], parts[2], parts[0]):
+                on_qr_detected(data)
+
+        app.camera_reader.start_qr_detection = mock_start_qr_detection
+        app.docker_manager.process_qr_urls.return_value = [
+            {
+                "device_name": f"Service{i}",
+                "account_name": f"user{i}@example.com",
+                "issuer": None,
+                "secret": "JBSWY3DPEHPK3PXP",
+                "period": "60",
+            }
+            for i in range(4)
+        ]
+        app.security_manager.add_many.return_value = ["id0", "id1", "id2", "id3"]
+
+        result = app.add_account_from_camera()
+
+        assert result is True
+        app.docker_manager.process_qr_urls.assert_called_once_with(parts)
+        app.docker_manager.process_qr_url.assert_not_called()
+        app.security_manager.add_account.assert_not_called()
+        accounts = app.security_manager.add_many.call_args[0][0]
+        assert [a["account_name"] for a in accounts] == [
+            f"user{i}@example.com" for i in range(4)
+        ]
+        assert accounts[0]["issuer"] == ""
+        assert accounts[0]["period"] == "60"
+
+    def test_add_account_from_camera_batch_incomplete(self, app):
+        """TC-MAIN-044: 分割された移行用QRコードが揃わない場合は追加しない"""
+
+        def mock_start_qr_detection(on_qr_detected, on_error):
+            on_qr_detected(self._migration_part(0, 2))
+            app.running = False  # 残りを読み取る前に終了
+
+        app.camera_reader.start_qr_detection = mock_start_qr_detection
+
+        result = app.add_account_from_camera()
+
+        assert result is False
+        app.docker_manager.process_qr_urls.assert_not_called()
+        app.security_manager.add_many.assert_not_called()
+
+    def test_add_accounts_from_images(self, app, tmp_path, capsys):
+        """TC-MAIN-045: 複数の画像ファイルから重複を除いて一括追加"""
+        for name in ["a.png", "b.png", "c.png", "d.png", "e.png"]:
+            (tmp_path / name).write_bytes(b"")
+        parts = [self._migration_part(i, 2) for i in range(2)]
+        app.camera_reader.read_qr_from_images.return_value = [
+            ([parts[0]], None),
+            ([parts[0], parts[1]], None),
+            ([], None),
+            ([], "画像の読み込みに失敗しました"),
+            (["https://example.com"], None),
+        ]
+        app.camera_reader.validate_qr_data.side_effect = lambda data: data in parts
+        app.docker_manager.process_qr_urls.return_value = [
+            {
+                "device_name": "Service",
+                "account_name": "user@example.com",
+                "issuer": "Service",
+                "secret": "JBSWY3DPEHPK3PXP",
+            }
+        ]
+        app.security_manager.add_many.return_value = ["id0"]
+
+        result = app.add_accounts_from_images(str(tmp_path), workers=2)
+
+        assert result is True
+        paths = app.camera_reader.read_qr_from_images.call_args[0][0]
+        assert paths == [str(tmp_path / f"{name}.png") for name in "abcde"]
+        assert app.camera_reader.read_qr_from_images.call_args[0][1] == 2
+        app.docker_manager.process_qr_urls.assert_called_once_with(parts)
+        app.security_manager.add_many.assert_called_once()
+        output = capsys.readouterr().out
+        assert "[重複]" in output
+        assert "[なし]" in output
+        assert "[エラー]" in output
+        assert "[無効]" in output
+        assert "枚/秒" in output
+
+    def test_add_accounts_from_images_not_found(self, app, tmp_path):
+        """TC-MAIN-046: 画像ファイル・QRコードが見つからない場合は追加しない"""
+        assert app.add_accounts_from_images(str(tmp_path / "*.png")) is False
+        app.camera_reader.read_qr_from_images.assert_not_called()
+
+        (tmp_path / "a.png").write_bytes(b"")
+        app.camera_reader.read_qr_from_images.return_value = [([], None)]
+
+        assert app.add_accounts_from_images(str(tmp_path / "*.png")) is False
+        app.docker_manager.process_qr_urls.assert_not_called()
+        app.security_manager.add_many.assert_not_called()
+
     def test_add_account_from_image_success(self, app):
         """TC-MAIN-005: 画像ファイルからのアカウント追加（成功）"""
         image_path = "test_qr.png"
@@ -515,3 +626,141 @@ class TestMainFunction:
         with patch("sys.argv", ["main.py", "--help"]):
             with pytest.raises(SystemExit):
                 main()
+
+    def test_main_agent_command(self):
+        """TC-MAIN-036: agentコマンドの実行"""
+        with patch("sys.argv", ["main.py", "agent", "start", "--timeout", "60"]):
+            with patch("src.main.OneTimePasswordApp") as mock_app_class:
+                mock_app = Mock()
+                mock_app_class.return_value = mock_app
+
+                main()
+
+                mock_app.manage_agent.assert_called_once_with("start", 60.0)
+
+    def test_manage_agent_not_running(self):
+        """TC-MAIN-037: エージェント未起動時のagent操作"""
+        with (
+            patch("src.main.SecurityManager"),
+            patch("src.main.OTPGenerator"),
+            patch("src.main.CameraQRReader"),
+            patch("src.main.DockerManager"),
+            patch("src.main.connect_agent", return_value=None),
+        ):
+            app = OneTimePasswordApp()
+
+            assert app.manage_agent("lock") is False
+            assert app.manage_agent("status") is False
+
+    def test_manage_agent_unlock(self):
+        """TC-MAIN-038: agent unlockでボールトをエージェントに登録"""
+        client = Mock()
+        with (
+            patch("src.main.SecurityManager"),
+            patch("src.main.OTPGenerator"),
+            patch("src.main.CameraQRReader"),
+            patch("src.main.DockerManager"),
+            patch("src.main.connect_agent", return_value=client),
+        ):
+            app = OneTimePasswordApp()
+            crypto = Mock(uses_agent=False, password="pw")
+            app.security_manager.unlock.return_value = crypto
+            app.security_manager.vault = {"version": 2}
+
+            assert app.manage_agent("unlock") is True
+            client.unlock.assert_called_once_with("pw", {"version": 2})
+
+    def test_main_show_tui_command(self):
+        """TC-MAIN-039: show --all --tuiでTUI表示"""
+        with patch("sys.argv", ["main.py", "show", "--all", "--tui"]):
+            with patch("src.main.OneTimePasswordApp") as mock_app_class:
+                mock_app = Mock()
+                mock_app_class.return_value = mock_app
+
+                main()
+
+                mock_app.show_otp_tui.assert_called_once_with()
+                mock_app.show_otp.assert_not_called()
+
+    def test_main_show_tui_requires_all(self):
+        """TC-MAIN-048: --all なしの show --tui はエラー"""
+        with patch("sys.argv", ["main.py", "show", "account-id", "--tui"]):
+            with patch("src.main.OneTimePasswordApp") as mock_app_class:
+                with pytest.raises(SystemExit):
+                    main()
+
+                mock_app_class.assert_not_called()
+
+    def test_show_otp_tui(self):
+        """TC-MAIN-040: TUI表示（アカウントなし・あり）"""
+        with (
+            patch("src.main.SecurityManager"),
+            patch("src.main.OTPGenerator"),
+            patch("src.main.CameraQRReader"),
+            patch("src.main.DockerManager"),
+            patch("src.main.OTPViewer") as mock_viewer,
+        ):
+            app = OneTimePasswordApp()
+            app.security_manager.get_all_accounts.return_value = []
+            assert app.show_otp_tui() is False
+            mock_viewer.assert_not_called()
+
+            accounts = [{"id": "a", "account_name": "x", "secret": "S"}]
+            app.security_manager.get_all_accounts.return_value = accounts
+            assert app.show_otp_tui() is True
+            mock_viewer.assert_called_once_with(app.otp_generator, accounts)
+            mock_viewer.return_value.start.assert_called_once()
+
+    def test_lookup_code(self):
+        """TC-MAIN-041: OTPからアカウントを逆引き"""
+        with (
+            patch("src.main.SecurityManager"),
+            patch("src.main.OTPGenerator"),
+            patch("src.main.CameraQRReader"),
+            patch("src.main.DockerManager"),
+            patch("src.main.CodeIndex") as mock_index,
+        ):
+            app = OneTimePasswordApp()
+            index = mock_index.from_security_manager.return_value
+
+            index.lookup.return_value = []
+            assert app.lookup_code("123456") is False
+
+            index.lookup.return_value = [
+                {
+                    "id": "a1",
+                    "account_name": "x",
+                    "issuer": "y",
+                    "created_at": "2025-01-26T10:00:00",
+                    "offset": -1,
+                }
+            ]
+            assert app.lookup_code("123456", window=2) is True
+            mock_index.from_security_manager.assert_called_with(app.security_manager, 2)
+
+    def test_main_lookup_command(self):
+        """TC-MAIN-042: lookupコマンドの実行"""
+        with patch("sys.argv", ["main.py", "lookup", "123456"]):
+            with patch("src.main.OneTimePasswordApp") as mock_app_class:
+                mock_app = Mock()
+                mock_app_class.return_value = mock_app
+
+                main()
+
+                mock_app.lookup_code.assert_called_once_with("123456", 1)
+
+    def test_main_add_images_command(self):
+        """TC-MAIN-047: add --images コマンドの実行"""
+        with patch(
+            "sys.argv",
+            ["main.py", "add", "--images", "exports/*.png", "--workers", "3"],
+        ):
+            with patch("src.main.OneTimePasswordApp") as mock_app_class:
+                mock_app = Mock()
+                mock_app_class.return_value = mock_app
+
+                main()
+
+                mock_app.add_accounts_from_images.assert_called_once_with(
+                    "exports/*.png", 3
+                )
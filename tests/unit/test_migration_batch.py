@@ -0,0 +1,109 @@
+"""
+migration_batch.pyのテスト
+"""
+
+import base64
+from urllib.parse import quote
+from src.migration_batch import (
+    BatchInfo,
+    MigrationBatchCollector,
+    parse_batch_info,
+)
+
+
+def _varint(value: int) -> bytes:
+    """protobufのvarintをエンコード"""
+    if value < 0:
+        value += 1 << 64
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def make_migration_url(
+    batch_index: int, batch_size: int, batch_id: int, name: str = "user"
+) -> str:
+    """テスト用の移行用QRコードURLを作成"""
+    otp_parameters = b"\x0a\x0a" + b"0123456789" + b"\x12" + bytes([len(name)])
+    otp_parameters += name.encode()
+    payload = b"\x0a" + _varint(len(otp_parameters)) + otp_parameters
+    payload += b"\x10" + _varint(1)  # version
+    payload += b"\x18" + _varint(batch_size)
+    payload += b"\x20" + _varint(batch_index)
+    payload += b"\x28" + _varint(batch_id)
+    data = base64.b64encode(payload).decode("ascii")
+    return "otpauth-migration://offline?data=" + quote(data, safe="")
+
+
+class TestParseBatchInfo:
+    """parse_batch_infoのテスト"""
+
+    def test_parse_batch_info(self):
+        """TC-MIG-001: バッチ情報の読み取り（アカウント情報のフィールドは読み飛ばす）"""
+        assert parse_batch_info(make_migration_url(1, 3, 12345)) == BatchInfo(
+            12345, 1, 3
+        )
+
+    def test_negative_batch_id(self):
+        """TC-MIG-002: 負のbatch_id（int32）"""
+        assert parse_batch_info(make_migration_url(0, 2, -42)).batch_id == -42
+
+    def test_single_qr_without_batch_fields(self):
+        """TC-MIG-003: バッチ情報のないペイロードは1件のバッチ"""
+        data = base64.b64encode(b"\x10\x01").decode("ascii")
+        url = "otpauth-migration://offline?data=" + data
+
+        assert parse_batch_info(url) == BatchInfo(0, 0, 1)
+
+    def test_invalid_payload(self):
+        """TC-MIG-004: 解析できないペイロード"""
+        assert parse_batch_info("otpauth-migration://offline?data=test_data") is None
+        assert parse_batch_info("otpauth://totp/test?secret=ABC") is None
+        assert parse_batch_info("") is None
+        # 途中で切れたペイロード
+        truncated = base64.b64encode(b"\x0a\x20abc").decode("ascii")
+        assert parse_batch_info("otpauth-migration://offline?data=" + truncated) is None
+
+
+class TestMigrationBatchCollector:
+    """MigrationBatchCollectorクラスのテスト"""
+
+    def test_collect_all_parts(self):
+        """TC-MIG-005: 全てのQRコードが揃うまで収集（順不同・重複は無視）"""
+        parts = [make_migration_url(i, 3, 7, f"user{i}") for i in range(3)]
+        collector = MigrationBatchCollector()
+
+        assert collector.add(parts[2]) is True
+        assert collector.add(parts[2]) is False
+        assert collector.add(parts[0]) is True
+        assert collector.is_complete is False
+        assert collector.missing_indices() == [1]
+
+        assert collector.add(parts[1]) is True
+        assert collector.is_complete is True
+        assert collector.payloads() == parts
+        assert collector.collected == 3
+
+    def test_ignore_other_export(self):
+        """TC-MIG-006: 別のエクスポート（batch_idが異なる）のQRコードは無視"""
+        collector = MigrationBatchCollector()
+        collector.add(make_migration_url(0, 2, 7))
+
+        assert collector.add(make_migration_url(1, 2, 8)) is False
+        assert collector.add("otpauth-migration://offline?data=test_data") is False
+        assert collector.missing_indices() == [1]
+
+    def test_unparsable_payload_is_single_batch(self):
+        """TC-MIG-007: バッチ情報を読み取れないQRコードは1件で完結"""
+        collector = MigrationBatchCollector()
+
+        assert collector.add("otpauth-migration://offline?data=test_data") is True
+        assert collector.is_complete is True
+        assert collector.add(make_migration_url(0, 2, 7)) is False
+        assert collector.payloads() == ["otpauth-migration://offline?data=test_data"]
@@ -6,6 +6,8 @@ import pytest
 import time
 import threading
 from unittest.mock import patch, Mock, MagicMock
+import hashlib
+import pyotp
 from src.otp_generator import OTPGenerator
 
 
@@ -268,3 +270,221 @@ class TestOTPGenerator:
             generator.stop_realtime_display()
 
             assert generator.running is False
+
+    def test_generate_otp_matches_pyotp(self, sample_accounts):
+        """TC-OTP-013: 生成結果はpyotpと同一"""
+        generator = OTPGenerator()
+
+        with patch("time.time", return_value=1640995200.0):
+            for account in sample_accounts:
+                otp_info = generator.generate_otp(account["secret"])
+                expected = pyotp.TOTP(account["secret"]).at(1640995200)
+                assert otp_info["otp"] == expected
+
+    def test_generate_multiple_otps_reuses_codes(self, sample_accounts):
+        """TC-OTP-014: 毎秒の更新では残り時間のみ更新しOTPは再計算しない"""
+        generator = OTPGenerator()
+
+        with patch.object(
+            generator.engine, "_compute", wraps=generator.engine._compute
+        ) as mock_compute:
+            with patch("time.time", return_value=1640995200.0):
+                first = generator.generate_multiple_otps(sample_accounts)
+            with patch("time.time", return_value=1640995210.0):
+                second = generator.generate_multiple_otps(sample_accounts)
+
+            assert mock_compute.call_count == len(sample_accounts)
+
+        assert [o["otp"] for o in first] == [o["otp"] for o in second]
+        assert all(o["remaining_seconds"] == 30 for o in first)
+        assert all(o["remaining_seconds"] == 20 for o in second)
+        assert len({o["timestamp"] for o in first}) == 1
+
+    def test_remaining_time_with_period(self):
+        """TC-OTP-015: 30秒以外の周期の残り時間とOTP"""
+        generator = OTPGenerator()
+
+        assert generator._calculate_remaining_time(1640995215.0, 60) == 45
+        assert generator._calculate_remaining_time(1640995215.0) == 15
+
+        otp_info = generator.generate_otp(
+            "JBSWY3DPEHPK3PXP", "test", for_time=1640995215.0, period=60
+        )
+        assert otp_info["period"] == 60
+        assert otp_info["remaining_seconds"] == 45
+        assert otp_info["otp"] == pyotp.TOTP("JBSWY3DPEHPK3PXP", interval=60).at(
+            1640995215
+        )
+
+    def test_realtime_loop_regenerates_on_boundary(self):
+        """TC-OTP-016: 周期境界でのみOTPを再生成し、毎秒は残り時間のみ更新"""
+        generator = OTPGenerator()
+        generator.running = True
+        accounts = [{"secret": "JBSWY3DPEHPK3PXP", "account_name": "test"}]
+        clock = [1640995225.5]
+        wakeups = []
+
+        def fake_wait(timeout):
+            clock[0] += timeout
+            wakeups.append(clock[0])
+            return clock[0] >= 1640995232.0
+
+        displayed = []
+        with (
+            patch("time.time", side_effect=lambda: clock[0]),
+            patch.object(generator._stop_event, "wait", side_effect=fake_wait),
+            patch.object(generator.renderer, "render"),
+            patch.object(
+                generator,
+                "_format_otps",
+                side_effect=lambda otps: displayed.append(
+                    [(o["otp"], o["remaining_seconds"]) for o in otps]
+                ),
+            ),
+            patch.object(
+                generator,
+                "generate_multiple_otps",
+                wraps=generator.generate_multiple_otps,
+            ) as mock_generate,
+        ):
+            generator._realtime_update_loop(accounts, 1)
+
+        # 起床は整数秒（周期境界1640995230を含む）のみ
+        assert wakeups == [1640995226.0 + i for i in range(7)]
+        # 生成は初回と周期境界の2回のみ
+        assert mock_generate.call_count == 2
+        assert [r for _, r in (d[0] for d in displayed)] == [5, 4, 3, 2, 1, 30, 29]
+        assert displayed[5][0][0] == pyotp.TOTP("JBSWY3DPEHPK3PXP").at(1640995230)
+
+    def test_format_otps_lines(self):
+        """TC-OTP-017: 表示行の作成"""
+        generator = OTPGenerator()
+        otps = [
+            {
+                "otp": "123456",
+                "account_name": "user@example.com",
+                "remaining_seconds": 15,
+                "period": 30,
+            }
+        ]
+
+        lines = generator._format_otps(otps)
+
+        assert "アカウント: user@example.com" in lines
+        assert "OTP: 123456" in lines
+        assert "残り時間: 15秒 [██████████░░░░░░░░░░]" in lines
+        assert lines[-1] == "Ctrl+C で停止"
+        assert (
+            generator._format_otps([])[-1] == "登録されているアカウントがありません。"
+        )
+
+    def test_verify_and_verify_many(self):
+        """TC-OTP-018: アカウント単位のOTP検証と一括検証"""
+        generator = OTPGenerator()
+        account = {"account_name": "a", "secret": "JBSWY3DPEHPK3PXP"}
+        account60 = {"account_name": "b", "secret": "JBSWY3DPEHPK3PXP", "period": 60}
+        now = 1640995215.0
+        code = pyotp.TOTP(account["secret"]).at(now)
+        code60 = pyotp.TOTP(account["secret"], interval=60).at(now)
+
+        assert generator.verify(account, code, for_time=now) is True
+        assert generator.verify(account60, code60, for_time=now) is True
+        assert generator.verify(account, "000000", window=0, for_time=now) is (
+            code == "000000"
+        )
+        with pytest.raises(Exception):
+            generator.verify({"account_name": "x"}, code)
+
+        with patch("time.time", return_value=now):
+            results = generator.verify_many(
+                [
+                    (account, code),
+                    (account60, code60),
+                    (account, "abc"),
+                    ({"account_name": "x", "secret": "invalid_secret"}, code),
+                ]
+            )
+        assert results == [True, True, False, False]
+
+    def test_verify_with_replay_store(self):
+        """TC-OTP-019: 受理済みのコードは期限内は再度受理しない"""
+        from src.replay_store import ReplayStore
+
+        generator = OTPGenerator(replay_store=ReplayStore())
+        account = {"id": "acc-1", "account_name": "a", "secret": "JBSWY3DPEHPK3PXP"}
+        now = 1640995215.0
+        code = pyotp.TOTP(account["secret"]).at(now)
+
+        assert generator.verify(account, code, for_time=now) is True
+        assert generator.verify(account, code, for_time=now + 20) is False
+        assert generator.verify_many([(account, code)], for_time=now) == [False]
+
+        # window(±1)を過ぎた後に同じカウンタの記録は破棄される
+        assert len(generator.replay_store) == 1
+        generator.replay_store.evict_expired(now=1640995260.0)
+        assert len(generator.replay_store) == 0
+
+        # IDのないアカウントはシークレットのハッシュで区別
+        other = {"account_name": "b", "secret": "JBSWY3DPEHPK3PXP"}
+        assert generator.verify(other, code, for_time=now) is True
+        assert generator.verify(other, code, for_time=now) is False
+
+    def test_per_account_parameters(self):
+        """TC-OTP-020: アカウントごとのアルゴリズム・桁数・周期"""
+        generator = OTPGenerator()
+        secret = "JBSWY3DPEHPK3PXP"
+        now = 1640995215.0
+        accounts = [
+            {"account_name": "default", "secret": secret},
+            {
+                "account_name": "sha256",
+                "secret": secret,
+                "algorithm": "SHA256",
+                "digits": 8,
+                "period": 60,
+            },
+            {
+                "account_name": "sha512",
+                "secret": secret,
+                "algorithm": "SHA512",
+                "digits": 7,
+                "period": 15,
+            },
+            {"account_name": "bad", "secret": secret, "algorithm": "MD5"},
+        ]
+        expected = [
+            pyotp.TOTP(secret).at(now),
+            pyotp.TOTP(secret, digits=8, digest=hashlib.sha256, interval=60).at(now),
+            pyotp.TOTP(secret, digits=7, digest=hashlib.sha512, interval=15).at(now),
+        ]
+
+        with patch("time.time", return_value=now):
+            otps = generator.generate_multiple_otps(accounts)
+
+        assert [o["otp"] for o in otps] == expected
+        assert [o["remaining_seconds"] for o in otps] == [15, 45, 15]
+        assert generator.generate_codes(accounts, for_time=now) == expected + [None]
+        assert generator.verify(accounts[1], expected[1], for_time=now) is True
+        assert generator.verify(accounts[1], expected[0], for_time=now) is False
+
+        # 同じパラメータのアカウントはエンジンを共有
+        assert generator._get_engine(60, "sha256", "8") is generator._get_engine(
+            60, "SHA256", 8
+        )
+
+    def test_get_secret_info_parameters(self):
+        """TC-OTP-021: セキュリティコード情報にパラメータを反映"""
+        generator = OTPGenerator()
+
+        assert generator.get_secret_info("JBSWY3DPEHPK3PXP")["algorithm"] == "SHA1"
+        info = generator.get_secret_info(
+            "JBSWY3DPEHPK3PXP", "sha256", "8", "60", "GitHub"
+        )
+        assert info == {
+            "valid": True,
+            "algorithm": "SHA256",
+            "digits": 8,
+            "period": 60,
+            "issuer": "GitHub",
+        }
+        assert generator.get_secret_info("JBSWY3DPEHPK3PXP", digits=4)["valid"] is False
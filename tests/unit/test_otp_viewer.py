@@ -0,0 +1,114 @@
+"""
+otp_viewer.pyのテスト
+"""
+
+import curses
+import pyotp
+from unittest.mock import MagicMock, patch
+from src.otp_generator import OTPGenerator
+from src.otp_viewer import OTPViewer
+
+
+def _accounts(count):
+    """テスト用アカウント"""
+    return [
+        {
+            "id": f"id-{i:05d}",
+            "account_name": f"user{i}@example.com",
+            "issuer": "GitHub" if i % 2 else "Google",
+            "secret": "JBSWY3DPEHPK3PXP",
+        }
+        for i in range(count)
+    ]
+
+
+class TestOTPViewer:
+    """OTPViewerクラスのテスト"""
+
+    def test_only_visible_rows_generated(self):
+        """TC-VIEW-001: 表示範囲のアカウントのみOTPを生成"""
+        generator = OTPGenerator()
+        viewer = OTPViewer(generator, _accounts(3000))
+
+        with patch.object(
+            generator, "generate_otp", wraps=generator.generate_otp
+        ) as mock_generate:
+            rows = viewer.build_rows(20, 120, for_time=1640995215.0)
+
+        assert len(rows) == 20
+        assert mock_generate.call_count == 20
+        assert pyotp.TOTP("JBSWY3DPEHPK3PXP").at(1640995215) in rows[0]
+        assert "user0@example.com" in rows[0]
+
+    def test_incremental_filter(self):
+        """TC-VIEW-002: インクリメンタルな絞り込み"""
+        viewer = OTPViewer(OTPGenerator(), _accounts(100))
+
+        viewer.set_filter("git")
+        assert viewer.match_count == 50
+
+        # 文字を追加した場合は前回の一致結果のみを再検査
+        viewer._search_keys[0] = "github"
+        viewer.set_filter("GitHub")
+        assert viewer.match_count == 50
+        viewer._search_keys[0] = "user0@example.com\0google"
+
+        viewer.set_filter("user1@")
+        assert viewer.match_count == 1
+        viewer.set_filter("user1")
+        assert viewer.match_count == 11
+        viewer.set_filter("")
+        assert viewer.match_count == 100
+
+    def test_scroll(self):
+        """TC-VIEW-003: 選択位置の移動とスクロール"""
+        viewer = OTPViewer(OTPGenerator(), _accounts(100))
+
+        viewer.move(25, page_size=10)
+        assert viewer.selected == 25
+        assert viewer.top == 16
+        assert viewer.visible_accounts(10)[-1]["id"] == "id-00025"
+
+        viewer.move(-100, page_size=10)
+        assert (viewer.selected, viewer.top) == (0, 0)
+
+        viewer.move(1000, page_size=10)
+        assert viewer.selected == 99
+
+    def test_handle_key(self):
+        """TC-VIEW-004: キー入力の処理"""
+        viewer = OTPViewer(OTPGenerator(), _accounts(10))
+
+        assert viewer.handle_key("u", 5) is True
+        assert viewer.handle_key("s", 5) is True
+        assert viewer.filter_text == "us"
+        viewer.handle_key(curses.KEY_BACKSPACE, 5)
+        assert viewer.filter_text == "u"
+        viewer.handle_key(curses.KEY_NPAGE, 5)
+        assert viewer.selected == 5
+
+        # Escは絞り込み解除、絞り込みがなければ終了
+        assert viewer.handle_key("\x1b", 5) is True
+        assert viewer.filter_text == ""
+        assert viewer.handle_key("\x1b", 5) is False
+
+    def test_run_loop(self):
+        """TC-VIEW-005: メインループは画面の高さ分だけ描画して終了"""
+        generator = OTPGenerator()
+        viewer = OTPViewer(generator, _accounts(3000))
+        stdscr = MagicMock()
+        stdscr.getmaxyx.return_value = (24, 80)
+        stdscr.get_wch.side_effect = [curses.error(), "9", "\x1b", "\x1b"]
+
+        with (
+            patch("src.otp_viewer.curses.curs_set"),
+            patch.object(
+                generator, "generate_otp", wraps=generator.generate_otp
+            ) as mock_generate,
+        ):
+            viewer.run(stdscr)
+
+        assert viewer.running is False
+        # 4フレーム分（21行 x 3 + 絞り込み時の一致件数）のみ生成
+        assert mock_generate.call_count == 21 * 3 + 21
+        assert stdscr.refresh.call_count == 4
@@ -0,0 +1,144 @@
+"""
+qr_detector.pyのテスト
+"""
+
+import cv2
+import numpy as np
+import pytest
+from unittest.mock import patch
+from src.qr_detector import MotionGate, StagedQRDetector
+
+PAYLOAD = "otpauth-migration://offline?data=CjEKCkhlbGxvId6tvu8SGHRlc3Q"
+
+
+def make_frame(with_qr: bool = True) -> np.ndarray:
+    """640x480のテスト用フレームを作成（中央にQRコード）"""
+    frame = np.full((480, 640, 3), 110, dtype=np.uint8)
+    if with_qr:
+        qr = cv2.QRCodeEncoder.create().encode(PAYLOAD)
+        qr = cv2.resize(qr, (240, 240), interpolation=cv2.INTER_NEAREST)
+        qr = cv2.copyMakeBorder(qr, 16, 16, 16, 16, cv2.BORDER_CONSTANT, value=255)
+        frame[104:376, 184:456] = qr[:, :, None]
+    return frame
+
+
+class TestStagedQRDetector:
+    """StagedQRDetectorクラスのテスト"""
+
+    def test_detect_and_decode(self):
+        """TC-QRD-001: 縮小画像で検出し、元の解像度の領域をデコード"""
+        detector = StagedQRDetector()
+
+        data, points = detector.detect_and_decode(make_frame())
+
+        assert data == PAYLOAD
+        # 座標は元の解像度に戻されている
+        assert points.shape == (4, 2)
+        assert points[:, 0].min() >= 184 and points[:, 0].max() <= 456
+        assert points[:, 1].min() >= 104 and points[:, 1].max() <= 376
+
+    def test_no_candidate_skips_decode(self):
+        """TC-QRD-002: 候補がないフレームはデコードしない"""
+        detector = StagedQRDetector()
+
+        with patch.object(detector, "rectify") as mock_rectify:
+            data, points = detector.detect_and_decode(make_frame(with_qr=False))
+
+        assert data == ""
+        assert points is None
+        mock_rectify.assert_not_called()
+
+    def test_grayscale_frame(self):
+        """TC-QRD-003: グレースケールのフレーム"""
+        detector = StagedQRDetector()
+        gray = cv2.cvtColor(make_frame(), cv2.COLOR_BGR2GRAY)
+
+        data, _ = detector.detect_and_decode(gray)
+
+        assert data == PAYLOAD
+
+    def test_rectify(self):
+        """TC-QRD-004: 領域の切り出しと正面化"""
+        detector = StagedQRDetector(roi_margin=0.1)
+        points = np.array(
+            [[200, 120], [440, 120], [440, 360], [200, 360]], dtype=np.float32
+        )
+
+        roi, corners = detector.rectify(make_frame(), points)
+
+        assert roi.ndim == 2
+        assert roi.shape == (288, 288)
+        assert corners[0].tolist() == [24, 24]
+        assert corners[2].tolist() == [264, 264]
+
+    def test_without_aruco_detector(self):
+        """TC-QRD-008: ArUcoベースの検出器がない場合は通常の検出器で候補を検出"""
+        with patch.object(cv2, "QRCodeDetectorAruco", None):
+            detector = StagedQRDetector()
+
+        assert detector.candidate_detector is detector.detector
+        assert detector.detect_and_decode(make_frame())[0] == PAYLOAD
+
+    def test_detect_and_decode_multi(self):
+        """TC-QRD-009: 1フレーム内の複数のQRコード"""
+        frame = np.full((480, 640, 3), 110, dtype=np.uint8)
+        payloads = [PAYLOAD + "A", PAYLOAD + "B"]
+        for payload, left in zip(payloads, (40, 340)):
+            qr = cv2.QRCodeEncoder.create().encode(payload)
+            qr = cv2.resize(qr, (220, 220), interpolation=cv2.INTER_NEAREST)
+            qr = cv2.copyMakeBorder(qr, 14, 14, 14, 14, cv2.BORDER_CONSTANT, value=255)
+            frame[120:368, left : left + 248] = qr[:, :, None]
+        detector = StagedQRDetector()
+
+        data, points = detector.detect_and_decode_multi(frame)
+
+        assert sorted(data) == payloads
+        assert len(points) == 2
+        assert detector.detect_and_decode_multi(make_frame(with_qr=False)) == ([], [])
+
+
+class TestMotionGate:
+    """MotionGateクラスのテスト"""
+
+    def test_skip_static_frames(self):
+        """TC-QRD-005: 変化のないフレームはスキップし、変化したフレームは処理"""
+        gate = MotionGate()
+        still = make_frame(with_qr=False)
+
+        assert gate.should_process(still) is True
+        assert gate.should_process(still.copy()) is False
+        assert gate.should_process(make_frame()) is True
+        assert gate.should_process(make_frame()) is False
+
+    def test_grayscale_frames(self):
+        """TC-QRD-010: グレースケールのフレームでも変化したフレームは処理"""
+        gate = MotionGate()
+        still = cv2.cvtColor(make_frame(with_qr=False), cv2.COLOR_BGR2GRAY)
+        changed = cv2.cvtColor(make_frame(), cv2.COLOR_BGR2GRAY)
+
+        assert gate.should_process(still) is True
+        assert gate.should_process(still.copy()) is False
+        assert gate.should_process(changed) is True
+        assert gate.should_process(changed.copy()) is False
+        assert gate.should_process(still) is True
+        assert gate.should_process(changed) is True
+
+    @pytest.mark.parametrize("max_skip", [1, 3])
+    def test_max_skip(self, max_skip):
+        """TC-QRD-006: 静止していても max_skip フレームごとに処理"""
+        gate = MotionGate(max_skip=max_skip)
+        still = make_frame(with_qr=False)
+
+        results = [gate.should_process(still) for _ in range(2 * (max_skip + 1))]
+
+        assert results == ([True] + [False] * max_skip) * 2
+
+    def test_reset(self):
+        """TC-QRD-007: リセット後と解像度変更後の最初のフレームは処理"""
+        gate = MotionGate()
+        still = make_frame(with_qr=False)
+        gate.should_process(still)
+
+        gate.reset()
+        assert gate.should_process(still) is True
+        assert gate.should_process(np.full((360, 640, 3), 110, np.uint8)) is True
@@ -0,0 +1,53 @@
+"""
+refresh_scheduler.pyのテスト
+"""
+
+from src.refresh_scheduler import RefreshScheduler
+
+
+class TestRefreshScheduler:
+    """RefreshSchedulerクラスのテスト"""
+
+    def test_next_boundary(self):
+        """TC-SCHED-001: 次の周期境界の計算"""
+        assert RefreshScheduler.next_boundary(1640995200.0, 30) == 1640995230.0
+        assert RefreshScheduler.next_boundary(1640995229.9, 30) == 1640995230.0
+        assert RefreshScheduler.next_boundary(1640995215.0, 60) == 1640995260.0
+
+    def test_wakes_at_period_boundary(self):
+        """TC-SCHED-002: 周期境界とカウントダウンのタイマー"""
+        scheduler = RefreshScheduler([30, 30, 60], tick_interval=1.0, now=1000.5)
+
+        # 初回はカウントダウン表示のみ
+        assert scheduler.pop_due(1000.5) == ([], True)
+        assert scheduler.next_deadline() == 1001.0
+
+        assert scheduler.pop_due(1001.0) == ([], True)
+        assert scheduler.pop_due(1001.5) == ([], False)
+
+        # 1020秒は30秒・60秒周期の両方の境界
+        rolled, ticked = scheduler.pop_due(1020.0)
+        assert sorted(rolled) == [30, 60]
+        assert ticked is True
+
+        assert scheduler.pop_due(1050.0) == ([30], True)
+
+    def test_late_wakeup_coalesced(self):
+        """TC-SCHED-003: 遅れて起床した場合は1回の更新にまとめる"""
+        scheduler = RefreshScheduler([30], tick_interval=1.0, now=1000.0)
+        scheduler.pop_due(1000.0)
+
+        rolled, ticked = scheduler.pop_due(1075.3)
+
+        assert rolled == [30]
+        assert ticked is True
+        assert scheduler.next_deadline() == 1076.0
+        assert scheduler.pop_due(1076.0) == ([], True)
+        assert scheduler.pop_due(1080.0) == ([30], True)
+
+    def test_no_periods(self):
+        """TC-SCHED-004: 周期なしでもカウントダウンは動作"""
+        scheduler = RefreshScheduler([], tick_interval=2.0, now=10.0)
+
+        assert scheduler.pop_due(10.0) == ([], True)
+        assert scheduler.next_deadline() == 12.0
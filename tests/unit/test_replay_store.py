@@ -0,0 +1,112 @@
+"""
+replay_store.pyのテスト
+"""
+
+import os
+import tempfile
+import pytest
+from src.replay_store import ReplayStore
+
+
+class TestReplayStore:
+    """ReplayStoreクラスのテスト"""
+
+    @pytest.fixture
+    def persist_file(self):
+        """一時永続化ファイル"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            yield os.path.join(temp_dir, "replay.log")
+
+    def test_reject_replay(self):
+        """TC-REPLAY-001: 同じ (アカウント, カウンタ) は一度だけ受理"""
+        store = ReplayStore()
+
+        assert store.check_and_add("acc", 100, 3060.0, now=3000.0) is True
+        assert store.check_and_add("acc", 100, 3060.0, now=3010.0) is False
+        assert store.check_and_add("acc", 101, 3090.0, now=3010.0) is True
+        assert store.check_and_add("other", 100, 3060.0, now=3010.0) is True
+        assert ("acc", 100) in store
+        assert len(store) == 3
+
+    def test_ttl_eviction(self):
+        """TC-REPLAY-002: 期限切れの記録は自動で破棄"""
+        store = ReplayStore()
+        store.check_and_add("acc", 100, 3060.0, now=3000.0)
+        store.check_and_add("acc", 101, 3090.0, now=3000.0)
+
+        assert store.evict_expired(now=3060.0) == 1
+        assert ("acc", 100) not in store
+        assert len(store) == 1
+
+        # 追加時にも期限切れを破棄
+        store.check_and_add("acc", 200, 9000.0, now=3100.0)
+        assert len(store) == 1
+        assert store.metrics()["expired"] == 2
+
+        # 既に期限切れのコードは記録しない
+        assert store.check_and_add("acc", 1, 10.0, now=3100.0) is True
+        assert len(store) == 1
+
+    def test_memory_bound(self):
+        """TC-REPLAY-003: 上限を超えた場合は期限の近いものから破棄"""
+        store = ReplayStore(max_entries=3)
+
+        for counter in range(5):
+            store.check_and_add("acc", counter, 4000.0 + counter, now=3000.0)
+
+        assert len(store) == 3
+        assert ("acc", 0) not in store
+        assert ("acc", 1) not in store
+        assert ("acc", 4) in store
+        assert store.metrics()["evicted"] == 2
+
+    def test_metrics(self):
+        """TC-REPLAY-004: メトリクス"""
+        store = ReplayStore(max_entries=10)
+        store.check_and_add("acc", 1, 3060.0, now=3000.0)
+        store.check_and_add("acc", 1, 3060.0, now=3000.0)
+        store.evict_expired(now=4000.0)
+
+        metrics = store.metrics()
+        assert metrics["size"] == 0
+        assert metrics["max_entries"] == 10
+        assert metrics["added"] == 1
+        assert metrics["rejected"] == 1
+        assert metrics["expired"] == 1
+        assert metrics["eviction_rate"] > 0
+
+        store.reset_metrics()
+        assert store.metrics()["added"] == 0
+
+    def test_persistence(self, persist_file):
+        """TC-REPLAY-005: 再起動後も期限内の記録を保持"""
+        store = ReplayStore(persist_file=persist_file)
+        store.check_and_add("acc", 1, 9.0e12)
+        store.check_and_add("acc", 2, 9.0e12)
+        store.check_and_add("old", 1, 1.0, now=0.0)
+        store.close()
+
+        # 書き込み途中で中断された行は無視
+        with open(persist_file, "a", encoding="utf-8") as f:
+            f.write('["acc",3,')
+
+        reopened = ReplayStore(persist_file=persist_file)
+        assert reopened.check_and_add("acc", 1, 9.0e12) is False
+        assert reopened.check_and_add("acc", 3, 9.0e12) is True
+        assert ("old", 1) not in reopened
+        assert os.stat(persist_file).st_mode & 0o777 == 0o600
+        reopened.close()
+
+    def test_persistence_compaction(self, persist_file):
+        """TC-REPLAY-006: 永続化ファイルは期限内の記録のみに書き直される"""
+        store = ReplayStore(persist_file=persist_file)
+        store.COMPACT_MIN_LINES = 10
+
+        for counter in range(50):
+            store.check_and_add("acc", counter, 3001.0 + counter, now=3000.0 + counter)
+
+        with open(persist_file, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+        assert len(lines) <= 10 + 1
+        assert len(store) == 1
+        store.close()
@@ -3,9 +3,13 @@ SecurityManagerクラスのテスト
 """
 
 import pytest
+import json
 import os
 import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from unittest.mock import patch, Mock
+from src.account_storage import JournalStorage, SQLiteStorage
+from src.crypto_utils import CryptoUtils
 from src.security_manager import SecurityManager
 
 
@@ -299,7 +303,12 @@ class TestSecurityManager:
     def test_file_access_permission_error(self, security_manager):
         """TC-SM-022: ファイルアクセス権限エラー"""
         # 読み取り専用ディレクトリでのテスト（権限エラーのシミュレーション）
-        with patch("builtins.open", side_effect=PermissionError("Permission denied")):
+        # ジャーナルはos.openで作成するため、両方を権限エラーにする
+        error = PermissionError("Permission denied")
+        with (
+            patch("builtins.open", side_effect=error),
+            patch("os.open", side_effect=error),
+        ):
             with pytest.raises(Exception):
                 security_manager.add_account(
                     "Device", "user@example.com", "Service", "SECRET"
@@ -346,3 +355,660 @@ class TestSecurityManager:
         results = security_manager.search_accounts("Device50")
         assert len(results) == 1
         assert results[0]["device_name"] == "Device50"
+
+    def test_update_account_reuses_ciphertext(self, security_manager):
+        """TC-SM-026: セキュリティコード以外の更新では再暗号化しない"""
+        account_id = security_manager.add_account(
+            "Device1", "user1@example.com", "Service1", "JBSWY3DPEHPK3PXP"
+        )
+        original = security_manager.accounts[0]["encrypted_secret"]
+
+        with patch.object(security_manager.crypto, "encrypt") as mock_encrypt:
+            assert security_manager.update_account(account_id, issuer="Updated")
+            mock_encrypt.assert_not_called()
+
+        assert security_manager.accounts[0]["encrypted_secret"] == original
+        account = security_manager.get_account(account_id)
+        assert account["issuer"] == "Updated"
+        assert account["secret"] == "JBSWY3DPEHPK3PXP"
+
+    def test_update_account_secret_reencrypts(self, security_manager):
+        """TC-SM-027: セキュリティコード更新時は再暗号化"""
+        account_id = security_manager.add_account(
+            "Device1", "user1@example.com", "Service1", "JBSWY3DPEHPK3PXP"
+        )
+        original = security_manager.accounts[0]["encrypted_secret"]
+
+        assert security_manager.update_account(account_id, secret="GEZDGNBVGY3TQOJQ")
+
+        assert security_manager.accounts[0]["encrypted_secret"] != original
+        assert security_manager.get_account(account_id)["secret"] == "GEZDGNBVGY3TQOJQ"
+
+    def _write_legacy_vault(self, data_file, password, count):
+        """旧形式（レコードごとのソルト）のデータファイルを作成"""
+        legacy_crypto = CryptoUtils(password)
+        accounts = []
+        for i in range(count):
+            accounts.append(
+                {
+                    "id": f"legacy-{i}",
+                    "device_name": f"Device{i}",
+                    "account_name": f"user{i}@example.com",
+                    "issuer": f"Service{i}",
+                    "encrypted_secret": legacy_crypto.encrypt(f"SECRET{i}"),
+                    "created_at": "2025-01-26T10:00:00",
+                    "updated_at": "2025-01-26T10:00:00",
+                }
+            )
+        with open(data_file, "w", encoding="utf-8") as f:
+            json.dump({"accounts": accounts}, f)
+
+    def test_vault_format_v2_saved(self, security_manager):
+        """TC-SM-028: ボールト形式v2での保存"""
+        security_manager.add_account(
+            "Device1", "user1@example.com", "Service1", "JBSWY3DPEHPK3PXP"
+        )
+        # 追加はジャーナルに記録されるため、スナップショットに統合してから確認
+        security_manager.compact()
+
+        with open(security_manager.data_file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        assert data["version"] == SecurityManager.FORMAT_VERSION
+        assert "wrapped_key" in data["vault"]
+        assert data["accounts"][0]["encrypted_secret"].startswith(
+            CryptoUtils.RECORD_PREFIX
+        )
+
+    def test_migrate_legacy_records(self, temp_data_dir):
+        """TC-SM-029: 旧形式データの自動移行"""
+        data_file = os.path.join(temp_data_dir, "legacy_accounts.json")
+        self._write_legacy_vault(data_file, "test_password_for_unit_tests", 3)
+
+        manager = SecurityManager(
+            data_file=data_file, password="test_password_for_unit_tests"
+        )
+        secrets = [account["secret"] for account in manager.get_all_accounts()]
+
+        assert secrets == ["SECRET0", "SECRET1", "SECRET2"]
+        for account in manager.accounts:
+            assert not CryptoUtils.is_legacy_ciphertext(account["encrypted_secret"])
+
+        # 再読み込み時はボールトのキー導出のみ
+        with patch.object(
+            CryptoUtils, "_derive_raw_key", wraps=manager.crypto._derive_raw_key
+        ) as mock_derive:
+            reloaded = SecurityManager(
+                data_file=data_file, password="test_password_for_unit_tests"
+            )
+            assert len(reloaded.get_all_accounts()) == 3
+            assert mock_derive.call_count == 1
+
+    def test_migrate_legacy_records_resumable(self, temp_data_dir):
+        """TC-SM-030: 中断された移行の再開"""
+        data_file = os.path.join(temp_data_dir, "legacy_accounts.json")
+        self._write_legacy_vault(data_file, "test_password_for_unit_tests", 4)
+
+        original_encrypt = CryptoUtils.encrypt
+        calls = []
+
+        def failing_encrypt(crypto, data):
+            calls.append(data)
+            if len(calls) == 3:
+                raise Exception("interrupted")
+            return original_encrypt(crypto, data)
+
+        with patch.object(SecurityManager, "MIGRATION_BATCH_SIZE", 1):
+            with patch.object(CryptoUtils, "encrypt", failing_encrypt):
+                manager = SecurityManager(
+                    data_file=data_file, password="test_password_for_unit_tests"
+                )
+                with pytest.raises(Exception):
+                    manager.get_all_accounts()
+
+        # 移行済みのバッチはジャーナルに記録されている
+        partial = JournalStorage(data_file).load()
+        legacy_flags = [
+            CryptoUtils.is_legacy_ciphertext(account["encrypted_secret"])
+            for account in partial["accounts"]
+        ]
+        assert legacy_flags == [False, False, True, True]
+
+        manager = SecurityManager(
+            data_file=data_file, password="test_password_for_unit_tests"
+        )
+        secrets = [account["secret"] for account in manager.get_all_accounts()]
+        assert secrets == ["SECRET0", "SECRET1", "SECRET2", "SECRET3"]
+
+    def test_wrong_password_rejected(self, security_manager):
+        """TC-SM-031: 誤ったパスワードでのボールト解錠失敗"""
+        security_manager.add_account(
+            "Device1", "user1@example.com", "Service1", "JBSWY3DPEHPK3PXP"
+        )
+
+        manager = SecurityManager(
+            data_file=security_manager.data_file, password="wrong"
+        )
+        with pytest.raises(Exception):
+            manager.get_all_accounts()
+
+        # ボールトを開けない場合もデータファイルは変更されない
+        assert len(manager.list_accounts()) == 1
+
+    def test_wrong_password_on_legacy_vault(self, temp_data_dir):
+        """TC-SM-052: 旧形式データを誤ったパスワードで開いてもボールトを作成しない"""
+        data_file = os.path.join(temp_data_dir, "legacy_accounts.json")
+        self._write_legacy_vault(data_file, "test_password_for_unit_tests", 3)
+
+        manager = SecurityManager(data_file=data_file, password="wrong")
+        with patch.object(
+            CryptoUtils,
+            "_derive_raw_key",
+            autospec=True,
+            side_effect=CryptoUtils._derive_raw_key,
+        ) as mock_derive:
+            with pytest.raises(Exception, match="ボールトを開けませんでした"):
+                manager.get_all_accounts()
+        # 全件ではなく、新しいボールトと先頭の旧形式レコード1件のキー導出のみ
+        assert mock_derive.call_count == 2
+
+        # ボールトヘッダーは保存されず、旧形式レコードもそのまま残る
+        data = JournalStorage(data_file).load()
+        assert data.get("vault") is None
+        assert all(
+            CryptoUtils.is_legacy_ciphertext(account["encrypted_secret"])
+            for account in data["accounts"]
+        )
+
+        manager = SecurityManager(
+            data_file=data_file, password="test_password_for_unit_tests"
+        )
+        secrets = [account["secret"] for account in manager.get_all_accounts()]
+        assert secrets == ["SECRET0", "SECRET1", "SECRET2"]
+
+    def test_parallel_decrypt_preserves_order(self, temp_data_dir):
+        """TC-SM-032: 並列復号化（結果の順序を保持）"""
+        data_file = os.path.join(temp_data_dir, "parallel_accounts.json")
+        manager = SecurityManager(
+            data_file=data_file,
+            password="test_password_for_unit_tests",
+            decrypt_workers=2,
+            decrypt_chunk_size=3,
+        )
+        legacy_crypto = CryptoUtils("test_password_for_unit_tests")
+        encrypted = [legacy_crypto.encrypt(f"SECRET{i}") for i in range(10)]
+        encrypted.insert(5, manager.crypto.encrypt("V2SECRET"))
+        encrypted.append("broken")
+
+        results = manager._decrypt_secrets(encrypted)
+
+        secrets = [secret for secret, _ in results]
+        expected = [f"SECRET{i}" for i in range(10)]
+        expected.insert(5, "V2SECRET")
+        assert secrets[:-1] == expected
+        assert results[-1][0] is None
+        assert results[-1][1] is not None
+
+    def test_parallel_decrypt_migration(self, temp_data_dir):
+        """TC-SM-033: 並列復号化による旧形式データの移行"""
+        data_file = os.path.join(temp_data_dir, "legacy_accounts.json")
+        self._write_legacy_vault(data_file, "test_password_for_unit_tests", 10)
+
+        with patch(
+            "src.security_manager.ProcessPoolExecutor",
+            wraps=ProcessPoolExecutor,
+        ) as mock_executor:
+            manager = SecurityManager(
+                data_file=data_file,
+                password="test_password_for_unit_tests",
+                decrypt_workers=2,
+            )
+            secrets = [account["secret"] for account in manager.get_all_accounts()]
+            mock_executor.assert_called_once()
+
+        assert secrets == [f"SECRET{i}" for i in range(10)]
+
+    def test_sequential_decrypt_by_default(self, security_manager):
+        """TC-SM-034: 既定では逐次復号化"""
+        security_manager.add_account(
+            "Device1", "user1@example.com", "Service1", "JBSWY3DPEHPK3PXP"
+        )
+
+        with patch("src.security_manager.ProcessPoolExecutor") as mock_executor:
+            accounts = security_manager.get_all_accounts()
+            mock_executor.assert_not_called()
+
+        assert accounts[0]["secret"] == "JBSWY3DPEHPK3PXP"
+
+    def test_list_and_search_without_password(self, security_manager):
+        """TC-SM-035: 一覧・検索はパスワードなしで実行可能（キー導出なし）"""
+        security_manager.add_account(
+            "Device1", "user1@example.com", "GitHub", "JBSWY3DPEHPK3PXP"
+        )
+        security_manager.add_account(
+            "Device2", "user2@example.com", "Google", "GEZDGNBVGY3TQOJQ"
+        )
+
+        with patch(
+            "src.security_manager.CryptoUtils", side_effect=AssertionError
+        ) as mock_crypto:
+            manager = SecurityManager(data_file=security_manager.data_file)
+
+            accounts = manager.list_accounts()
+            results = manager.search_accounts("github")
+            count = manager.get_account_count()
+
+            mock_crypto.assert_not_called()
+
+        assert [account["account_name"] for account in accounts] == [
+            "user1@example.com",
+            "user2@example.com",
+        ]
+        assert len(results) == 1
+        assert results[0]["issuer"] == "GitHub"
+        assert "secret" not in results[0]
+        assert "encrypted_secret" not in results[0]
+        assert count == 2
+
+    def test_delete_account_without_password(self, security_manager):
+        """TC-SM-036: 削除はボールトを開かずに実行可能"""
+        account_id = security_manager.add_account(
+            "Device1", "user1@example.com", "Service1", "JBSWY3DPEHPK3PXP"
+        )
+
+        with patch("src.security_manager.CryptoUtils", side_effect=AssertionError):
+            manager = SecurityManager(data_file=security_manager.data_file)
+            assert manager.delete_account(account_id) is True
+
+        assert manager.get_account_count() == 0
+
+    def test_account_index_lookup(self, security_manager):
+        """TC-SM-037: 索引によるアカウント取得・更新・削除（登録順を保持）"""
+        account_ids = [
+            security_manager.add_account(
+                f"Device{i}", f"user{i}@example.com", "Service", "JBSWY3DPEHPK3PXP"
+            )
+            for i in range(5)
+        ]
+
+        assert security_manager.update_account(account_ids[2], account_name="new")
+        assert security_manager.delete_account(account_ids[1])
+
+        assert security_manager.get_account(account_ids[1]) is None
+        assert security_manager.get_account(account_ids[2])["account_name"] == "new"
+        assert [account["id"] for account in security_manager.list_accounts()] == [
+            account_ids[0],
+            account_ids[2],
+            account_ids[3],
+            account_ids[4],
+        ]
+        assert security_manager.update_account(account_ids[1], issuer="x") is False
+        assert security_manager.delete_account(account_ids[1]) is False
+
+    def test_resolve_account_id_by_prefix(self, security_manager):
+        """TC-SM-038: 一意なIDの先頭部分によるアカウント指定"""
+        with patch(
+            "src.security_manager.uuid.uuid4",
+            side_effect=["abc-111", "abd-222", "xyz-333"],
+        ):
+            for i in range(3):
+                security_manager.add_account(
+                    f"Device{i}", f"user{i}@example.com", "Service", "JBSWY3DPEHPK3PXP"
+                )
+
+        assert security_manager.resolve_account_id("abc-111") == "abc-111"
+        assert security_manager.resolve_account_id("abc") == "abc-111"
+        assert security_manager.resolve_account_id("x") == "xyz-333"
+        # 複数該当・該当なし・空文字列は特定できない
+        assert security_manager.resolve_account_id("ab") is None
+        assert security_manager.resolve_account_id("q") is None
+        assert security_manager.resolve_account_id("") is None
+        assert security_manager.find_account_ids("ab") == ["abc-111", "abd-222"]
+        assert security_manager.find_account_ids("ab", limit=1) == ["abc-111"]
+
+        assert (
+            security_manager.get_account("abd")["account_name"] == "user1@example.com"
+        )
+        assert security_manager.delete_account("abc") is True
+        # 削除後は残りのIDが一意になる
+        assert security_manager.resolve_account_id("ab") == "abd-222"
+
+        with patch("src.security_manager.uuid.uuid4", return_value="abe-444"):
+            security_manager.add_account(
+                "Device", "user@example.com", "Service", "JBSWY3DPEHPK3PXP"
+            )
+        assert security_manager.resolve_account_id("ab") is None
+
+    def test_account_index_rebuilt_on_restore(self, security_manager, temp_data_dir):
+        """TC-SM-039: 復元時に索引を再構築"""
+        account_id = security_manager.add_account(
+            "Device1", "user1@example.com", "Service1", "JBSWY3DPEHPK3PXP"
+        )
+        backup_file = os.path.join(temp_data_dir, "backup.json")
+        security_manager.backup_accounts(backup_file)
+
+        other_id = security_manager.add_account(
+            "Device2", "user2@example.com", "Service2", "JBSWY3DPEHPK3PXP"
+        )
+        security_manager.find_account_ids("")
+        assert security_manager.restore_accounts(backup_file) is True
+
+        assert security_manager.get_account(other_id) is None
+        assert security_manager.resolve_account_id(other_id[:8]) is None
+        assert security_manager.resolve_account_id(account_id[:8]) == account_id
+
+    def test_mutations_append_to_journal(self, security_manager):
+        """TC-SM-040: 変更はスナップショットを書き換えずジャーナルに追記"""
+        # 初回の追加時にボールトヘッダーがスナップショットに保存される
+        account_id = security_manager.add_account(
+            "Device1", "user1@example.com", "Service1", "JBSWY3DPEHPK3PXP"
+        )
+        with open(security_manager.data_file, "rb") as f:
+            snapshot = f.read()
+
+        other_id = security_manager.add_account(
+            "Device2", "user2@example.com", "Service2", "GEZDGNBVGY3TQOJQ"
+        )
+        security_manager.update_account(account_id, account_name="renamed")
+        security_manager.delete_account(other_id)
+
+        with open(security_manager.data_file, "rb") as f:
+            assert f.read() == snapshot
+        assert security_manager._storage.journal.journal_entries == 4
+
+        reloaded = SecurityManager(
+            data_file=security_manager.data_file,
+            password="test_password_for_unit_tests",
+        )
+        accounts = reloaded.get_all_accounts()
+        assert [account["account_name"] for account in accounts] == ["renamed"]
+        assert accounts[0]["secret"] == "JBSWY3DPEHPK3PXP"
+
+    def test_journal_compaction_threshold(self, security_manager):
+        """TC-SM-041: 閾値を超えるとスナップショットに統合"""
+        with patch.object(JournalStorage, "COMPACT_MIN_ENTRIES", 3):
+            for i in range(3):
+                security_manager.add_account(
+                    f"Device{i}", f"user{i}@example.com", "Service", "JBSWY3DPEHPK3PXP"
+                )
+            security_manager._storage.journal.wait_for_compaction()
+
+        assert security_manager._storage.journal.journal_entries == 0
+        with open(security_manager.data_file, "r", encoding="utf-8") as f:
+            assert len(json.load(f)["accounts"]) == 3
+
+    def test_backup_includes_journal(self, security_manager, temp_data_dir):
+        """TC-SM-042: バックアップ・復元とジャーナル"""
+        account_id = security_manager.add_account(
+            "Device1", "user1@example.com", "Service1", "JBSWY3DPEHPK3PXP"
+        )
+        backup_file = os.path.join(temp_data_dir, "backup.json")
+        assert security_manager.backup_accounts(backup_file) is True
+
+        with open(backup_file, "r", encoding="utf-8") as f:
+            assert [account["id"] for account in json.load(f)["accounts"]] == [
+                account_id
+            ]
+
+        security_manager.delete_account(account_id)
+        assert security_manager.restore_accounts(backup_file) is True
+
+        # 復元前のジャーナル（削除）は再適用されない
+        reloaded = SecurityManager(
+            data_file=security_manager.data_file,
+            password="test_password_for_unit_tests",
+        )
+        assert reloaded.get_account(account_id) is not None
+
+    def test_sqlite_backend(self, temp_data_dir):
+        """TC-SM-043: SQLiteストレージでの操作"""
+        data_file = os.path.join(temp_data_dir, "accounts.db")
+        manager = SecurityManager(
+            data_file=data_file, password="test_password_for_unit_tests"
+        )
+        assert isinstance(manager._storage, SQLiteStorage)
+
+        account_ids = [
+            manager.add_account(
+                f"Device{i}", f"user{i}@example.com", f"Service{i}", "JBSWY3DPEHPK3PXP"
+            )
+            for i in range(4)
+        ]
+        assert manager.update_account(account_ids[1], account_name="renamed")
+        assert manager.delete_account(account_ids[2])
+
+        reloaded = SecurityManager(
+            data_file=data_file, password="test_password_for_unit_tests"
+        )
+        assert reloaded.get_account_count() == 3
+        assert reloaded.get_account(account_ids[1][:12])["account_name"] == "renamed"
+        assert [account["id"] for account in reloaded.list_accounts(1, 1)] == [
+            account_ids[1]
+        ]
+        assert reloaded.search_accounts("service3")[0]["id"] == account_ids[3]
+        secrets = [account["secret"] for account in reloaded.get_all_accounts()]
+        assert secrets == ["JBSWY3DPEHPK3PXP"] * 3
+
+    def test_data_file_from_environment(self, temp_data_dir):
+        """TC-SM-044: 環境変数OTP_DATA_FILEによるデータファイルの指定"""
+        data_file = os.path.join(temp_data_dir, "env_accounts.sqlite3")
+
+        with patch.dict("os.environ", {"OTP_DATA_FILE": data_file}):
+            manager = SecurityManager(password="test_password_for_unit_tests")
+
+        assert manager.data_file == data_file
+        assert isinstance(manager._storage, SQLiteStorage)
+        assert os.path.exists(data_file)
+
+    def test_batch_single_write(self, security_manager):
+        """TC-SM-045: batch内の変更は1回の書き込みで保存"""
+        existing_id = security_manager.add_account(
+            "Device0", "user0@example.com", "Service0", "JBSWY3DPEHPK3PXP"
+        )
+
+        with patch.object(
+            security_manager._storage.journal,
+            "append",
+            wraps=security_manager._storage.journal.append,
+        ) as mock_append:
+            with security_manager.batch():
+                account_ids = [
+                    security_manager.add_account(
+                        f"Device{i}", f"user{i}@example.com", "Service", "SECRET"
+                    )
+                    for i in range(1, 4)
+                ]
+                security_manager.update_account(account_ids[0], issuer="Updated")
+                security_manager.delete_account(existing_id)
+                # ブロック内でも変更後の状態を参照できる
+                assert security_manager.get_account_count() == 3
+                mock_append.assert_not_called()
+
+            mock_append.assert_called_once()
+
+        reloaded = SecurityManager(
+            data_file=security_manager.data_file,
+            password="test_password_for_unit_tests",
+        )
+        accounts = reloaded.list_accounts()
+        assert [account["id"] for account in accounts] == account_ids
+        assert accounts[0]["issuer"] == "Updated"
+
+    def test_batch_rollback(self, security_manager):
+        """TC-SM-046: batch内で例外が発生した場合は全ての変更を破棄"""
+        account_id = security_manager.add_account(
+            "Device1", "user1@example.com", "Service1", "JBSWY3DPEHPK3PXP"
+        )
+
+        with pytest.raises(ValueError):
+            with security_manager.transaction():
+                security_manager.add_account(
+                    "Device2", "user2@example.com", "Service2", "SECRET"
+                )
+                security_manager.update_account(account_id, account_name="changed")
+                security_manager.delete_account(account_id)
+                raise ValueError("abort")
+
+        assert security_manager.get_account_count() == 1
+        assert security_manager.get_account(account_id)["account_name"] == (
+            "user1@example.com"
+        )
+
+        reloaded = SecurityManager(
+            data_file=security_manager.data_file,
+            password="test_password_for_unit_tests",
+        )
+        assert [account["id"] for account in reloaded.list_accounts()] == [account_id]
+
+    def test_bulk_operations(self, security_manager):
+        """TC-SM-047: add_many・update_many・delete_many"""
+        account_ids = security_manager.add_many(
+            [
+                {
+                    "device_name": f"Device{i}",
+                    "account_name": f"user{i}@example.com",
+                    "issuer": "Service",
+                    "secret": f"SECRET{i}",
+                }
+                for i in range(5)
+            ]
+        )
+        assert len(set(account_ids)) == 5
+
+        updated = security_manager.update_many(
+            {
+                account_ids[0]: {"issuer": "GitHub"},
+                account_ids[1]: {"secret": "NEWSECRET"},
+                "missing": {"issuer": "x"},
+            }
+        )
+        deleted = security_manager.delete_many([account_ids[3], account_ids[4], "x"])
+
+        assert updated == 2
+        assert deleted == 2
+        reloaded = SecurityManager(
+            data_file=security_manager.data_file,
+            password="test_password_for_unit_tests",
+        )
+        accounts = reloaded.get_all_accounts()
+        assert [account["id"] for account in accounts] == account_ids[:3]
+        assert accounts[0]["issuer"] == "GitHub"
+        assert accounts[1]["secret"] == "NEWSECRET"
+        assert accounts[2]["secret"] == "SECRET2"
+
+    def test_nested_batch(self, security_manager):
+        """TC-SM-048: 入れ子のbatchは最も外側でまとめて保存"""
+        with patch.object(
+            security_manager._storage, "commit", wraps=security_manager._storage.commit
+        ) as mock_commit:
+            with security_manager.batch():
+                security_manager.add_many(
+                    [
+                        {
+                            "device_name": "Device",
+                            "account_name": "user@example.com",
+                            "issuer": "Service",
+                            "secret": "SECRET",
+                        }
+                    ]
+                )
+                security_manager.delete_many(["missing"])
+                mock_commit.assert_not_called()
+
+            mock_commit.assert_called_once()
+        assert security_manager.get_account_count() == 1
+
+    def test_batch_sqlite(self, temp_data_dir):
+        """TC-SM-049: SQLiteストレージでのbatchとロールバック"""
+        data_file = os.path.join(temp_data_dir, "accounts.db")
+        manager = SecurityManager(
+            data_file=data_file, password="test_password_for_unit_tests"
+        )
+
+        with pytest.raises(ValueError):
+            with manager.batch():
+                manager.add_account("Device", "user@example.com", "Service", "SECRET")
+                raise ValueError("abort")
+
+        assert manager.get_account_count() == 0
+        # ロールバックで失われたボールトヘッダーは作成し直して保存される
+        account_id = manager.add_account(
+            "Device", "user@example.com", "Service", "SECRET"
+        )
+        reloaded = SecurityManager(
+            data_file=data_file, password="test_password_for_unit_tests"
+        )
+        assert reloaded.get_account(account_id)["secret"] == "SECRET"
+
+    def test_otp_parameters_stored(self, security_manager, temp_data_dir):
+        """TC-SM-050: アカウントごとのアルゴリズム・桁数・周期を保存"""
+        account_id = security_manager.add_account(
+            "Device",
+            "user@example.com",
+            "Service",
+            "JBSWY3DPEHPK3PXP",
+            algorithm="sha256",
+            digits="8",
+            period="60",
+        )
+        default_id = security_manager.add_account(
+            "Device", "other@example.com", "Service", "JBSWY3DPEHPK3PXP"
+        )
+        [many_id] = security_manager.add_many(
+            [
+                {
+                    "device_name": "Device",
+                    "account_name": "many@example.com",
+                    "issuer": "Service",
+                    "secret": "JBSWY3DPEHPK3PXP",
+                    "algorithm": "SHA512",
+                    "digits": 10,
+                    "period": 15,
+                }
+            ]
+        )
+
+        reloaded = SecurityManager(
+            data_file=os.path.join(temp_data_dir, "test_accounts.json"),
+            password="test_password_for_unit_tests",
+        )
+        account = reloaded.get_account(account_id)
+        assert (account["algorithm"], account["digits"], account["period"]) == (
+            "SHA256",
+            8,
+            60,
+        )
+        default = reloaded.get_account(default_id)
+        assert (default["algorithm"], default["digits"], default["period"]) == (
+            "SHA1",
+            6,
+            30,
+        )
+        many = reloaded.get_account(many_id)
+        assert (many["algorithm"], many["digits"], many["period"]) == ("SHA512", 10, 15)
+
+        with pytest.raises(ValueError):
+            security_manager.add_account(
+                "Device", "bad@example.com", "Service", "SECRET", algorithm="MD5"
+            )
+
+    def test_update_otp_parameters(self, security_manager):
+        """TC-SM-051: 旧アカウントへのOTP生成パラメータの設定"""
+        account_id = security_manager.add_account(
+            "Device", "user@example.com", "Service", "JBSWY3DPEHPK3PXP"
+        )
+        # パラメータを保存していない旧形式のレコードを再現
+        record = dict(security_manager._storage.get(account_id))
+        for field in ("algorithm", "digits", "period"):
+            record.pop(field)
+        security_manager._storage.put(record)
+
+        assert security_manager.update_account(account_id, period="60") is True
+
+        account = security_manager.get_account(account_id)
+        assert (account["algorithm"], account["digits"], account["period"]) == (
+            "SHA1",
+            6,
+            60,
+        )
+        assert account["secret"] == "JBSWY3DPEHPK3PXP"
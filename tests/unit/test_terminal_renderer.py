@@ -0,0 +1,103 @@
+"""
+terminal_renderer.pyのテスト
+"""
+
+import io
+from unittest.mock import patch
+from src.terminal_renderer import TerminalRenderer
+
+
+class FakeTTY(io.StringIO):
+    """TTYとして振る舞う出力先"""
+
+    def isatty(self):
+        return True
+
+
+class TestTerminalRenderer:
+    """TerminalRendererクラスのテスト"""
+
+    def test_first_frame_clears_screen(self):
+        """TC-RENDER-001: 初回フレームは画面をクリアして全行を描画"""
+        stream = FakeTTY()
+        renderer = TerminalRenderer(stream)
+
+        with patch.dict("os.environ", {"TERM": "xterm"}):
+            renderer.render(["a", "b"])
+
+        assert stream.getvalue() == (
+            "\x1b[2J\x1b[H" "\x1b[1;1Ha\x1b[K" "\x1b[2;1Hb\x1b[K" "\x1b[3;1H"
+        )
+
+    def test_only_changed_lines_redrawn(self):
+        """TC-RENDER-002: 変化した行のみ書き換え"""
+        stream = FakeTTY()
+        renderer = TerminalRenderer(stream)
+
+        with patch.dict("os.environ", {"TERM": "xterm"}):
+            renderer.render(["header", "OTP: 123456", "残り: 5秒"])
+            stream.seek(0)
+            stream.truncate()
+
+            renderer.render(["header", "OTP: 123456", "残り: 4秒"])
+            assert stream.getvalue() == "\x1b[3;1H残り: 4秒\x1b[K\x1b[4;1H"
+
+            stream.seek(0)
+            stream.truncate()
+            renderer.render(["header", "OTP: 123456", "残り: 4秒"])
+            assert stream.getvalue() == ""
+
+    def test_shorter_frame_clears_below(self):
+        """TC-RENDER-003: 行数が減った場合は残りを消去"""
+        stream = FakeTTY()
+        renderer = TerminalRenderer(stream)
+
+        with patch.dict("os.environ", {"TERM": "xterm"}):
+            renderer.render(["a", "b", "c"])
+            stream.seek(0)
+            stream.truncate()
+            renderer.render(["a"])
+
+        assert stream.getvalue() == "\x1b[2;1H\x1b[J\x1b[2;1H"
+
+    def test_single_write_per_frame(self):
+        """TC-RENDER-004: 1フレームにつき1回のwrite"""
+        stream = FakeTTY()
+        renderer = TerminalRenderer(stream)
+
+        with (
+            patch.dict("os.environ", {"TERM": "xterm"}),
+            patch.object(stream, "write", wraps=stream.write) as mock_write,
+        ):
+            renderer.render([f"line {i}" for i in range(100)])
+
+        assert mock_write.call_count == 1
+
+    def test_non_tty_fallback(self):
+        """TC-RENDER-005: 非TTYではエスケープシーケンスを使わない"""
+        stream = io.StringIO()
+        renderer = TerminalRenderer(stream)
+
+        renderer.render(["a", "b"])
+        renderer.render(["a", "b"])
+        renderer.render(["a", "c"])
+
+        assert stream.getvalue() == "a\nb\na\nc\n"
+        assert "\x1b" not in stream.getvalue()
+
+    def test_dumb_terminal_and_reset(self):
+        """TC-RENDER-006: TERM=dumbは非TTY扱い、resetで全体を再描画"""
+        stream = FakeTTY()
+        renderer = TerminalRenderer(stream)
+
+        with patch.dict("os.environ", {"TERM": "dumb"}):
+            assert renderer.is_tty is False
+
+        with patch.dict("os.environ", {"TERM": "xterm"}):
+            renderer.render(["a"])
+            renderer.reset()
+            stream.seek(0)
+            stream.truncate()
+            renderer.render(["a"])
+
+        assert stream.getvalue().startswith("\x1b[2J\x1b[H")
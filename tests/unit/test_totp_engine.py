@@ -0,0 +1,244 @@
+"""
+totp_engine.pyのテスト
+"""
+
+import pytest
+import base64
+import hashlib
+import pyotp
+from unittest.mock import patch
+from src.totp_engine import (
+    TOTPEngine,
+    account_otp_parameters,
+    normalize_otp_parameters,
+)
+
+
+class TestTOTPEngine:
+    """TOTPEngineクラスのテスト"""
+
+    SECRETS = [
+        "JBSWY3DPEHPK3PXP",
+        "jbswy3dpehpk3pxp",
+        "GEZDGNBVGY3TQOJQGEZDGNBVGY3TQOJQ",
+        "MFRGGZDFMZTWQ2LK",
+        "MZXW6",
+        "A" * 128,
+        "",
+    ]
+
+    def test_matches_pyotp(self):
+        """TC-TOTP-001: pyotpとビット単位で同一の結果"""
+        engine = TOTPEngine()
+        times = [0, 59, 1111111109, 1234567890, 2000000000, 20000000000]
+
+        for secret in self.SECRETS:
+            for counter in range(0, 2000, 37):
+                assert engine.generate_at(secret, counter) == pyotp.TOTP(secret).at(
+                    counter * 30
+                )
+            for for_time in times:
+                assert engine.generate(secret, for_time) == pyotp.TOTP(secret).at(
+                    for_time
+                )
+
+    def test_digits_and_digest(self):
+        """TC-TOTP-002: 桁数・ハッシュ関数の指定"""
+        for digits, digest in [(8, hashlib.sha256), (10, hashlib.sha512)]:
+            engine = TOTPEngine(digits=digits, period=60, digest=digest)
+            totp = pyotp.TOTP(
+                "JBSWY3DPEHPK3PXP", digits=digits, digest=digest, interval=60
+            )
+            for for_time in range(0, 100000, 997):
+                assert engine.generate("JBSWY3DPEHPK3PXP", for_time) == totp.at(
+                    for_time
+                )
+
+        with pytest.raises(ValueError):
+            TOTPEngine(digits=11)
+
+    def test_rfc6238_vector(self):
+        """TC-TOTP-003: RFC 6238のテストベクタ"""
+        engine = TOTPEngine(digits=8)
+        secret = "GEZDGNBVGY3TQOJQGEZDGNBVGY3TQOJQ"  # "12345678901234567890"
+
+        assert engine.generate(secret, 59) == "94287082"
+        assert engine.generate(secret, 1111111109) == "07081804"
+        assert engine.generate(secret, 20000000000) == "65353130"
+
+    def test_secret_decoded_once(self):
+        """TC-TOTP-004: シークレットのデコードは一度だけ"""
+        engine = TOTPEngine()
+
+        with patch.object(
+            TOTPEngine, "decode_secret", wraps=TOTPEngine.decode_secret
+        ) as mock_decode:
+            for counter in range(100):
+                engine.generate_at("JBSWY3DPEHPK3PXP", counter)
+
+        assert mock_decode.call_count == 1
+
+    def test_cache_size_bound(self):
+        """TC-TOTP-005: キャッシュ件数の上限"""
+        engine = TOTPEngine(cache_size=2)
+
+        engine.generate_at("AAAAAAAA", 1)
+        engine.generate_at("BBBBBBBB", 1)
+        engine.generate_at("AAAAAAAA", 1)
+        engine.generate_at("CCCCCCCC", 1)
+
+        assert list(engine._cache) == ["AAAAAAAA", "CCCCCCCC"]
+
+        engine.clear_cache()
+        assert len(engine._cache) == 0
+
+    def test_invalid_input(self):
+        """TC-TOTP-006: 無効なシークレット・カウンタ"""
+        engine = TOTPEngine()
+
+        with pytest.raises(Exception):
+            engine.generate("invalid_secret")
+        with pytest.raises(Exception):
+            engine.generate(None)
+        with pytest.raises(ValueError):
+            engine.generate_at("JBSWY3DPEHPK3PXP", -1)
+
+        assert len(engine._cache) == 0
+
+    def test_uses_current_time(self):
+        """TC-TOTP-007: 時刻省略時は現在時刻"""
+        engine = TOTPEngine()
+
+        with patch("src.totp_engine.time.time", return_value=1640995215.5):
+            assert engine.timecode() == 1640995215 // 30
+            assert engine.generate("JBSWY3DPEHPK3PXP") == pyotp.TOTP(
+                "JBSWY3DPEHPK3PXP"
+            ).at(1640995215)
+
+    def test_same_counter_not_recomputed(self):
+        """TC-TOTP-008: 同じ周期内ではHMACを再計算しない"""
+        engine = TOTPEngine()
+        secret = "JBSWY3DPEHPK3PXP"
+
+        with patch.object(engine, "_compute", wraps=engine._compute) as mock_compute:
+            codes = [engine.generate(secret, 1640995200 + i) for i in range(30)]
+            assert mock_compute.call_count == 1
+            assert len(set(codes)) == 1
+
+            # 周期が変わった時だけ再計算
+            next_code = engine.generate(secret, 1640995230)
+            assert mock_compute.call_count == 2
+
+        assert next_code == pyotp.TOTP(secret).at(1640995230)
+        assert engine.generate(secret, 1640995200) == codes[0]
+
+    def test_generate_batch_matches_pyotp(self):
+        """TC-TOTP-009: 一括生成はpyotpと同一の結果"""
+        secrets = self.SECRETS + [
+            base64.b32encode(bytes([i]) * 20).decode() for i in range(256)
+        ]
+        for digits, digest in [(6, hashlib.sha1), (8, hashlib.sha256)]:
+            engine = TOTPEngine(digits=digits, digest=digest)
+            keys = engine.decode_secrets(secrets)
+
+            for for_time in [59, 1640995215, 20000000000]:
+                codes = engine.format_codes(engine.generate_batch(keys, for_time))
+                expected = [
+                    pyotp.TOTP(s, digits=digits, digest=digest).at(for_time)
+                    for s in secrets
+                ]
+                assert codes == expected
+
+    def test_generate_batch_single_time_sample(self):
+        """TC-TOTP-010: 一括生成は1回だけ時刻を取得"""
+        engine = TOTPEngine()
+        keys = engine.decode_secrets(["JBSWY3DPEHPK3PXP"] * 10)
+
+        with patch("src.totp_engine.time.time", return_value=1640995200.0) as mock:
+            codes = engine.generate_batch(keys)
+
+        assert mock.call_count == 1
+        assert codes.shape == (10,)
+        assert len(set(engine.format_codes(codes))) == 1
+        assert engine.generate_batch([]).shape == (0,)
+
+    def test_verify_window(self):
+        """TC-TOTP-011: 現在のカウンタ±windowでの検証"""
+        engine = TOTPEngine()
+        secret = "JBSWY3DPEHPK3PXP"
+        now = 1640995215.0
+        totp = pyotp.TOTP(secret)
+
+        assert engine.verify(secret, totp.at(now), now) is True
+        assert engine.verify(secret, totp.at(now - 30), now) is True
+        assert engine.verify(secret, totp.at(now + 30), now) is True
+        assert engine.verify(secret, totp.at(now - 60), now) is False
+        assert engine.verify(secret, totp.at(now - 60), now, window=2) is True
+        assert engine.verify(secret, totp.at(now - 30), now, window=0) is False
+        assert (
+            engine.match_counter(secret, totp.at(now - 30), now) == 1640995215 // 30 - 1
+        )
+
+        for code in ["", "12345", "1234567", "abcdef"]:
+            assert engine.verify(secret, code, now) is False
+
+    def test_verify_matches_pyotp(self):
+        """TC-TOTP-012: pyotp.TOTP.verifyと同じ判定"""
+        engine = TOTPEngine()
+        for secret in self.SECRETS:
+            totp = pyotp.TOTP(secret)
+            for for_time in [300, 1640995215, 2000000000]:
+                for offset in range(-3, 4):
+                    code = totp.at(for_time + offset * 30)
+                    for window in range(3):
+                        assert engine.verify(
+                            secret, code, for_time, window
+                        ) == totp.verify(code, for_time, window)
+
+    def test_verify_constant_time_compare(self):
+        """TC-TOTP-013: 全候補をhmac.compare_digestで比較"""
+        engine = TOTPEngine()
+        secret = "JBSWY3DPEHPK3PXP"
+        code = pyotp.TOTP(secret).at(1640995185)
+
+        with patch(
+            "src.totp_engine.hmac.compare_digest",
+            wraps=__import__("hmac").compare_digest,
+        ) as mock_compare:
+            assert engine.verify(secret, code, 1640995215.0, window=2) is True
+
+        # 一致後も残りの候補を比較する
+        assert mock_compare.call_count == 5
+
+    def test_normalize_otp_parameters(self):
+        """TC-TOTP-014: OTP生成パラメータの正規化"""
+        assert normalize_otp_parameters() == ("SHA1", 6, 30)
+        assert normalize_otp_parameters("sha256", "8", "60") == ("SHA256", 8, 60)
+        assert normalize_otp_parameters("", "", "") == ("SHA1", 6, 30)
+        assert account_otp_parameters({"secret": "X"}) == ("SHA1", 6, 30)
+        assert account_otp_parameters(
+            {"algorithm": "SHA512", "digits": 10, "period": 15}
+        ) == ("SHA512", 10, 15)
+
+        for kwargs in [
+            {"algorithm": "MD5"},
+            {"digits": 5},
+            {"digits": 11},
+            {"period": 0},
+            {"period": "abc"},
+        ]:
+            with pytest.raises(ValueError):
+                normalize_otp_parameters(**kwargs)
+
+    def test_for_parameters(self):
+        """TC-TOTP-015: パラメータからエンジンを作成"""
+        for algorithm, digest in [
+            ("SHA1", hashlib.sha1),
+            ("SHA256", hashlib.sha256),
+            ("SHA512", hashlib.sha512),
+        ]:
+            engine = TOTPEngine.for_parameters(algorithm, 8, 60)
+            totp = pyotp.TOTP("JBSWY3DPEHPK3PXP", digits=8, digest=digest, interval=60)
+            assert engine.generate("JBSWY3DPEHPK3PXP", 1640995215) == totp.at(
+                1640995215
+            )
@@ -0,0 +1,214 @@
+"""
+unlock_agent.pyのテスト
+"""
+
+import pytest
+import os
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+from src.crypto_utils import CryptoUtils
+from src.security_manager import SecurityManager
+from src.unlock_agent import AgentClient, UnlockAgent, connect_agent
+
+
+class TestUnlockAgent:
+    """UnlockAgentクラスのテスト"""
+
+    @pytest.fixture
+    def vault(self):
+        """テスト用ボールト（ヘッダーと暗号文）"""
+        crypto = CryptoUtils("agent_test_password")
+        header = crypto.unlock_vault(None)
+        return header, crypto.encrypt("JBSWY3DPEHPK3PXP")
+
+    @pytest.fixture
+    def socket_path(self):
+        """一時ソケットパス"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            yield os.path.join(temp_dir, "agent.sock")
+
+    @pytest.fixture
+    def running_agent(self, socket_path):
+        """バックグラウンドスレッドで稼働するエージェント"""
+        agent = UnlockAgent(socket_path, idle_timeout=60)
+        thread = threading.Thread(target=agent.serve_forever, daemon=True)
+        thread.start()
+        for _ in range(50):
+            if os.path.exists(socket_path):
+                break
+            time.sleep(0.05)
+        yield agent
+        agent.stop()
+        thread.join(timeout=5)
+
+    def test_unlock_and_decrypt(self, vault):
+        """TC-AGENT-001: ボールトを開いて復号化"""
+        header, encrypted = vault
+        agent = UnlockAgent("unused.sock")
+
+        response = agent.handle_request(
+            {"op": "unlock", "password": "agent_test_password", "vault": header}
+        )
+        assert response["ok"] is True
+
+        vault_id = response["vault_id"]
+        response = agent.handle_request(
+            {"op": "decrypt", "vault_id": vault_id, "data": encrypted}
+        )
+        assert response == {"ok": True, "data": "JBSWY3DPEHPK3PXP"}
+
+    def test_unlock_wrong_password(self, vault):
+        """TC-AGENT-002: 誤ったパスワードでのアンロック失敗"""
+        header, _ = vault
+        agent = UnlockAgent("unused.sock")
+
+        response = agent.handle_request(
+            {"op": "unlock", "password": "wrong", "vault": header}
+        )
+
+        assert response["ok"] is False
+        assert agent.handle_request({"op": "status"})["vaults"] == []
+
+    def test_agent_does_not_keep_password(self, vault):
+        """TC-AGENT-003: エージェントはパスワードを保持しない"""
+        header, _ = vault
+        agent = UnlockAgent("unused.sock")
+        agent.handle_request(
+            {"op": "unlock", "password": "agent_test_password", "vault": header}
+        )
+
+        for crypto in agent._vaults.values():
+            assert crypto.password == ""
+
+    def test_lock_wipes_keys(self, vault):
+        """TC-AGENT-004: lockでマスターキーを破棄"""
+        header, encrypted = vault
+        agent = UnlockAgent("unused.sock")
+        vault_id = agent.handle_request(
+            {"op": "unlock", "password": "agent_test_password", "vault": header}
+        )["vault_id"]
+
+        assert agent.handle_request({"op": "lock"})["ok"] is True
+
+        response = agent.handle_request(
+            {"op": "decrypt", "vault_id": vault_id, "data": encrypted}
+        )
+        assert response["ok"] is False
+
+    def test_idle_timeout(self, vault):
+        """TC-AGENT-005: アイドルタイムアウトでマスターキーを破棄"""
+        header, _ = vault
+        agent = UnlockAgent("unused.sock", idle_timeout=10)
+        with patch("src.unlock_agent.time.monotonic", return_value=1000.0):
+            agent.handle_request(
+                {"op": "unlock", "password": "agent_test_password", "vault": header}
+            )
+
+        with patch("src.unlock_agent.time.monotonic", return_value=1005.0):
+            assert agent.check_idle() is False
+        with patch("src.unlock_agent.time.monotonic", return_value=1011.0):
+            assert agent.check_idle() is True
+
+        assert agent.handle_request({"op": "status"})["vaults"] == []
+
+    def test_invalid_requests(self):
+        """TC-AGENT-006: 不正なリクエスト"""
+        agent = UnlockAgent("unused.sock")
+
+        assert agent.handle_request({"op": "unknown"})["ok"] is False
+        assert agent.handle_request({"op": "decrypt"})["ok"] is False
+        assert (
+            agent.handle_request({"op": "decrypt", "vault_id": "x", "data": "y"})["ok"]
+            is False
+        )
+
+    def test_legacy_ciphertext_rejected(self, vault):
+        """TC-AGENT-007: 旧形式の暗号文は復号化しない"""
+        header, _ = vault
+        agent = UnlockAgent("unused.sock")
+        vault_id = agent.handle_request(
+            {"op": "unlock", "password": "agent_test_password", "vault": header}
+        )["vault_id"]
+        legacy = CryptoUtils("agent_test_password").encrypt("secret")
+
+        response = agent.handle_request(
+            {"op": "decrypt", "vault_id": vault_id, "data": legacy}
+        )
+
+        assert response["ok"] is False
+
+    def test_socket_roundtrip(self, running_agent, socket_path, vault):
+        """TC-AGENT-008: ソケット経由の暗号化・復号化"""
+        header, encrypted = vault
+        client = connect_agent(socket_path)
+        assert client is not None
+
+        vault_id = client.unlock("agent_test_password", header)
+        assert client.has_vault(vault_id) is True
+        assert client.decrypt(vault_id, encrypted) == "JBSWY3DPEHPK3PXP"
+
+        reencrypted = client.encrypt(vault_id, "NEWSECRET")
+        assert client.decrypt(vault_id, reencrypted) == "NEWSECRET"
+
+        client.lock()
+        assert client.has_vault(vault_id) is False
+        with pytest.raises(Exception):
+            client.decrypt(vault_id, encrypted)
+        client.close()
+
+    def test_socket_permissions(self, running_agent, socket_path):
+        """TC-AGENT-009: ソケットは所有者のみアクセス可能"""
+        assert os.stat(socket_path).st_mode & 0o777 == 0o600
+
+    def test_stop(self, running_agent, socket_path):
+        """TC-AGENT-010: stopでエージェントを停止"""
+        AgentClient(socket_path).stop()
+
+        for _ in range(50):
+            if not os.path.exists(socket_path):
+                break
+            time.sleep(0.05)
+        assert not os.path.exists(socket_path)
+        assert connect_agent(socket_path) is None
+
+    def test_connect_agent_not_running(self, socket_path):
+        """TC-AGENT-011: エージェント未起動時はNone"""
+        assert connect_agent(socket_path) is None
+
+    def test_crypto_utils_uses_agent(self, running_agent, socket_path, vault):
+        """TC-AGENT-012: CryptoUtilsはエージェント経由でパスワードなしに復号化"""
+        header, encrypted = vault
+        client = AgentClient(socket_path)
+        client.unlock("agent_test_password", header)
+
+        with patch.object(CryptoUtils, "_get_password", return_value="") as mock_pw:
+            crypto = CryptoUtils(agent=client)
+            with patch.object(crypto, "_derive_raw_key") as mock_derive:
+                crypto.unlock_vault(header)
+                assert crypto.uses_agent is True
+                assert crypto.decrypt(encrypted) == "JBSWY3DPEHPK3PXP"
+                assert crypto.decrypt(crypto.encrypt("OTHER")) == "OTHER"
+                mock_derive.assert_not_called()
+            mock_pw.assert_not_called()
+        client.close()
+
+    def test_security_manager_uses_agent(self, running_agent, socket_path):
+        """TC-AGENT-013: パスワード未指定のSecurityManagerはエージェントを利用"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            data_file = os.path.join(temp_dir, "accounts.json")
+            manager = SecurityManager(data_file=data_file, password="agent_pw")
+            account_id = manager.add_account(
+                "Device", "user@example.com", "Service", "JBSWY3DPEHPK3PXP"
+            )
+            AgentClient(socket_path).unlock("agent_pw", manager.vault)
+
+            with patch.dict("os.environ", {"OTP_AGENT_SOCK": socket_path}):
+                with patch.object(CryptoUtils, "_get_password") as mock_pw:
+                    agent_manager = SecurityManager(data_file=data_file)
+                    account = agent_manager.get_account(account_id)
+                    mock_pw.assert_not_called()
+
+            assert account["secret"] == "JBSWY3DPEHPK3PXP"
+            assert agent_manager.crypto.uses_agent is True